@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+import os
+import pandas as pd
+import numpy as np
+from scipy.stats import shapiro
+import scipy.stats as stats
+from statsmodels.stats.multitest import multipletests
+import pools
+
+# Shapiro-Wilk 검정의 p-value 가 유효한 최대 표본 수
+shapiro_max_samples = 5000
+
+
+## Batch A/B Test
+## 모든 그룹 컬럼이 같은 target 을 공유하므로 target 의 순위(rank)와 동순위 보정값을 한 번만 계산하고
+## 각 컬럼은 그룹 A(값이 1 인 행)의 행 번호만 process pool 로 보내서 검정함
+
+_shared = {}
+
+def _init_worker(y, ranks, tie_term, seed):
+    _shared["y"] = y
+    _shared["ranks"] = ranks
+    _shared["tie_term"] = tie_term
+    _shared["seed"] = seed
+
+def subsample(values, size, rng):
+    """
+    표본 수가 size 보다 크면 비복원 추출로 줄이는 함수
+    """
+    if len(values) <= size:
+        return values
+    return rng.choice(values, size, replace=False)
+
+def mannwhitneyu_ranks(rank_sum, n1, n2, tie_term):
+    """
+    미리 계산한 전체 순위의 그룹 A 순위합으로 구하는 Mann-Whitney U 양측 검정 p-value
+    (scipy.stats.mannwhitneyu 의 asymptotic 방식과 동일 : 동순위 보정 + 연속성 보정)
+    """
+    n = n1 + n2
+    u1 = rank_sum - n1 * (n1 + 1) / 2
+    u = max(u1, n1 * n2 - u1)
+    s = np.sqrt(n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1))))
+    if s == 0:
+        return 1.0
+    z = (u - n1 * n2 / 2 - 0.5) / s
+    return min(2 * stats.norm.sf(z), 1.0)
+
+def positive_rows(column):
+    """
+    그룹 컬럼에서 값이 1 인 행 번호 (희소 컬럼은 저장된 0 이 아닌 값만 확인)
+    """
+    if isinstance(column.dtype, pd.SparseDtype) and column.dtype.fill_value == 0:
+        array = column.array
+        return array.sp_index.indices[array.sp_values == 1].astype("int64")
+    return np.flatnonzero(column.to_numpy() == 1)
+
+def _test_column(job):
+    i, feature, rows = job
+    y, ranks = _shared["y"], _shared["ranks"]
+    mask = np.zeros(len(y), dtype=bool)
+    mask[rows] = True
+    groupA = y[rows]
+    groupB = y[~mask]
+    n1, n2 = len(groupA), len(groupB)
+    if n1 < 3 or n2 < 3:
+        return None
+
+    # Assumption: Normality (Shapiro 는 최대 5000 개 표본으로 검정)
+    rng = np.random.default_rng(_shared["seed"] + i)
+    ntA = shapiro(subsample(groupA, shapiro_max_samples, rng))[1] < 0.05
+    ntB = shapiro(subsample(groupB, shapiro_max_samples, rng))[1] < 0.05
+
+    homogeneity = np.nan
+    if (ntA == False) & (ntB == False):
+        # Parametric Test
+        leveneTest = stats.levene(groupA, groupB)[1] < 0.05
+        pvalue = stats.ttest_ind(groupA, groupB, equal_var=leveneTest == False)[1]
+        test_type = "Parametric"
+        homogeneity = "Yes" if leveneTest == False else "No"
+    else:
+        # Non-Parametric Test
+        pvalue = mannwhitneyu_ranks(ranks[rows].sum(), n1, n2, _shared["tie_term"])
+        test_type = "Non-Parametric"
+
+    return {
+        "Feature": feature,
+        "Test Type": test_type,
+        "Homogeneity": homogeneity,
+        "p-value": pvalue,
+        "GroupA_mean": groupA.mean(),
+        "GroupB_mean": groupB.mean(),
+        "GroupA_median": np.median(groupA),
+        "GroupB_median": np.median(groupB),
+    }
+
+def AB_Test_batch(dataframe, groups, target, method="fdr_bh", alpha=0.05, n_jobs=None, seed=42):
+    """
+    여러 이진 그룹 컬럼에 대해 A/B Test 를 한 번에 수행하는 함수
+    target 이 결측인 행은 한 번만 제외하고, 컬럼별 검정은 process pool 에서 병렬로 수행
+    모든 컬럼의 p-value 에 다중 검정 보정(method, statsmodels.multipletests)을 적용
+    """
+    notnull = dataframe[target].notnull().to_numpy()
+    y = dataframe[target].to_numpy(dtype="float64")[notnull]
+    ranks = stats.rankdata(y)
+    _, counts = np.unique(y, return_counts=True)
+    tie_term = float((counts.astype("float64") ** 3 - counts).sum())
+
+    ## 전체 행 번호 -> target 결측을 뺀 y 의 행 번호
+    position = None if notnull.all() else np.cumsum(notnull) - 1
+
+    def group_rows(group):
+        rows = positive_rows(dataframe[group])
+        if position is None:
+            return rows
+        return position[rows[notnull[rows]]]
+
+    jobs = ((i, group, group_rows(group)) for i, group in enumerate(groups))
+    n_jobs = n_jobs or os.cpu_count() or 1
+    if n_jobs == 1:
+        _init_worker(y, ranks, tie_term, seed)
+        results = list(map(_test_column, jobs))
+    else:
+        with pools.process_pool(n_jobs, initializer=_init_worker, initargs=(y, ranks, tie_term, seed)) as executor:
+            results = list(executor.map(_test_column, jobs))
+
+    temp = pd.DataFrame([r for r in results if r is not None])
+    if len(temp) == 0:
+        return temp
+
+    # Multiple testing correction
+    reject, pvalue_adj, _, _ = multipletests(temp["p-value"], alpha=alpha, method=method)
+    temp["p-value adj"] = pvalue_adj
+    temp["AB Hypothesis"] = np.where(reject, "Reject H0", "Fail to Reject H0")
+    temp["Comment"] = np.where(reject, "A/B groups are not similar", "A/B groups are similar")
+
+    return temp[["Feature", "Test Type", "Homogeneity", "AB Hypothesis", "p-value", "p-value adj", "Comment", "GroupA_mean", "GroupB_mean", "GroupA_median", "GroupB_median"]]
+
+
+## Mergeable A/B Test (청크 처리용)
+## 청크마다 그룹 A / 전체의 적률(n, 평균, 2~4차 중심적률)과 고정 구간 히스토그램만 누적하고 (그룹 B = 전체 - A)
+## 마지막에 한 번만 검정함. 원본 데이터를 모두 메모리에 올리지 않아도 됨
+## 검정 방식을 고르는 규칙은 AB_Test_batch 와 같음
+## - 정규성 : 그룹 별로 합칠 수 있는 무작위 표본(최대 shapiro_max_samples 개)으로 Shapiro 검정
+## - 등분산 : 히스토그램 구간 중앙 값으로 근사한 Levene 검정 (중앙값 기준)
+## - 평균 비교 : 요약 통계량으로 t-test (ttest_ind_from_stats)
+## - Mann-Whitney U / 중앙값 : 히스토그램 구간을 동순위로 보고 근사
+
+# 히스토그램 구간 : sign(y) * log1p(|y|) 를 [-hist_range, hist_range] 에서 hist_bins 개로 나눔
+hist_bins = 8192
+hist_range = 20.0
+
+
+def moments(y):
+    """
+    (n, 평균, M2, M3, M4) 적률 (Mk 는 평균으로부터의 편차 k 제곱 합)
+    """
+    n = len(y)
+    if n == 0:
+        return np.zeros(5)
+    mean = y.mean()
+    d = y - mean
+    d2 = d * d
+    return np.array([n, mean, d2.sum(), (d2 * d).sum(), (d2 * d2).sum()])
+
+def combine_moments(a, b, sign=1):
+    """
+    두 표본의 적률을 합치는 함수 (Pébay, 2008). sign=-1 이면 전체 a 에서 부분 b 를 뺀 나머지의 적률
+    a, b : (..., 5) 배열
+    """
+    a, b = np.asarray(a, dtype="float64"), np.asarray(b, dtype="float64")
+    if sign < 0:
+        ## 나머지 r 에 대해 a = combine(r, b) 를 M2 -> M3 -> M4 순서로 풀어서 구함
+        n, nb = a[..., 0], b[..., 0]
+        nr = n - nb
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mr = np.where(nr > 0, (n * a[..., 1] - nb * b[..., 1]) / np.where(nr > 0, nr, 1), 0)
+            f = np.where(n > 0, 1 / n, 0)
+        d = np.where(nr > 0, b[..., 1] - mr, 0)
+        M2b, M3b = b[..., 2], b[..., 3]
+        M2r = a[..., 2] - M2b - d ** 2 * nr * nb * f
+        M3r = a[..., 3] - M3b - d ** 3 * nr * nb * (nr - nb) * f ** 2 - 3 * d * (nr * M2b - nb * M2r) * f
+        M4r = a[..., 4] - b[..., 4] - d ** 4 * nr * nb * (nr ** 2 - nr * nb + nb ** 2) * f ** 3 \
+              - 6 * d ** 2 * (nr ** 2 * M2b + nb ** 2 * M2r) * f ** 2 - 4 * d * (nr * M3b - nb * M3r) * f
+        r = np.stack([nr, mr, np.clip(M2r, 0, None), M3r, np.clip(M4r, 0, None)], axis=-1)
+        return np.where((nr > 0)[..., None], r, 0)
+
+    na, nb = a[..., 0], b[..., 0]
+    n = na + nb
+    with np.errstate(divide="ignore", invalid="ignore"):
+        d = np.where(n > 0, b[..., 1] - a[..., 1], 0)
+        f = np.where(n > 0, 1 / n, 0)
+    M2a, M2b, M3a, M3b = a[..., 2], b[..., 2], a[..., 3], b[..., 3]
+
+    result = np.zeros(np.broadcast(a, b).shape)
+    result[..., 0] = n
+    result[..., 1] = a[..., 1] + d * nb * f
+    result[..., 2] = M2a + M2b + d ** 2 * na * nb * f
+    result[..., 3] = M3a + M3b + d ** 3 * na * nb * (na - nb) * f ** 2 + 3 * d * (na * M2b - nb * M2a) * f
+    result[..., 4] = a[..., 4] + b[..., 4] + d ** 4 * na * nb * (na ** 2 - na * nb + nb ** 2) * f ** 3 \
+                     + 6 * d ** 2 * (na ** 2 * M2b + nb ** 2 * M2a) * f ** 2 + 4 * d * (na * M3b - nb * M3a) * f
+    return result
+
+def hist_index(y):
+    v = np.sign(y) * np.log1p(np.abs(y))
+    return np.clip(((v + hist_range) / (2 * hist_range) * hist_bins).astype("int64"), 0, hist_bins - 1)
+
+def hist_value(index):
+    """
+    히스토그램 구간 중앙을 원래 단위로 되돌린 값
+    """
+    v = (np.asarray(index) + 0.5) / hist_bins * 2 * hist_range - hist_range
+    return np.sign(v) * np.expm1(np.abs(v))
+
+def bottom_sample(keys, values, size):
+    """
+    무작위 키가 가장 작은 size 개 (키를 같이 들고 다니면 여러 표본을 합쳐도 균등 무작위 표본이 됨)
+    """
+    if len(keys) <= size:
+        return keys, values
+    index = np.argpartition(keys, size - 1)[:size]
+    return keys[index], values[index]
+
+def merge_samples(a, b, size):
+    return bottom_sample(np.concatenate([a[0], b[0]]), np.concatenate([a[1], b[1]]), size)
+
+def hist_median(counts):
+    cumulative = np.cumsum(counts)
+    return float(hist_value(np.searchsorted(cumulative, cumulative[-1] / 2)))
+
+def hist_levene(countsA, countsB):
+    """
+    히스토그램 구간 중앙 값으로 근사한 Levene 검정 p-value (scipy.stats.levene 의 center="median" 과 같은 방식)
+    """
+    values = hist_value(np.arange(hist_bins))
+    n = np.array([countsA.sum(), countsB.sum()])
+    z = [np.abs(values - hist_median(counts)) for counts in [countsA, countsB]]
+    zbar = np.array([(counts * zi).sum() / ni for counts, zi, ni in zip([countsA, countsB], z, n)])
+    within = sum((counts * (zi - zb) ** 2).sum() for counts, zi, zb in zip([countsA, countsB], z, zbar))
+    if within <= 0:
+        return 1.0
+    between = (n * (zbar - (n * zbar).sum() / n.sum()) ** 2).sum()
+    w = (n.sum() - 2) * between / within
+    return float(stats.f.sf(w, 1, n.sum() - 2))
+
+def hist_mannwhitneyu(countsA, countsB):
+    """
+    히스토그램 구간을 동순위로 보고 구하는 Mann-Whitney U 양측 검정 p-value
+    """
+    counts = countsA + countsB
+    ranks = np.cumsum(counts) - counts + (counts + 1) / 2
+    tie_term = float((counts ** 3 - counts).sum())
+    return mannwhitneyu_ranks(float((countsA * ranks).sum()), countsA.sum(), countsB.sum(), tie_term)
+
+
+class ABStats:
+    """
+    청크 별로 누적하고 서로 합칠 수 있는 A/B Test 통계량
+    groups : 이진 그룹 컬럼 목록 (값이 1 이면 그룹 A)
+    정규성 검정용 표본은 행마다 무작위 키를 붙여 그룹 A / B 별로 키가 작은 shapiro_max_samples 개만 보관
+    """
+
+    def __init__(self, groups, seed=42):
+        self.groups = list(groups)
+        self.rng = np.random.default_rng(seed)
+        self.total = np.zeros(5)
+        self.total_hist = np.zeros(hist_bins)
+        self.moments = np.zeros((len(self.groups), 5))
+        self.hist = np.zeros((len(self.groups), hist_bins))
+        empty = (np.zeros(0), np.zeros(0))
+        self.samples = [[empty, empty] for _ in self.groups]
+
+    def update(self, dataframe, target):
+        """
+        청크 하나를 누적 (target 이 결측인 행은 제외)
+        """
+        notnull = dataframe[target].notnull().to_numpy()
+        y = dataframe[target].to_numpy(dtype="float64")[notnull]
+        index = hist_index(y)
+        keys = self.rng.random(len(y))
+        self.total = combine_moments(self.total, moments(y))
+        self.total_hist += np.bincount(index, minlength=hist_bins)
+
+        for i, group in enumerate(self.groups):
+            mask = dataframe[group].to_numpy()[notnull] == 1
+            if mask.any():
+                self.moments[i] = combine_moments(self.moments[i], moments(y[mask]))
+                self.hist[i] += np.bincount(index[mask], minlength=hist_bins)
+            for j, part in enumerate([mask, ~mask]):
+                sample = bottom_sample(keys[part], y[part], shapiro_max_samples)
+                self.samples[i][j] = merge_samples(self.samples[i][j], sample, shapiro_max_samples)
+        return self
+
+    def merge(self, other):
+        """
+        같은 그룹 컬럼으로 누적한 다른 ABStats 를 합치는 함수 (예: 매장 / 기간 별로 따로 누적한 결과)
+        """
+        self.total = combine_moments(self.total, other.total)
+        self.total_hist += other.total_hist
+        self.moments = combine_moments(self.moments, other.moments)
+        self.hist += other.hist
+        self.samples = [[merge_samples(a, b, shapiro_max_samples) for a, b in zip(mine, theirs)]
+                        for mine, theirs in zip(self.samples, other.samples)]
+        return self
+
+    def result(self, method="fdr_bh", alpha=0.05):
+        """
+        AB_Test_batch 와 같은 형식의 결과 (p-value 에 다중 검정 보정 적용)
+        """
+        rows = []
+        for i, feature in enumerate(self.groups):
+            mA = self.moments[i]
+            mB = combine_moments(self.total, mA, sign=-1)
+            n1, n2 = int(mA[0]), int(mB[0])
+            if n1 < 3 or n2 < 3:
+                continue
+            histA = self.hist[i]
+            histB = self.total_hist - histA
+
+            # Assumption: Normality (Shapiro 는 최대 5000 개 무작위 표본으로 검정)
+            ntA = shapiro(self.samples[i][0][1])[1] < 0.05
+            ntB = shapiro(self.samples[i][1][1])[1] < 0.05
+
+            homogeneity = np.nan
+            if (ntA == False) & (ntB == False):
+                # Parametric Test
+                homogeneous = hist_levene(histA, histB) >= 0.05
+                varA, varB = mA[2] / (n1 - 1), mB[2] / (n2 - 1)
+                pvalue = stats.ttest_ind_from_stats(mA[1], np.sqrt(varA), n1, mB[1], np.sqrt(varB), n2, equal_var=homogeneous)[1]
+                test_type = "Parametric"
+                homogeneity = "Yes" if homogeneous else "No"
+            else:
+                # Non-Parametric Test
+                pvalue = hist_mannwhitneyu(histA, histB)
+                test_type = "Non-Parametric"
+
+            rows.append({
+                "Feature": feature,
+                "Test Type": test_type,
+                "Homogeneity": homogeneity,
+                "p-value": pvalue,
+                "GroupA_mean": mA[1],
+                "GroupB_mean": mB[1],
+                "GroupA_median": hist_median(histA),
+                "GroupB_median": hist_median(histB),
+            })
+
+        temp = pd.DataFrame(rows)
+        if len(temp) == 0:
+            return temp
+
+        # Multiple testing correction
+        reject, pvalue_adj, _, _ = multipletests(temp["p-value"], alpha=alpha, method=method)
+        temp["p-value adj"] = pvalue_adj
+        temp["AB Hypothesis"] = np.where(reject, "Reject H0", "Fail to Reject H0")
+        temp["Comment"] = np.where(reject, "A/B groups are not similar", "A/B groups are similar")
+
+        return temp[["Feature", "Test Type", "Homogeneity", "AB Hypothesis", "p-value", "p-value adj", "Comment", "GroupA_mean", "GroupB_mean", "GroupA_median", "GroupB_median"]]
@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import resource
+import subprocess
+import tracemalloc
+import pandas as pd
+
+# 저장소 위치 (작업 프로세스는 데이터 폴더에서 실행하므로 import 경로에 추가)
+repo_dir = os.path.dirname(os.path.abspath(__file__))
+# 결과 / 기준 파일 (데이터 폴더 기준 상대 경로)
+results_dir = os.path.join("data", "benchmarks")
+baseline_name = "baseline.json"
+# 기준 대비 이 비율을 넘으면 회귀로 표시
+tolerance = 1.2
+# 케이스 별 반복 실행 횟수 (가장 빠른 시간을 사용)
+repeat = 3
+
+
+## Benchmark cases
+## setup(준비 데이터 읽기)은 측정하지 않고 run 만 측정함
+## 각 케이스는 별도 프로세스에서 실행해서 peak RSS 와 캐시가 서로 영향을 주지 않게 함
+
+def setup_tables(*names):
+    import utils
+    return lambda: {name: utils.read_table(name) for name in names}
+
+def setup_holidays():
+    import utils
+    return {name: utils.read_table(name) for name in ["holidays", "train", "test", "stores"]}
+
+def setup_holiday_features():
+    import prepare
+    s = setup_holidays()
+    return {"d": prepare.Feature_Engineering_Holidays(s["holidays"], s["train"], s["test"], s["stores"], sparse=True)}
+
+def setup_cleaned():
+    import utils
+    import cleaning
+    return {"train": cleaning.clean_train(utils.read_table("train"))[0], "stores": utils.read_table("stores")}
+
+def setup_rollups():
+    import rollup
+    s = setup_cleaned()
+    return {"rollups": rollup.build_rollups(s["train"], s["stores"])}
+
+def setup_oil():
+    import utils
+    import exogenous
+    return {"oil": exogenous.DailySeries.from_frame(utils.read_table("oil"), "dcoilwtico").frame("dcoilwtico")}
+
+def setup_prepared(**builders):
+    ## builders : 상태 이름 -> (prepare 함수 이름, 인자...)
+    def setup():
+        import prepare
+        return {name: getattr(prepare, fn)(*args) for name, (fn, *args) in builders.items()}
+    return setup
+
+def setup_sales_stats(*names):
+    ## names 의 prepare 결합 데이터 + 상관계수 / OLS 결과 + transactions
+    def setup():
+        import utils
+        import prepare
+        s = setup_prepared(**{name: (name,) for name in names})()
+        return dict(s, stats=prepare.sales_correlation_stats(), transactions=utils.read_table("transactions"))
+    return setup
+
+def setup_unsold():
+    import prepare
+    import eda_app
+    return {"train": prepare.train_series(eda_app.unsold_pairs)}
+
+def run_load_data(s):
+    import utils
+    utils.load_data()
+
+def run_clean_train(s):
+    import cleaning
+    cleaning.clean_train(s["train"])
+
+def run_holiday_features(s):
+    import prepare
+    prepare.Feature_Engineering_Holidays(s["holidays"], s["train"], s["test"], s["stores"], sparse=True)
+
+def run_ab_test(s):
+    import prepare
+    import ab_test
+    ab_test.AB_Test_batch(s["d"], prepare.holiday_columns(s["d"]), target="sales")
+
+def run_rollups(s):
+    import rollup
+    rollup.build_rollups(s["train"], s["stores"])
+
+def run_sales_correlation_stats(s):
+    ## 실행마다 캐시를 비우므로 transactions_oil_sales 결합부터 다시 계산함
+    import prepare
+    prepare.sales_correlation_stats()
+
+def run_sales_correlation(method):
+    def run(s):
+        import prepare
+        prepare.sales_correlation("store", method)
+    return run
+
+def run_oil_family_panels(s):
+    import prepare
+    prepare._build_oil_family_panels()
+
+def run_figure(name, *args):
+    def run(s):
+        import eda_app
+        getattr(eda_app, name)(*[s[a] if isinstance(a, str) else s["rollups"][a] for a in args])
+    return run
+
+# 케이스 이름 : (setup, run, 필요한 테이블)
+cases = {
+    "load_data": (dict, run_load_data, []),
+    "clean_train": (setup_tables("train"), run_clean_train, ["train"]),
+    "holiday_features": (setup_holidays, run_holiday_features, ["train"]),
+    "ab_test": (setup_holiday_features, run_ab_test, ["train"]),
+    "rollups": (setup_cleaned, run_rollups, ["train"]),
+    "sales_correlation_stats": (setup_prepared(temp=("transactions_oil_sales",)), run_sales_correlation_stats, ["train"]),
+    "sales_correlation_pearson": (setup_prepared(store=("sales_rollup", "store", "D")), run_sales_correlation("pearson"), ["train"]),
+    "sales_correlation_spearman": (setup_prepared(store=("sales_rollup", "store", "D")), run_sales_correlation("spearman"), ["train"]),
+    "oil_family_panels": (setup_prepared(family=("sales_rollup", "family", "D")), run_oil_family_panels, ["train"]),
+    "fig_Transactions_TotalSales_Correlation": (setup_sales_stats(), run_figure("fig_Transactions_TotalSales_Correlation", "stats", "transactions"), ["train"]),
+    "fig_Transactions_ym_patten1": (setup_tables("transactions"), run_figure("fig_Transactions_ym_patten1", "transactions"), []),
+    "fig_Transactions_ym_patten2": (setup_tables("transactions"), run_figure("fig_Transactions_ym_patten2", "transactions"), []),
+    "fig_Transactions_Sales_Correlation": (setup_sales_stats("transactions_sales"), run_figure("fig_Transactions_Sales_Correlation", "transactions_sales", "stats"), ["train"]),
+    "fig_Transactions_ydw_patten": (setup_tables("transactions"), run_figure("fig_Transactions_ydw_patten", "transactions"), []),
+    "fig_OilPrice": (setup_oil, run_figure("fig_OilPrice", "oil"), []),
+    "fig_OilPrice_Sales_Transactions_patten": (setup_sales_stats("transactions_oil_sales"), run_figure("fig_OilPrice_Sales_Transactions_patten", "transactions_oil_sales", "stats"), ["train"]),
+    "fig_OilPrice_family_patten": (setup_prepared(panels=("oil_family_panels",)), run_figure("fig_OilPrice_family_patten", "panels"), ["train"]),
+    "fig_Train_sales_Correlation": (setup_prepared(corr=("sales_correlation", "store", "pearson")), run_figure("fig_Train_sales_Correlation", "corr"), ["train"]),
+    "fig_Train_store_TotalSales_patten": (setup_rollups, run_figure("fig_Train_store_TotalSales_patten", ("store", "D")), ["train"]),
+    "fig_unsold_family": (setup_unsold, run_figure("fig_unsold_family", "train"), ["train"]),
+    "fig_Train_d_family_patten": (setup_rollups, run_figure("fig_Train_d_family_patten", ("family", "D")), ["train"]),
+    "fig_Train_family_patten": (setup_rollups, run_figure("fig_Train_family_patten", ("family", "M")), ["train"]),
+    "fig_Train_Stores_patten": (setup_rollups, run_figure("fig_Train_Stores_patten", ("city", "M")), ["train"]),
+}
+
+
+def peak_rss_mb():
+    ## Linux 의 ru_maxrss 단위는 KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def measure(name, repeat=repeat):
+    """
+    작업 프로세스 : 현재 폴더의 data/ 로 케이스 하나를 실행하고 측정값을 반환
+    """
+    import streamlit as st
+    import matplotlib.pyplot as plt
+    ## 모듈 import 시간은 측정에서 제외
+    import prepare
+    import eda_app
+    setup, run, _ = cases[name]
+    state = setup()
+    rss_before = peak_rss_mb()
+
+    times = []
+    for _ in range(repeat):
+        st.cache_data.clear()
+        start = time.perf_counter()
+        run(state)
+        times.append(time.perf_counter() - start)
+        plt.close("all")
+
+    ## 메모리 할당은 tracemalloc 으로 한 번 더 실행해서 측정 (실행 시간에 영향을 주므로 따로 실행)
+    st.cache_data.clear()
+    tracemalloc.start()
+    run(state)
+    allocated, peak_allocated = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    plt.close("all")
+
+    return {"time": min(times), "time_mean": sum(times) / len(times), "peak_rss_mb": peak_rss_mb(),
+            "rss_delta_mb": peak_rss_mb() - rss_before, "peak_alloc_mb": peak_allocated / 2 ** 20}
+
+
+## Runner
+
+def run_case(name, data_root, repeat=repeat):
+    """
+    케이스 하나를 data_root 에서 별도 프로세스로 실행
+    """
+    env = dict(os.environ, MPLBACKEND="Agg", PYTHONPATH=os.pathsep.join([repo_dir, os.environ.get("PYTHONPATH", "")]))
+    result = subprocess.run([sys.executable, os.path.join(repo_dir, "benchmark.py"), "--worker", name, "--repeat", str(repeat)],
+                            cwd=data_root, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        return {"error": result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f"exit {result.returncode}"}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def run_suite(data_root, names=None, repeat=repeat):
+    """
+    data_root/data 의 CSV 로 케이스들을 실행 (train.csv 가 없으면 train 이 필요한 케이스는 건너뜀)
+    반환값 : 케이스 별 측정값 DataFrame
+    """
+    rows = {}
+    for name in names or cases:
+        missing = [t for t in cases[name][2] if not os.path.exists(os.path.join(data_root, "data", f"{t}.csv"))]
+        if missing:
+            rows[name] = {"error": f"skipped ({', '.join(missing)}.csv not found)"}
+            continue
+        rows[name] = run_case(name, data_root, repeat)
+        print(name, rows[name], flush=True)
+    return pd.DataFrame(rows).T
+
+def scale_data(source, target, factor, stores=1):
+    """
+    train / transactions / oil 의 기간을 factor 배, 매장 수를 stores 배로 늘린 데이터 폴더를 만드는 함수
+    기간은 원래 기간을 그 이전 날짜로 이어 붙여서 반복하고,
+    매장은 store_nbr 에 원래 매장 수의 배수를 더한 복제 매장을 추가 (stores / test / train / transactions / store_openings)
+    holidays 는 그대로 (복제 매장은 같은 city / state 이므로 지역 휴일도 그대로 적용됨)
+    """
+    os.makedirs(os.path.join(target, "data"), exist_ok=True)
+    shutil.copy(os.path.join(source, "data", "holidays_events.csv"), os.path.join(target, "data", "holidays_events.csv"))
+    n_stores = pd.read_csv(os.path.join(source, "data", "stores.csv")).store_nbr.max()
+    next_id, spans = 0, {}
+    for file in ["stores.csv", "train.csv", "test.csv", "transactions.csv", "oil.csv", "store_openings.csv"]:
+        path = os.path.join(source, "data", file)
+        if not os.path.exists(path):
+            continue
+        d = pd.read_csv(path, parse_dates=[c for c in ["date", "opening_date"] if c in pd.read_csv(path, nrows=0).columns])
+        if file in ["train.csv", "transactions.csv", "oil.csv"]:
+            span = spans[file] = pd.Timedelta(days=(d.date.max() - d.date.min()).days + 1)
+            d = pd.concat([d.assign(date=d.date - span * k) for k in range(factor - 1, -1, -1)], ignore_index=True)
+        if file == "store_openings.csv" and "train.csv" in spans:
+            ## 신규 매장 (합성 데이터) 은 가장 앞의 반복 기간에서 오픈하도록 오픈 일자도 같이 당김
+            d["opening_date"] = d.opening_date - spans["train.csv"] * (factor - 1)
+        if "store_nbr" in d.columns and stores > 1:
+            d = pd.concat([d.assign(store_nbr=d.store_nbr + n_stores * k) for k in range(stores)], ignore_index=True)
+            ## 원래 파일처럼 날짜 / 매장 순서로 정렬 (같은 매장 안의 제품군 순서는 유지)
+            d = d.sort_values([c for c in ["date", "store_nbr"] if c in d.columns], kind="stable", ignore_index=True)
+        if "id" in d.columns:
+            ## test 의 id 는 train 의 id 다음부터 이어짐
+            d["id"] = range(next_id, next_id + len(d))
+            next_id += len(d)
+        d.to_csv(os.path.join(target, "data", file), index=False, date_format="%Y-%m-%d")
+    return target
+
+def compare(result, baseline, tolerance=tolerance):
+    """
+    기준 결과 대비 비율 (time / peak_rss_mb / peak_alloc_mb) 과 회귀 여부
+    """
+    columns = ["time", "peak_rss_mb", "peak_alloc_mb"]
+    common = [c for c in result.index if c in baseline.index]
+    ratio = result.loc[common, columns].astype(float) / baseline.loc[common, columns].astype(float)
+    ratio.columns = [f"{c}_ratio" for c in columns]
+    ratio["regression"] = (ratio > tolerance).any(axis=1)
+    return ratio
+
+
+if __name__ == "__main__":
+    ## python benchmark.py                          : 저장소의 data/ 로 모든 케이스 실행
+    ## python benchmark.py --scale 10              : 기간을 10 배로 늘린 데이터로 실행
+    ## python benchmark.py --scale 10 --stores 50  : 기간 10 배, 매장 수 50 배로 늘린 데이터로 실행
+    ## python benchmark.py --data DIR --save-baseline : DIR/data 의 CSV 로 실행하고 기준으로 저장
+    parser = argparse.ArgumentParser(description="데이터 적재 / EDA 주요 경로 벤치마크")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--data", default=".", help="data/ 폴더가 있는 위치")
+    parser.add_argument("--scale", type=int, default=1, help="train / transactions / oil 기간 배수")
+    parser.add_argument("--stores", type=int, default=1, help="매장 수 배수")
+    parser.add_argument("--cases", nargs="*", help=", ".join(cases))
+    parser.add_argument("--repeat", type=int, default=repeat)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure(args.worker, args.repeat)))
+        sys.exit(0)
+
+    data_root = os.path.abspath(args.data)
+    if args.scale > 1 or args.stores > 1:
+        data_root = scale_data(data_root, os.path.join(data_root, results_dir, f"scale_{args.scale}x{args.stores}"), args.scale, args.stores)
+
+    result = run_suite(data_root, args.cases, args.repeat)
+    print(result.to_string())
+
+    os.makedirs(os.path.join(data_root, results_dir), exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    result.to_json(os.path.join(data_root, results_dir, f"result_{stamp}.json"), orient="index", indent=1)
+
+    path = os.path.join(data_root, results_dir, baseline_name)
+    if args.save_baseline:
+        result.to_json(path, orient="index", indent=1)
+        print(f"baseline -> {path}")
+    elif os.path.exists(path):
+        ratio = compare(result.dropna(subset=["time"]) if "time" in result else result, pd.read_json(path, orient="index"))
+        print(ratio.round(2).to_string())
+        if ratio.regression.any():
+            print("regression :", ", ".join(ratio.index[ratio.regression]))
+            sys.exit(1)
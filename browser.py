@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+import utils
+
+# 한 페이지에 보여주는 행 수
+page_sizes = [50, 100, 500, 1000]
+# 서버에서 정렬할 수 있는 컬럼 (동률은 date, store_nbr, family 순서로 정렬)
+sort_columns = ["date", "store_nbr", "family"]
+# 필터 별 대상 컬럼
+filter_columns = {"start": "date", "end": "date", "stores": "store_nbr", "families": "family"}
+
+
+## Data browser
+## 테이블 전체를 브라우저로 보내지 않고, 필터 / 정렬에 맞는 한 페이지의 행만 읽어서 보여줌
+## - 분할 저장하는 테이블(train / transactions) : 정렬 컬럼의 그룹(date 는 year / month 파일, store_nbr / family 는 값) 별
+##   행 수만 먼저 세고, 페이지가 걸치는 그룹의 행만 읽어서 그 안에서 정렬
+##   (date 정렬은 파일 메타데이터, store_nbr 는 row group 통계로 필요한 부분만 읽음)
+## - 나머지 테이블 : 작으므로 메모리에서 필터 / 정렬
+
+def sort_keys(dataframe, sort):
+    return [sort] + [c for c in sort_columns if c != sort and c in dataframe.columns]
+
+def open_dataset(name):
+    utils.ensure_dataset(name)
+    return ds.dataset(utils.dataset_path(name), format="parquet", partitioning="hive")
+
+def table_keys(name):
+    """
+    필터 선택지 (날짜 범위, 매장, 제품군) - 첫 달 / 마지막 달 파일만 읽음
+    """
+    utils.ensure_dataset(name)
+    months = utils.dataset_months(name)
+    first = pd.read_parquet(utils.partition_path(name, *months[0]))
+    last = first if len(months) == 1 else pd.read_parquet(utils.partition_path(name, *months[-1]))
+    keys = {"start": first.date.min(), "end": last.date.max(), "stores": sorted(last.store_nbr.unique().tolist())}
+    if "family" in last.columns:
+        keys["families"] = sorted(last.family.astype(str).unique().tolist())
+    return keys
+
+def frame_keys(dataframe):
+    """
+    메모리에 있는 테이블의 필터 선택지
+    """
+    keys = {}
+    if "date" in dataframe.columns:
+        keys["start"], keys["end"] = dataframe.date.min(), dataframe.date.max()
+    if "store_nbr" in dataframe.columns:
+        keys["stores"] = sorted(dataframe.store_nbr.unique().tolist())
+    if "family" in dataframe.columns:
+        keys["families"] = sorted(dataframe.family.astype(str).unique().tolist())
+    return keys
+
+def month_expression(year, month):
+    return (ds.field("year") == year) & (ds.field("month") == month)
+
+def group_counts(name, sort, filters):
+    """
+    정렬 순서(오름차순)대로 나열한 그룹과 그룹 별 행 수
+    반환값 : DataFrame (group, rows) - group 은 date 정렬이면 (year, month), 아니면 정렬 컬럼 값
+    """
+    dataset = open_dataset(name)
+    expression = utils.dataset_filter(**filters)
+    if sort == "date":
+        months = utils.dataset_months(name)
+        ## 필터가 없으면 파일 메타데이터의 행 수만 사용
+        rows = [dataset.count_rows(filter=month_expression(year, month) if expression is None
+                                   else month_expression(year, month) & expression) for year, month in months]
+        return pd.DataFrame({"group": months, "rows": rows})
+
+    values = dataset.to_table(columns=[sort], filter=expression).column(sort).to_pandas()
+    if not pd.api.types.is_numeric_dtype(values):
+        values = values.astype(str)
+    counts = values.value_counts(sort=False).sort_index()
+    return pd.DataFrame({"group": counts.index.tolist(), "rows": counts.to_numpy()})
+
+def read_groups(name, sort, groups, filters):
+    """
+    선택한 그룹의 행만 읽는 함수
+    """
+    dataset = open_dataset(name)
+    if sort == "date":
+        ## 페이지가 걸치는 달은 연속이므로 year / month 구간으로 필터
+        month = ds.field("year") * 100 + ds.field("month")
+        group_filter = (month >= min(y * 100 + m for y, m in groups)) & (month <= max(y * 100 + m for y, m in groups))
+    else:
+        group_filter = ds.field(sort).isin(list(groups))
+    expression = utils.dataset_filter(**filters)
+    expression = group_filter if expression is None else group_filter & expression
+    table = dataset.to_table(columns=[c for c in dataset.schema.names if c not in ("year", "month")], filter=expression)
+    dataframe = table.to_pandas()
+    return dataframe.astype({c: t for c, t in utils.table_dtypes[name].items() if c in dataframe.columns})
+
+def page_from_groups(name, counts, offset, size, sort, ascending, filters):
+    """
+    offset 번째 행부터 size 개의 행 (counts : group_counts 결과)
+    페이지가 걸치는 그룹만 읽어서 정렬한 뒤 잘라냄
+    """
+    counts = counts if ascending else counts.iloc[::-1].reset_index(drop=True)
+    end = np.cumsum(counts.rows.to_numpy())
+    begin = end - counts.rows.to_numpy()
+    selected = (end > offset) & (begin < offset + size)
+    if not selected.any():
+        return None
+    dataframe = read_groups(name, sort, counts.group[selected].tolist(), filters)
+    dataframe = dataframe.sort_values(sort_keys(dataframe, sort), ascending=ascending, kind="stable")
+    start = offset - int(begin[selected][0])
+    return dataframe.iloc[start:start + size].reset_index(drop=True)
+
+def page_from_frame(dataframe, offset, size, sort, ascending, filters):
+    """
+    메모리에 있는 테이블의 한 페이지 (분할 저장하지 않는 테이블용)
+    """
+    filters = {k: v for k, v in filters.items() if filter_columns[k] in dataframe.columns}
+    dataframe = utils.filter_table(dataframe, **filters)
+    if sort is not None and sort in dataframe.columns:
+        dataframe = dataframe.sort_values(sort_keys(dataframe, sort), ascending=ascending, kind="stable")
+    return dataframe.iloc[offset:offset + size].reset_index(drop=True), len(dataframe)
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+import utils
+import cleaning
+import rollup
+import ab_test
+import holiday_features
+
+
+## Out-of-core (청크) 처리
+## train 을 utils.chunk_rows 행(날짜 구간) 단위로 읽고, 청크마다 서로 더할 수 있는 통계량만 남겨서
+## 최대 메모리가 데이터 크기가 아니라 청크 크기에 비례하도록 함
+## - 정제 : 1차로 (매장, 제품군) 별 Sales 합계를 모아 판매하지 않는 조합을 찾고, 2차로 청크마다 마스크 적용
+## - 휴일 결합 : (date, store_nbr) 압축 피처 테이블을 한 번 만들고 청크마다 결합
+## - 집계 : 청크 별 rollup 을 더해서 합침 (rollup.merge_rollups)
+## - A/B Test : 그룹 별 적률과 히스토그램을 더해서 합침 (ab_test.ABStats)
+## 청크 처리는 집계(rollup)와 휴일 A/B Test 에만 적용됨
+## 휴일 피처(Holidays 페이지), transactions_sales, cleaned_train(매장-제품군 시계열 통계), 예측 모델은
+## streaming 모드에서도 train 전체를 메모리에 읽으므로 최대 메모리가 데이터 크기에 비례함
+
+def train_chunks(columns=None, rows=None):
+    return utils.iter_table("train", columns=columns, rows=rows)
+
+def add_totals(totals, part):
+    """
+    매장 / 제품군 별 Sales 합계를 더하는 함수 (청크마다 family category 가 다를 수 있으므로 값 기준으로 더함)
+    """
+    part = part.copy()
+    part.index = part.index.set_levels(part.index.levels[1].astype(str), level=1)
+    return part if totals is None else totals.add(part, fill_value=0)
+
+def pair_totals(openings=None, rows=None):
+    """
+    오픈 전 기간을 제외한 매장 / 제품군 별 Sales 합계 (청크 별 합계를 더해서 계산)
+    """
+    openings = cleaning.store_openings if openings is None else openings
+    totals = None
+    for chunk in train_chunks(["date", "store_nbr", "family", "sales"], rows):
+        totals = add_totals(totals, cleaning.pair_totals(chunk[cleaning.opening_mask(chunk, openings)]))
+    return totals
+
+def inactive_pairs(openings=None, rows=None):
+    """
+    오픈 전 기간을 제외하고 전체 기간 동안 판매가 없는 매장 / 제품군 조합
+    """
+    return cleaning.pairs_from_totals(pair_totals(openings, rows))
+
+def cleaned_chunks(pairs, openings=None, columns=None, rows=None):
+    """
+    매장 오픈 전 기간과 판매하지 않는 조합을 제거한 train 청크
+    """
+    for chunk in train_chunks(columns, rows):
+        yield cleaning.clean_train(chunk, openings=openings, pairs=pairs)[0]
+
+def sales_rollups(stores, pairs=None, openings=None, rows=None):
+    """
+    정제된 train 의 일별 / 월별 집계 (rollup.build_rollups 와 같은 결과)
+    """
+    pairs = inactive_pairs(openings, rows) if pairs is None else pairs
+    result = None
+    for chunk in cleaned_chunks(pairs, openings, columns=["date", "store_nbr", "family", "sales", "onpromotion"], rows=rows):
+        part = rollup.build_rollups(chunk, stores)
+        result = part if result is None else rollup.merge_rollups(result, part)
+    return result
+
+def holiday_ab_stats(holidays, stores, rows=None, table=None):
+    """
+    휴일 / 이벤트 컬럼별 Sales A/B Test 통계량 (청크마다 휴일 피처를 결합해 누적)
+    table : 압축 휴일 피처 테이블 (없으면 새로 계산)
+    """
+    if table is None:
+        table = holiday_features.holiday_table(holidays, stores, holidays.date.min(), holidays.date.max())
+    stats = ab_test.ABStats(holiday_features.holiday_columns(table))
+    for chunk in train_chunks(["date", "store_nbr", "sales"], rows):
+        stats.update(holiday_features.join_holiday_table(chunk, table, sparse=False), "sales")
+    return stats
+
+def holiday_ab_tests(holidays, stores, rows=None, table=None):
+    """
+    휴일 / 이벤트 컬럼별 Sales A/B Test 결과 (AB_Test_batch 와 같은 형식)
+    검정 방식을 고르는 규칙은 AB_Test_batch 와 같음 (Shapiro 는 무작위 표본, Levene / Mann-Whitney U / 중앙값은 히스토그램 근사)
+    """
+    return holiday_ab_stats(holidays, stores, rows, table).result()
+
+
+if __name__ == "__main__":
+    ## 청크 처리로 집계를 계산해 rollup 저장소에 기록 (python chunked.py)
+    stores = utils.read_table("stores")
+    rollups = sales_rollups(stores, openings=cleaning.read_openings(utils.openings_path))
+    rollup.write_rollups(rollups, utils.cache_dir, utils.version_key(utils.data_version("train", "stores", "openings")))
+    print(holiday_ab_tests(utils.read_table("holidays"), stores))
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+import os
+import pandas as pd
+import numpy as np
+
+# 예측 기간 (test.csv 의 16일)
+test_start = "2017-08-16"
+test_end = "2017-08-31"
+
+# 매장 오픈 일자 (오픈 전 기간의 판매 기록은 이상치로 제거)
+store_openings = pd.DataFrame({
+    "store_nbr": [52, 22, 42, 21, 29, 20, 53, 36],
+    "opening_date": pd.to_datetime(["2017-04-20", "2015-10-09", "2015-08-21", "2015-07-24",
+                                    "2015-03-20", "2015-02-13", "2014-05-29", "2013-05-09"]),
+})
+
+
+def merge_openings(openings, new):
+    """
+    오픈 일자 목록에 새로 오픈한 매장의 오픈 일자를 추가한 목록 (이미 있는 매장은 기존 값 유지)
+    """
+    new = new.astype({"store_nbr": "int64"}).assign(opening_date=pd.to_datetime(new.opening_date))
+    return pd.concat([openings, new], ignore_index=True).drop_duplicates("store_nbr", keep="first").reset_index(drop=True)
+
+def read_openings(path):
+    """
+    store_openings 에 추가 적재로 저장된 신규 매장의 오픈 일자(path, 없으면 무시)를 더한 목록
+    """
+    if not os.path.exists(path):
+        return store_openings
+    return merge_openings(store_openings, pd.read_csv(path, parse_dates=["opening_date"]))
+
+def detect_store_openings(train):
+    """
+    매장별 첫 판매(sales > 0) 일자로 오픈 일자를 찾는 함수
+    데이터 시작일부터 판매가 있던 매장은 제외
+    """
+    first_sale = train[train.sales > 0].groupby("store_nbr", observed=True).date.min()
+    first_sale = first_sale[first_sale > train.date.min()]
+    return first_sale.rename("opening_date").reset_index()
+
+def opening_mask(dataframe, openings):
+    """
+    오픈 일자 이후의 행이면 True 인 마스크 (매장 번호로 오픈 일자 배열을 인덱싱해 한 번에 계산)
+    """
+    store = dataframe.store_nbr.to_numpy().astype("int64")
+    size = int(max(store.max(initial=0), openings.store_nbr.max() if len(openings) else 0)) + 1
+
+    cutoff = np.full(size, np.iinfo("int64").min)
+    cutoff[openings.store_nbr.to_numpy().astype("int64")] = openings.opening_date.to_numpy(dtype="datetime64[ns]").view("int64")
+    return dataframe.date.to_numpy(dtype="datetime64[ns]").view("int64") >= cutoff[store]
+
+def pair_totals(train):
+    """
+    매장 / 제품군 조합 별 Sales 합계 (청크 별 결과를 더해서 합칠 수 있음)
+    """
+    return train.groupby(["store_nbr", "family"], observed=True).sales.sum()
+
+def cleaned_pair_totals(train, zero_prediction):
+    """
+    clean_train 결과로 구하는 pair_totals (정제 전 데이터를 다시 읽지 않음)
+    정제된 Train 의 조합 별 합계에 판매하지 않는 조합(zero_prediction)을 합계 0 으로 추가
+    """
+    totals = pair_totals(train)
+    inactive = zero_prediction[["store_nbr", "family"]].drop_duplicates()
+    inactive = inactive.astype({name: totals.index.get_level_values(name).dtype for name in ["store_nbr", "family"]})
+    zeros = pd.Series(0, index=pd.MultiIndex.from_frame(inactive), name=totals.name, dtype=totals.dtype)
+    return pd.concat([totals, zeros]).sort_index()
+
+def pairs_from_totals(totals):
+    """
+    Sales 합계가 0 인 매장 / 제품군 조합
+    """
+    c = totals.reset_index().sort_values(["family", "store_nbr"])
+    return c[c.sales == 0].drop("sales", axis=1).reset_index(drop=True)
+
+def inactive_pairs(train):
+    """
+    전체 기간 동안 판매가 없는 매장 / 제품군 조합
+    """
+    return pairs_from_totals(pair_totals(train))
+
+def pair_mask(dataframe, pairs):
+    """
+    (store_nbr, family) 가 pairs 에 포함되면 True 인 마스크
+    """
+    index = pd.MultiIndex.from_arrays([dataframe.store_nbr, dataframe.family])
+    return index.isin(pd.MultiIndex.from_arrays([pairs.store_nbr, pairs.family]))
+
+def zero_prediction(pairs, start=test_start, end=test_end):
+    """
+    판매하지 않는 조합에 대해 예측 기간 동안 sales 를 0 으로 두는 데이터 (조합 x 날짜 교차곱)
+    """
+    dates = pd.date_range(start, end)
+    return pd.DataFrame({
+        "date": np.tile(dates.values, len(pairs)),
+        "store_nbr": np.repeat(pairs.store_nbr.to_numpy(), len(dates)),
+        "family": np.repeat(pairs.family.to_numpy(), len(dates)),
+        "sales": 0
+    })
+
+def clean_train(train, openings=None, pairs=None):
+    """
+    매장 오픈 전 기간과 판매하지 않는 제품군을 한 번의 마스크로 제거하는 함수
+    openings 를 주지 않으면 store_openings, "auto" 이면 첫 판매 일자로 오픈 일자를 찾음
+    pairs 를 주지 않으면 오픈 전 기간을 제외한 데이터에서 판매하지 않는 조합을 찾음
+    반환값 : (정제된 Train, zero_prediction)
+    """
+    if openings is None:
+        openings = store_openings
+    elif isinstance(openings, str) and openings == "auto":
+        openings = detect_store_openings(train)
+
+    mask = opening_mask(train, openings)
+    if pairs is None:
+        pairs = inactive_pairs(train.loc[mask, ["store_nbr", "family", "sales"]])
+    mask &= ~pair_mask(train, pairs)
+
+    return train[mask].reset_index(drop=True), zero_prediction(pairs)
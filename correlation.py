@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import pandas as pd
+import numpy as np
+from scipy.cluster.hierarchy import linkage, leaves_list
+from scipy.spatial.distance import squareform
+
+
+def dense_matrix(rollup_df, key, value="sales"):
+    """
+    일별 집계(rollup) 데이터를 (날짜 x key) float32 배열로 펼치는 함수 (값이 없는 날은 NaN)
+    반환값 : (배열, 날짜 Index, key Index)
+    """
+    dates, date_idx = np.unique(rollup_df.date.to_numpy(), return_inverse=True)
+    labels = rollup_df[key].astype(str) if isinstance(rollup_df[key].dtype, pd.CategoricalDtype) else rollup_df[key]
+    keys, key_idx = np.unique(labels.to_numpy(), return_inverse=True)
+
+    X = np.full((len(dates), len(keys)), np.nan, dtype="float32")
+    X[date_idx, key_idx] = rollup_df[value].to_numpy(dtype="float32")
+    return X, pd.DatetimeIndex(dates), pd.Index(keys, name=key)
+
+def rank_columns(X):
+    """
+    열마다 순위(동순위는 평균 순위)로 바꾸는 함수 (NaN 은 그대로)
+    """
+    return pd.DataFrame(X).rank(axis=0).to_numpy(dtype="float64")
+
+def pearson(X):
+    """
+    결측을 쌍별로 제외(pairwise complete)한 Pearson 상관계수 행렬
+    행렬곱 네 번(BLAS)으로 모든 열 쌍을 한 번에 계산
+    """
+    X = np.asarray(X, dtype="float64")
+    M = (~np.isnan(X)).astype("float64")
+    X0 = np.where(M > 0, X, 0.0)
+
+    n = M.T @ M
+    sx = X0.T @ M            # sx[i, j] : j 가 있는 날의 i 합계
+    sxx = (X0 * X0).T @ M
+    sxy = X0.T @ X0
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = sxy - sx * sx.T / n
+        var_x = sxx - sx * sx / n
+        corr = cov / np.sqrt(var_x * var_x.T)
+    corr[n < 3] = np.nan
+    return np.clip(corr, -1, 1)
+
+def spearman(X):
+    """
+    결측을 쌍별로 제외(pairwise complete)한 Spearman 상관계수 행렬
+    결측 위치가 같은 열끼리 묶고, 묶음 쌍마다 두 묶음 모두 값이 있는 날만 순위를 매겨 pearson 을 적용
+    (결측 위치가 다른 열 쌍도 DataFrame.corr("spearman") 과 같은 순위를 사용)
+    """
+    X = np.asarray(X, dtype="float64")
+    patterns, group = np.unique(~np.isnan(X).T, axis=0, return_inverse=True)
+    group = group.ravel()
+    corr = np.full((X.shape[1], X.shape[1]), np.nan)
+    for a in range(len(patterns)):
+        for b in range(a, len(patterns)):
+            cols_a, cols_b = np.flatnonzero(group == a), np.flatnonzero(group == b)
+            cols = cols_a if a == b else np.concatenate([cols_a, cols_b])
+            c = pearson(rank_columns(X[np.ix_(patterns[a] & patterns[b], cols)]))
+            if a == b:
+                corr[np.ix_(cols_a, cols_a)] = c
+            else:
+                corr[np.ix_(cols_a, cols_b)] = c[:len(cols_a), len(cols_a):]
+                corr[np.ix_(cols_b, cols_a)] = c[len(cols_a):, :len(cols_a)]
+    return corr
+
+def correlation_matrix(X, labels, method="pearson"):
+    """
+    (날짜 x key) 배열의 key 간 상관계수 행렬 (method : pearson / spearman)
+    """
+    corr = spearman(X) if method == "spearman" else pearson(X)
+    return pd.DataFrame(corr, index=labels, columns=labels)
+
+def cluster_order(corr):
+    """
+    1 - 상관계수를 거리로 계층적 군집화해 비슷한 key 끼리 모이는 순서를 구하는 함수
+    """
+    distance = 1 - corr.fillna(0).to_numpy()
+    np.fill_diagonal(distance, 0)
+    distance = np.clip((distance + distance.T) / 2, 0, 2)
+    return corr.index[leaves_list(linkage(squareform(distance, checks=False), method="average"))]
+
+def reorder(corr, order):
+    return corr.loc[order, order]
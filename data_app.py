@@ -6,36 +6,111 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import plotly.express as px
 import utils
+import prepare
+import browser
+import jobs
+import profiling
 
-def summary(dataframe):
+def browser_controls(name, keys):
+    """
+    데이터 브라우저의 필터 / 정렬 위젯
+    반환값 : (정렬 컬럼, 오름차순 여부, 페이지 크기, 필터 dict)
+    """
+    filters = {}
+    with st.expander("Filter / Sort"):
+        col1, col2, col3 = st.columns(3)
+        if "start" in keys:
+            dates = col1.date_input("DATE", (keys["start"].date(), keys["end"].date()), min_value=keys["start"].date(),
+                                    max_value=keys["end"].date(), key=f"{name}_dates")
+            if len(dates) == 2:
+                filters["start"], filters["end"] = pd.Timestamp(dates[0]), pd.Timestamp(dates[1])
+        if "stores" in keys:
+            filters["stores"] = col2.multiselect("STORE_NBR", keys["stores"], key=f"{name}_stores")
+        if "families" in keys:
+            filters["families"] = col3.multiselect("FAMILY", keys["families"], key=f"{name}_families")
+
+        ## 필터가 날짜 전체 범위이면 필터 없음으로 처리 (캐시 재사용)
+        if filters.get("start") == keys.get("start") and filters.get("end") == keys.get("end"):
+            filters.pop("start", None)
+            filters.pop("end", None)
+
+        columns = [c for c, key in zip(browser.sort_columns, ["start", "stores", "families"]) if key in keys]
+        col1, col2, col3 = st.columns(3)
+        sort = col1.selectbox("SORT", columns, key=f"{name}_sort") if columns else None
+        ascending = col2.radio("ORDER", ["ascending", "descending"], horizontal=True, key=f"{name}_order") == "ascending"
+        size = col3.selectbox("ROWS / PAGE", browser.page_sizes, key=f"{name}_size")
+    return sort, ascending, size, filters
+
+def fig_Profile(report):
+    """
+    컬럼 별 히스토그램 / 값 별 행 수와 날짜 관측 범위
+    """
+    for column, c in report["columns"].items():
+        if "histogram" in c:
+            with st.expander(f"{column} histogram"):
+                edges = np.array(c["histogram"]["edges"])
+                fig = px.bar(x=(edges[:-1] + edges[1:]) / 2, y=c["histogram"]["counts"], labels={"x": column, "y": "count"})
+                st.plotly_chart(fig)
+        if "top" in c:
+            with st.expander(f"{column}.value_counts()"):
+                st.dataframe(pd.Series(c["top"], name="count"), width=500)
+
+    dates = report["dates"]
+    if dates is not None:
+        with st.expander("Date coverage"):
+            st.write(f"{dates['first']} ~ {dates['last']} : {dates['days']:,} days, {dates['missing_days']:,} missing")
+            st.dataframe(pd.Series(dates["missing_dayofweek"], index=["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"], name="missing days"), width=500)
+            if dates["stores"]:
+                st.dataframe(pd.DataFrame(dates["stores"]).set_index("store_nbr"), width=500)
+
+def summary(name):
     """
     요약 정보를 출력하기 위한 함수
+    테이블 전체 대신 필터 / 정렬에 맞는 한 페이지의 행만 읽어서 보여줌
     """
     # 화면 분할을 위한 컬럼 설정 2:1 비율
     col1, col2 = st.columns([2, 1])
 
     with col1:
         st.title("📣 Data")
-        st.dataframe(dataframe, height=810, width=900)
+        sort, ascending, size, filters = browser_controls(name, prepare.browser_keys(name))
+        total = prepare.browser_rows(name, sort, **filters)
+        pages = max((total - 1) // size + 1, 1)
+        page = st.number_input(f"PAGE (1 - {pages:,})", min_value=1, max_value=pages, value=1, key=f"{name}_page")
+        offset = (page - 1) * size
+
+        dataframe = prepare.browser_page(name, offset, size, sort, ascending, **filters) if total else None
+        if dataframe is None:
+            st.info("조건에 맞는 데이터가 없습니다.")
+        else:
+            st.dataframe(dataframe, height=810, width=900)
+            st.caption(f"{offset + 1:,} - {offset + len(dataframe):,} / {total:,} rows")
 
     with col2:
+        # 테이블 요약 리포트는 파일 내용 별로 한 번만 계산해서 저장 (background 작업, python profiling.py 로 미리 계산 가능)
+        report = jobs.result(prepare.table_profile, name, label=f"Profile ({name})")
+        if report is None:
+            return
+        columns = pd.DataFrame(report["columns"]).T
+
         st.title("📣 Data Type")
-        st.dataframe(dataframe.dtypes, height=350, width=500)
+        st.dataframe(columns[["dtype", "distinct", "null_rate"]], height=350, width=500)
 
         st.title("📣 Describe")
-        st.dataframe(dataframe.describe(), height=350, width=500)
+        st.dataframe(profiling.describe(report), height=350, width=500)
+
+        fig_Profile(report)
 
 def data_app():
 
-    train, test, transactions, stores, oil, holidays = utils.load_data()
-    # 데이터 딕셔너리 생성
+    # 데이터 딕셔너리 생성 (선택된 테이블만 읽어 오도록 테이블 이름을 매핑)
     datalist_dict = {
-        "Train": train,
-        "Test": test,
-        "Transactions": transactions,
-        "Stores": stores,
-        "Oil": oil,
-        "Holidays_Events": holidays
+        "Train": "train",
+        "Test": "test",
+        "Transactions": "transactions",
+        "Stores": "stores",
+        "Oil": "oil",
+        "Holidays_Events": "holidays"
     }
 
     # selectbox 생성
@@ -50,22 +125,22 @@ def data_app():
         st.markdown("✔ family는 판매되는 제품 유형을 나타냅니다.")
         st.markdown("✔ sales는 특정 날짜에 특정 가게에서 제품군의 총 매출을 나타냅니다. 제품은 소수점 단위로 판매될 수 있으므로 분수 값이 가능합니다.")
         st.markdown("✔ onpromotion은 특정 날짜에 상점에서 프로모션 중인 제품군의 항목 수를 나타냅니다.")
-        summary(train)
+        summary("train")
     elif datalist == "Test":
         st.markdown("✔ 학습 데이터와 동일한 기능을 가지는 테스트 데이터입니다. 이 파일의 날짜에 대한 목표 매출을 예측할 것입니다.")
         st.markdown("✔ 테스트 데이터의 날짜는 학습 데이터의 마지막 날짜 이후 15일 동안입니다.")
-        summary(test)
+        summary("test")
     elif datalist == "Transactions":
         st.markdown("✔ 올바른 형식의 샘플 제출 파일입니다.")
-        summary(transactions)
+        summary("transactions")
     elif datalist == "Stores":
         st.markdown("✔ 도시, 주, 유형, 클러스터를 포함한 상점 메타데이터입니다.")
         st.markdown("✔ 클러스터는 유사한 상점의 그룹화입니다.")
-        summary(stores)
+        summary("stores")
     elif datalist == "Oil":
         st.markdown("✔ 일일 유가, 학습 및 테스트 데이터 기간 모두의 값을 포함합니다.")
         st.markdown("✔ 에콰도르는 석유 의존국이며, 석유 가격 충격에 매우 민감합니다.")
-        summary(oil)
+        summary("oil")
     elif datalist == "Holidays_Events":
         st.markdown("✔ 메타데이터와 함께 휴일 및 이벤트 정보가 포함된 파일입니다.")
         st.markdown("""✔ 참고: transferred 열에 주목해야 합니다. 
@@ -74,7 +149,7 @@ def data_app():
            예를 들어 Independencia de Guayaquil의 휴일은 2012-10-09에서 2012-10-12로 이전되었으며, 이는 2012-10-12에 기념되었음을 의미합니다. 
            Bridge 유형의 날은 휴일이 추가되는 추가 일입니다. (예 : 긴 주말을 연장하기 위해서). 이런 경우 일반적으로 Bridge에 대한 보상으로 예정되지 않은 근무일(Work Day))로 구성되는 경우가 많습니다. """)
         st.markdown("✔ 추가적인 휴일은 일반적인 달력 휴일에 추가되는 날입니다. 예를 들어, 전형적으로 크리스마스 이브를 휴일로 만드는 것과 같이.")
-        summary(holidays)
+        summary("holidays")
 
 
     # st.subheader(f"{datalist} DATA")
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+import streamlit as st
+import pandas as pd
+import numpy as np
+import plotly.express as px
+
+# 선 하나 당 기본 점 개수 (차트 너비의 픽셀 수 정도)
+default_points = 600
+
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets 다운샘플링 (선택된 점의 위치 배열 반환)
+    x 는 숫자 배열(날짜는 int64 로 변환해서 사용), 정렬되어 있어야 함
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    edges = np.linspace(1, n - 1, n_out - 1).astype("int64")
+
+    selected = np.empty(n_out, dtype="int64")
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        ## 다음 구간의 평균점
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean() if next_end > end else x[-1]
+        avg_y = y[end:next_end].mean() if next_end > end else y[-1]
+        ## 이전 선택점, 다음 구간 평균점과 만드는 삼각형 넓이가 가장 큰 점 선택
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area)) if end > start else start
+        selected[i + 1] = a
+    return np.unique(selected)
+
+def minmax_downsample(df, x, y, color=None, n_points=default_points):
+    """
+    선(color) 별로 n_points / 2 개의 구간을 나누고 구간마다 최소 / 최대 점만 남기는 다운샘플링
+    모든 선을 groupby 한 번으로 처리함
+    """
+    df = df.sort_values([color, x] if color else [x]).reset_index(drop=True)
+    keys = df[color] if color else pd.Series(0, index=df.index)
+    group = keys.groupby(keys, observed=True, sort=False)
+    pos = group.cumcount().to_numpy()
+    size = group.transform("size").to_numpy()
+
+    bucket = pos * max(n_points // 2, 1) // size
+    values = df[y].groupby([keys, bucket], observed=True, sort=False)
+    keep = np.concatenate([values.idxmin().dropna().to_numpy(), values.idxmax().dropna().to_numpy(),
+                           np.flatnonzero(pos == 0), np.flatnonzero(pos == size - 1)]).astype("int64")
+    return df.loc[np.unique(keep)]
+
+def lttb_downsample(df, x, y, color=None, n_points=default_points):
+    """
+    선(color) 별로 LTTB 다운샘플링
+    """
+    df = df.sort_values([color, x] if color else [x]).reset_index(drop=True)
+    groups = df.groupby(color, observed=True, sort=False).indices.values() if color else [np.arange(len(df))]
+    xs = df[x].to_numpy()
+    xs = xs.astype("datetime64[ns]").view("int64") if np.issubdtype(xs.dtype, np.datetime64) else xs
+    ys = df[y].to_numpy()
+    keep = [idx[lttb(xs[idx], ys[idx], n_points)] for idx in groups]
+    return df.loc[np.sort(np.concatenate(keep))] if keep else df
+
+def downsample(df, x, y, color=None, n_points=default_points, method="minmax"):
+    """
+    선 차트 데이터 다운샘플링 (method : "minmax" / "lttb")
+    """
+    if method == "lttb":
+        return lttb_downsample(df, x, y, color, n_points)
+    return minmax_downsample(df, x, y, color, n_points)
+
+def line_chart(df, x, y, color=None, title=None, key=None):
+    """
+    서버에서 다운샘플링한 뒤 그리는 Plotly 선 차트
+    - Full resolution : 다운샘플링 없이 전체 데이터 전송
+    - 기간 : 선택한 기간만 잘라서 다시 다운샘플링 (확대해서 자세히 보기)
+    """
+    key = key or title or y
+    with st.expander("Chart options"):
+        full = st.checkbox("Full resolution", value=False, key=f"{key}_full")
+        method = st.radio("Method", ["minmax", "lttb"], horizontal=True, key=f"{key}_method")
+        n_points = st.slider("Points per line", 100, 5000, default_points, step=100, key=f"{key}_points")
+        if np.issubdtype(df[x].dtype, np.datetime64) and len(df):
+            lo, hi = df[x].min().to_pydatetime(), df[x].max().to_pydatetime()
+            window = st.slider("Period", min_value=lo, max_value=hi, value=(lo, hi), key=f"{key}_window")
+            df = df[(df[x] >= window[0]) & (df[x] <= window[1])]
+
+    a = df if full else downsample(df, x, y, color, n_points, method)
+    st.caption(f"{len(a):,} / {len(df):,} points")
+
+    fig = px.line(a, x=x, y=y, color=color, title=title)
+    st.plotly_chart(fig)
@@ -5,92 +5,28 @@ import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 import plotly.express as px
-from scipy.stats import shapiro
-import scipy.stats as stats
 import utils
+import instrument
+import prepare
+import downsample
+import scatter
+import small_multiples
+import correlation
+import jobs
 
 
-def one_hot_encoder(df, nan_as_category=True):
-    original_columns = list(df.columns)
-    categorical_columns = df.select_dtypes(["category", "object"]).columns.tolist()
-    df = pd.get_dummies(df, columns=categorical_columns, dummy_na=nan_as_category)
-    new_columns = [c for c in df.columns if c not in original_columns]
-    df.columns = df.columns.str.replace(" ", "_")
-    return df, df.columns.tolist()
-
-def AB_Test(dataframe, group, target):
-    # Split A/B
-    groupA = dataframe[dataframe[group]==1][target]
-    groupB = dataframe[dataframe[group]==0][target]
-
-    if len(groupA) < 3:
-        print("Not enough data.")
-        return None
-
-    # Assumption: Normality
-    ntA = shapiro(groupA)[1] < 0.05
-    ntB = shapiro(groupB)[1] < 0.05
-    # H0 : Distribution is Normal - False
-    # H1 : Distaribution is not Normal - True
-
-    if (ntA == False) & (ntB == False): # H0 : Normal Distribution
-        # Parametic Test
-        # Assumption: Homogeneity of variances
-        leveneTest = stats.levene(groupA, groupB)[1] < 0.05
-        # H0 : Homogeneity - False
-        # H1 : Heterogeneous: True
-
-        if leveneTest == False:
-            # Homogeneity
-            ttest = stats.ttest_ind(groupA, groupB, equal_var=True)[1]
-            # H0 : M1 == M2 - False
-            # H1 : M1 != M2 - True
-        else:
-            # Heterogeneous
-            ttest = stats.ttest_ind(groupA, groupB, equal_var=False)[1]
-            # H0 : M1 == M2 - False
-            # H1 : M1 != M2 - True
-    else:
-        # Non-Parametric Test
-        ttest = stats.mannwhitneyu(groupA, groupB)[1]
-        # H0 : M1 == M2 - False
-        # H1 : M1 != M2 - True
-
-    #Result
-    temp = pd.DataFrame({
-        "AB Hypothesis" : [ttest < 0.05],
-        "p-value" : [ttest]
-    })
-    temp["Test Type"] = np.where((ntA == False) & (ntB == False), "Parametric", "Non-Parametric")
-    temp["AB Hypothesis"] = np.where(temp["AB Hypothesis"] == False, "Fail to Reject H0", "Reject H0")
-    temp["Comment"] = np.where(temp["AB Hypothesis"] == "Fail to Reject H0", "A/B groups are similar", "A/B groups are not similar")
-    temp["Feature"] = group
-    temp["GroupA_mean"] = groupA.mean()
-    temp["GroupB_mean"] = groupB.mean()
-    temp["GroupA_median"] = groupA.median()
-    temp["GroupB_median"] = groupB.median()
-
-    # Columns
-    if (ntA == False) & (ntB == False):
-        temp["Homogeneity"] = np.where(leveneTest == False, "Yes", "No")
-        temp = temp[["Feature", "Test Type", "Homogeneity", "AB Hypothesis", "p-value", "Comment", "GroupA_mean", "GroupB_mean", "GroupA_median", "GroupB_median"]]
-    else:
-        temp = temp[["Feature", "Test Type", "AB Hypothesis", "p-value", "Comment", "GroupA_mean", "GroupB_mean", "GroupA_median", "GroupB_median"]]
-
-    return temp
-
-def fig_Transactions_TotalSales_Correlation(temp, transactions):
+@instrument.traced("render")
+def fig_Transactions_TotalSales_Correlation(stats, transactions):
     """
     Transactions 데이터와 Total Sales 간의 상관관계 패턴 파악 하는 그래프
     """
-    # temp = pd.merge(train.groupby(["date", "store_nbr"]).sales.sum().reset_index(), transactions, how="left")
-    st.write("Spearman Correlation between Total Sales and Transactions: {:,.4f}".format(temp.corr("spearman").sales.loc["transactions"]))
+    # stats = prepare.sales_correlation_stats() (캐시된 상관계수)
+    st.write("Spearman Correlation between Total Sales and Transactions: {:,.4f}".format(stats["spearman_transactions"]))
 
-    fig, ax = plt.subplots()
-    fig = px.line(transactions.sort_values(["store_nbr", "date"]), x="date", y="transactions", color="store_nbr", title="Transactions")
-    st.plotly_chart(fig)
+    downsample.line_chart(transactions, x="date", y="transactions", color="store_nbr", title="Transactions")
 
 
+@instrument.traced("render")
 def fig_Transactions_ym_patten1(transactions):
     """
     Transactions 데이터의 연도별, 월별 패턴 파악 하는 그래프
@@ -103,27 +39,28 @@ def fig_Transactions_ym_patten1(transactions):
     fig = px.box(a, x="year", y="transactions", color="month", title="Transactions")
     st.plotly_chart(fig)
 
+@instrument.traced("render")
 def fig_Transactions_ym_patten2(transactions):
     """
     Transactions 데이터의 연도별, 월별 평균 매출 패턴 파악 하는 그래프
     """
-    a = transactions.set_index("date").resample("M").transactions.mean().reset_index()
+    a = transactions.set_index("date").resample("ME").transactions.mean().reset_index()
     a["year"] = a.date.dt.year
 
     fig, ax = plt.subplots()
     fig = px.line(a, x="date", y="transactions", color="year", title="Monthly Average Transactions")
     st.plotly_chart(fig)
 
-def fig_Transactions_Sales_Correlation(temp):
+@instrument.traced("render")
+def fig_Transactions_Sales_Correlation(temp, stats):
     """
     Transactions 데이터와 Sales 간의 상관관계 패턴 파악 하는 그래프
+    점이 많으면 2D 히스토그램으로 그리고, 캐시된 OLS 회귀선을 겹쳐서 그림
     """
-    # temp = pd.merge(train.groupby(["date", "store_nbr"]).sales.sum().reset_index(), transactions, how="left")
-
-    fig, ax = plt.subplots()
-    fig = px.scatter(temp, x="transactions", y="sales", trendline="ols", trendline_color_override="red")
-    st.plotly_chart(fig)
+    # temp = prepare.transactions_sales()
+    scatter.scatter_chart(temp, x="transactions", y="sales", fit=stats["ols_transactions_sales"])
 
+@instrument.traced("render")
 def fig_Transactions_ydw_patten(transactions):
     """
     Transactions 연도별, 요일별 패턴 파악 하는 그래프
@@ -137,6 +74,7 @@ def fig_Transactions_ydw_patten(transactions):
     fig = px.line(a, x="dayofweek", y="transactions", color="year", title="Transactions")
     st.plotly_chart(fig)
 
+@instrument.traced("render")
 def fig_OilPrice(oil):
     """
     Oil Price 누락 값 추가 하는 그래프
@@ -150,95 +88,74 @@ def fig_OilPrice(oil):
     fig = px.line(p.sort_values(["Legend", "date"], ascending=[False, True]), x="date", y="value", color="Legend", title="Daily Oil Price")
     st.plotly_chart(fig)
 
-def fig_OilPrice_Sales_Transactions_patten(temp, oil):
+@instrument.traced("render")
+def fig_OilPrice_Sales_Transactions_patten(temp, stats):
     """
     Oil Price 와 Sales / Oil Price 와 Transactions 패턴 파악 하는 그래프
+    점이 많으면 hexbin(밀도)으로 그리고, 캐시된 OLS 회귀선을 겹쳐서 그림
     """
-    # temp = pd.merge(train.groupby(["date", "store_nbr"]).sales.sum().reset_index(), transactions, how="left")
-    temp = pd.merge(temp, oil, how="left")
+    # temp = prepare.transactions_oil_sales()
     st.write("Correnlation with Daily Oil Prices")
-    st.write(temp.drop(["store_nbr", "dcoilwtico"], axis=1).corr("spearman").dcoilwtico_interpolated.loc[["sales", "transactions"]], "\n")
+    st.write(stats["spearman_oil"], "\n")
 
     fig, ax = plt.subplots(1, 2, figsize=(15, 5))
-    temp.plot.scatter(x="dcoilwtico_interpolated", y="transactions", ax=ax[0])
-    temp.plot.scatter(x="dcoilwtico_interpolated", y="sales", ax=ax[1], color="r")
+    scatter.scatter_ax(ax[0], temp, x="dcoilwtico_interpolated", y="transactions")
+    scatter.scatter_ax(ax[1], temp, x="dcoilwtico_interpolated", y="sales", color="r")
+    for i, key in enumerate(["ols_oil_transactions", "ols_oil_sales"]):
+        fit = stats[key]
+        xs = np.array([temp.dcoilwtico_interpolated.min(), temp.dcoilwtico_interpolated.max()])
+        ax[i].plot(xs, fit["slope"] * xs + fit["intercept"], color="k", linestyle="--")
     ax[0].set_title("Daily Oil Price & Transactions", fontsize=15)
     ax[1].set_title("Daily Oil Price & Sales", fontsize=15)
     st.pyplot(fig)
 
-def fig_OilPrice_family_patten(train, oil):
+@instrument.traced("render")
+def fig_OilPrice_family_patten(panels):
     """
     Oil Price 와 제품군 별 Sales 패턴 파악 하는 그래프
     """
-    a = pd.merge(train.groupby(["date", "family"]).sales.sum().reset_index(), oil.drop("dcoilwtico", axis=1), how="left")
-    c = a.groupby("family").corr("spearman").reset_index()
-    c = c[c.level_1 == "dcoilwtico_interpolated"][["family", "sales"]].sort_values("sales")
-
-    fig, ax = plt.subplots(7, 5, figsize=(20, 20))
-    for i, fam in enumerate(c.family):
-        if i < 6:
-            a[a.family == fam].plot.scatter(x="dcoilwtico_interpolated", y="sales", ax=ax[0, i - 1])
-            ax[0, i - 1].set_title(fam + "\n Correlation:" + str(c[c.family == fam].sales.iloc[0])[:6], fontsize=12)
-            ax[0, i - 1].axvline(x=70, color="r", linestyle="--")
-        if i >= 6 and i < 11:
-            a[a.family == fam].plot.scatter(x="dcoilwtico_interpolated", y="sales", ax=ax[1, i - 6])
-            ax[1, i - 6].set_title(fam + "\n Correlation:" + str(c[c.family == fam].sales.iloc[0])[:6], fontsize=12)
-            ax[1, i - 6].axvline(x=70, color='r', linestyle='--')
-        if i >= 11 and i < 16:
-            a[a.family == fam].plot.scatter(x="dcoilwtico_interpolated", y="sales", ax=ax[2, i - 11])
-            ax[2, i - 11].set_title(fam + "\n Correlation:" + str(c[c.family == fam].sales.iloc[0])[:6], fontsize=12)
-            ax[2, i - 11].axvline(x=70, color='r', linestyle='--')
-        if i >= 16 and i < 21:
-            a[a.family == fam].plot.scatter(x="dcoilwtico_interpolated", y="sales", ax=ax[3, i - 16])
-            ax[3, i - 16].set_title(fam + "\n Correlation:" + str(c[c.family == fam].sales.iloc[0])[:6], fontsize=12)
-            ax[3, i - 16].axvline(x=70, color='r', linestyle='--')
-        if i >= 21 and i < 26:
-            a[a.family == fam].plot.scatter(x="dcoilwtico_interpolated", y="sales", ax=ax[4, i - 21])
-            ax[4, i - 21].set_title(fam + "\n Correlation:" + str(c[c.family == fam].sales.iloc[0])[:6], fontsize=12)
-            ax[4, i - 21].axvline(x=70, color='r', linestyle='--')
-        if i >= 26 and i < 31:
-            a[a.family == fam].plot.scatter(x="dcoilwtico_interpolated", y="sales", ax=ax[5, i - 26])
-            ax[5, i - 26].set_title(fam + "\n Correlation:" + str(c[c.family == fam].sales.iloc[0])[:6], fontsize=12)
-            ax[5, i - 26].axvline(x=70, color='r', linestyle='--')
-        if i >= 31:
-            a[a.family == fam].plot.scatter(x="dcoilwtico_interpolated", y="sales", ax=ax[6, i - 31])
-            ax[6, i - 31].set_title(fam + "\n Correlation:" + str(c[c.family == fam].sales.iloc[0])[:6], fontsize=12)
-            ax[6, i - 31].axvline(x=70, color='r', linestyle='--')
-
-    plt.tight_layout(pad=5)
-    plt.suptitle("Daily Oil Product & Total Family Sales \n", fontsize=20)
-    st.pyplot(fig)
+    # panels = prepare.oil_family_panels() (제품군 별 패널 이미지, 데이터 버전 별로 캐시)
+    small_multiples.show_panels(panels, ncols=5, title="Daily Oil Product & Total Family Sales")
 
-def fig_Train_sales_Correlation(train):
+@instrument.traced("render")
+def fig_Train_sales_Correlation(corr, clustered=False, interactive=False):
     """
     각 매장별 Sales 에 대한 상관 관계 그래프
     """
-    a = train[["store_nbr", "sales"]]
-    a["ind"] = 1
-    a["ind"] = a.groupby("store_nbr").ind.cumsum().values
-    a = pd.pivot(a, index="ind", columns="store_nbr", values="sales").corr()
-
-    mask = np.triu(a.corr())
+    # corr = prepare.sales_correlation(level, method) (일별 집계로 계산해 캐시된 상관계수 행렬)
+    if clustered:
+        corr = correlation.reorder(corr, correlation.cluster_order(corr))
+    name = corr.index.name.replace("_nbr", "")
+
+    if interactive:
+        fig = px.imshow(corr, color_continuous_scale="RdBu_r", zmin=-1, zmax=1, title=f"Correlation among {name}s")
+        fig.update_layout(height=900)
+        st.plotly_chart(fig)
+        return
+
+    mask = np.triu(np.ones_like(corr, dtype=bool))
     fig, ax = plt.subplots(1, 1, figsize=(20, 20))
-    sns.heatmap(a, annot=True, fmt=".1f", cmap="coolwarm", square=True, mask=mask, linewidths=1, cbar=False)
-    plt.title("Correlation among stores", fontsize=20)
+    sns.heatmap(corr, annot=len(corr) <= 60, fmt=".1f", cmap="coolwarm", square=True, mask=mask, linewidths=1, cbar=False)
+    plt.title(f"Correlation among {name}s", fontsize=20)
     st.pyplot(fig)
 
-def fig_Train_store_TotalSales_patten(train):
+@instrument.traced("render")
+def fig_Train_store_TotalSales_patten(store_daily):
     """
-    각 매장 별 Total Sales 패턴 파악
+    각 매장 별 Total Sales 패턴 파악 (store 단위 일별 집계 사용)
     """
-    a = train.set_index("date").groupby("store_nbr").resample("D").sales.sum().reset_index()
+    a = store_daily[["date", "store_nbr", "sales"]]
 
-    fig, ax = plt.subplots()
-    fig = px.line(a, x="date", y="sales", color="store_nbr", title="Daily Total Sales of The Stores")
-    st.plotly_chart(fig)
+    downsample.line_chart(a, x="date", y="sales", color="store_nbr", title="Daily Total Sales of The Stores")
+# 판매 되지 않는 제품 군 예시 (매장, 제품군)
+unsold_pairs = [(10, "LAWN AND GARDEN"), (36, "LADIESWEAR"), (6, "SCHOOL AND OFFICE SUPPLIES"), (14, "BABY CARE"), (53, "BOOKS")]
+
+@instrument.traced("render")
 def fig_unsold_family(train):
     """
     판매 되지 않는 제품 군 파악 하는 그래프
     """
-    c = train.groupby(["family", "store_nbr"]).tail(60).groupby(["family", "store_nbr"]).sales.sum().reset_index()
-
+    # train = prepare.train_series(unsold_pairs) (해당 조합의 시계열만 읽어 옴)
     fig, ax = plt.subplots(1, 5, figsize=(20, 4))
     train[(train.store_nbr == 10) & (train.family == "LAWN AND GARDEN")].set_index("date").sales.plot(ax=ax[0], title="STORE 10 - LAWN AND GARDEN")
     train[(train.store_nbr == 36) & (train.family == "LADIESWEAR")].set_index("date").sales.plot(ax=ax[1], title="STORE 36 - LADIESWEAR")
@@ -247,138 +164,56 @@ def fig_unsold_family(train):
     train[(train.store_nbr == 53) & (train.family == "BOOKS")].set_index("date").sales.plot(ax=ax[4], title="STORE 43 - BOOKS")
     st.pyplot(fig)
 
-def fig_Train_d_family_patten(train):
+@instrument.traced("render")
+def fig_Train_d_family_patten(family_daily):
     """
-    일별 제품 판매 패턴 파악 그래프
+    일별 제품 판매 패턴 파악 그래프 (family 단위 일별 집계 사용)
     """
-    a = train.set_index("date").groupby("family").resample("D").sales.sum().reset_index()
+    a = family_daily[["date", "family", "sales"]]
 
-    fig, ax = plt.subplots()
-    fig = px.line(a, x="date", y="sales", color="family", title="Daily Total Sales of The Family")
-    st.plotly_chart(fig)
+    downsample.line_chart(a, x="date", y="sales", color="family", title="Daily Total Sales of The Family")
 
-def fig_Train_family_patten(train):
+@instrument.traced("render")
+def fig_Train_family_patten(family_monthly):
     """
-    제품별 판매 패턴 파악 그래프
+    제품별 판매 패턴 파악 그래프 (family 단위 월별 집계의 합계 / 행 수로 평균 계산)
     """
-    a = train.groupby("family").sales.mean().sort_values(ascending=False).reset_index()
+    a = family_monthly.groupby("family", observed=True)[["sales", "count"]].sum()
+    a = (a.sales / a["count"]).rename("sales").sort_values(ascending=False).reset_index()
 
     fig, ax = plt.subplots()
     fig = px.bar(a, y="family", x="sales", color="family", title="Which Product Family Preferred more?")
     st.plotly_chart(fig)
 
-def fig_Train_Stores_patten(train, stores):
+@instrument.traced("render")
+def fig_Train_Stores_patten(city_monthly):
     """
-    매장 별 판매 패턴 파악 그래프
+    매장 별 판매 패턴 파악 그래프 (city 단위 월별 집계의 합계 / 행 수로 평균 계산)
     """
-    d = pd.merge(train, stores)
-    d["store_nbr"] = d["store_nbr"].astype("int8")
-    d["year"] = d.date.dt.year
+    d = city_monthly.assign(year=city_monthly.date.dt.year).groupby(["city", "year"], observed=True)[["sales", "count"]].sum()
+    d = (d.sales / d["count"]).rename("sales").reset_index()
 
     fig, ax = plt.subplots()
-    fig = px.line(d.groupby(["city", "year"]).sales.mean().reset_index(), x="year", y="sales", color="city")
+    fig = px.line(d, x="year", y="sales", color="city")
     st.plotly_chart(fig)
 
-def Feature_Engineering_Holidays(holidays, train, test, stores):
-    """
-    휴일 데이터에 대해서 전처리 하는 부분
-    """
-    ## Transferred Holidays(양도된 휴일) 처리
-    tr1 = holidays[(holidays.type == "Holiday") & (holidays.transferred == True)].drop("transferred", axis=1).reset_index(drop=True)
-    tr2 = holidays[(holidays.type == "Transfer")].drop("transferred", axis=1).reset_index(drop=True)
-    tr = pd.concat([tr1, tr2], axis=1)
-    tr = tr.iloc[:, [5, 1, 2, 3, 4]]
-
-    holidays = holidays[(holidays.transferred == False) & (holidays.type != "Transfer")].drop("transferred", axis=1)
-    holidays = pd.concat([holidays, tr]).reset_index(drop=True)
-
-    ## Additional Holidays(추가된 휴일) 처리
-    holidays["description"] = holidays["description"].str.replace("-", "").str.replace("+", "").str.replace("\d+","")
-    holidays["type"] = np.where(holidays["type"] == "Additional", "Holiday", holidays["type"])
-
-    ## Bridge Holidays(브릿지 휴일) 처리
-    holidays["description"] = holidays["description"].str.replace("Puente ", "")
-    holidays["type"] = np.where(holidays["type"] == "Bridge", "Holiday", holidays["type"])
-
-    ## Work Day Holidays(근무 휴일(보상 휴일)) 처리
-    work_day = holidays[holidays.type == "Work Day"]
-    holidays = holidays[holidays.type != "Work Day"]
-
-    ## Events are national(전국 행사) 처리
-    events = holidays[holidays.type == "Event"].drop(["type", "locale", "locale_name"], axis=1).rename({"description": "events"}, axis=1)
-
-    holidays = holidays[holidays.type != "Event"].drop("type", axis=1)
-    regional = holidays[holidays.locale == "Regional"].rename({"locale_name": "state", "description": "holiday_regional"}, axis=1).drop("locale", axis=1).drop_duplicates()
-    national = holidays[holidays.locale == "National"].rename({"description": "holiday_national"}, axis=1).drop(["locale", "locale_name"], axis=1).drop_duplicates()
-    local = holidays[holidays.locale == "Local"].rename({"description": "holiday_local", "locale_name": "city"}, axis=1).drop("locale", axis=1).drop_duplicates()
-
-    d = pd.merge(pd.concat([train, test]), stores)
-    d["store_nbr"] = d["store_nbr"].astype("int8")
-    ## National Holidays & Events(공휴일 및 이벤트)
-    d = pd.merge(d, national, how="left")
-    ## Regional(state 별)
-    d = pd.merge(d, regional, how="left", on=["date", "state"])
-    ## Local(city 별)
-    d = pd.merge(d, local, how="left", on=["date", "city"])
-    ## Work Day(실제 근무일 컬럼이 생성되면 제거)
-    d = pd.merge(d, work_day[["date", "type"]].rename({"type": "IsWorkDay"}, axis=1), how="left")
-    ## EVENT
-    events["events"] = np.where(events.events.str.contains("futbol"), "Futbol", events.events)
-
-    events, events_cat = one_hot_encoder(events, nan_as_category=False)
-    events["events_Dia_de_la_Madre"] = np.where(events.date == "2016-05-08", 1, events["events_Dia_de_la_Madre"])
-    events = events.drop(239)
-
-    d = pd.merge(d, events, how="left")
-    d[events_cat] = d[events_cat].fillna(0)
-
-    ## NEW features
-    d["holiday_national_binary"] = np.where(d.holiday_national.notnull(), 1, 0)
-    d["holiday_local_binary"] = np.where(d.holiday_local.notnull(), 1, 0)
-    d["holiday_regional_binary"] = np.where(d.holiday_regional.notnull(), 1, 0)
-
-    d["national_independence"] = np.where(d.holiday_national.isin(["Batalla de Pichincha", "Independencia de Cuenca", "Independencia de Guayaquil", "Independecia de Guayaquil", "Primer Grito de Independencia"]), 1, 0)
-    d["local_cantonizacio"] = np.where(d.holiday_local.str.contains("Cantonizacio"), 1, 0)
-    d["local_fundacion"] = np.where(d.holiday_local.str.contains("Fundacion"), 1, 0)
-    d["local_independencia"] = np.where(d.holiday_local.str.contains("Independencia"), 1, 0)
-
-    holidays, holidays_cat = one_hot_encoder(d[["holiday_national", "holiday_regional", "holiday_local"]], nan_as_category=False)
-    d = pd.concat([d.drop(["holiday_national", "holiday_regional", "holiday_local"], axis=1), holidays], axis=1)
-
-    he_cols = d.columns[d.columns.str.startswith("events")].tolist() + d.columns[d.columns.str.startswith("holiday")].tolist() + d.columns[d.columns.str.startswith("national")].tolist() + \
-              d.columns[d.columns.str.startswith("local")].tolist()
-    d[he_cols] = d[he_cols].astype("int8")
-
-    d[["family", "city", "state", "type"]] = d[["family", "city", "state", "type"]].astype("category")
-
-    return d
-
 def eda_app():
-    train, test, transactions, stores, oil, holidays = utils.load_data()
     selected_data = st.sidebar.selectbox("SELECT DATA",["Train", "Transactions", "Oil", "Holidays_Events"])
     st.subheader(f"Exploratory Data Structures - {selected_data} DATA")
 
-    # Datetime
-    train["date"] = pd.to_datetime(train.date)
-    test["date"] = pd.to_datetime(test.date)
-    transactions["date"] = pd.to_datetime(transactions.date)
-    oil["date"] = pd.to_datetime(oil.date)
-    holidays["date"] = pd.to_datetime(holidays.date)
-
-    # Data types
-    train.onpromotion = train.onpromotion.astype("float16")
-    train.sales = train.sales.astype("float32")
-    stores.cluster = stores.cluster.astype("int8")
+    # 각 차트는 필요한 데이터(prepare 의 캐시된 파생 데이터)만 가져옴
+    # 무거운 파생 데이터는 background 작업(jobs)으로 계산하고, 끝나기 전에는 진행률만 표시
 
     # Transactions
-    temp = pd.merge(train.groupby(["date", "store_nbr"]).sales.sum().reset_index(), transactions, how="left")
-
     if selected_data == "Transactions":
         selected_chart = st.sidebar.selectbox("SELECT Chart",["1", "2", "3", "4", "5"])
+        transactions = utils.load_table("transactions")
 
         if selected_chart == "1":
             ## Transactions 과 Total Sales 간의 상관관계 패턴 파악
-            fig_Transactions_TotalSales_Correlation(temp, transactions)
+            stats = jobs.result(prepare.sales_correlation_stats, label="Correlation stats")
+            if stats is not None:
+                fig_Transactions_TotalSales_Correlation(stats, transactions)
         if selected_chart == "2":
             ## Transactions 연도별, 월별 패턴 파악
             fig_Transactions_ym_patten1(transactions)
@@ -387,28 +222,33 @@ def eda_app():
             fig_Transactions_ym_patten2(transactions)
         if selected_chart == "4":
             ## Transactions 와 Sales 간의 상관관계 그래프
-            fig_Transactions_Sales_Correlation(temp)
+            temp = jobs.result(prepare.transactions_sales, label="Transactions / Sales")
+            stats = jobs.result(prepare.sales_correlation_stats, label="Correlation stats")
+            if temp is not None and stats is not None:
+                fig_Transactions_Sales_Correlation(temp, stats)
         if selected_chart == "5":
             ## Transactions 연도별, 요일별 패턴 파악
             fig_Transactions_ydw_patten(transactions)
 
     # Oil
-    oil = oil.set_index("date").dcoilwtico.resample("D").sum().reset_index()
-    oil["dcoilwtico"] = np.where(oil["dcoilwtico"] == 0, np.nan, oil["dcoilwtico"])
-    oil["dcoilwtico_interpolated"] = oil.dcoilwtico.interpolate()
-
     if selected_data == "Oil":
         selected_chart = st.sidebar.selectbox("SELECT Chart", ["1", "2", "3"])
+        oil = prepare.oil_daily()
 
         if selected_chart == "1":
             ## Oil Price 누락 값 추가
             fig_OilPrice(oil)
         if selected_chart == "2":
             ## Oil Price 와 Sales / Transactions 패턴 파악
-            fig_OilPrice_Sales_Transactions_patten(temp, oil)
+            temp = jobs.result(prepare.transactions_oil_sales, label="Transactions / Oil / Sales")
+            stats = jobs.result(prepare.sales_correlation_stats, label="Correlation stats")
+            if temp is not None and stats is not None:
+                fig_OilPrice_Sales_Transactions_patten(temp, stats)
         if selected_chart == "3":
             ## Oil Price 와 제품군 별 Sales 패턴 파악
-            fig_OilPrice_family_patten(train, oil)
+            panels = jobs.result(prepare.oil_family_panels, label="Oil / family panels")
+            if panels is not None:
+                fig_OilPrice_family_patten(panels)
 
 
     # Sales
@@ -416,72 +256,54 @@ def eda_app():
         selected_chart = st.sidebar.selectbox("SELECT Chart", ["1", "2", "3", "4", "5", "6"])
 
         if selected_chart == "1":
-            fig_Train_sales_Correlation(train)
+            level = st.sidebar.selectbox("Level", ["store", "family", "cluster"])
+            method = st.sidebar.selectbox("Method", ["pearson", "spearman"])
+            clustered = st.sidebar.checkbox("Clustered order")
+            interactive = st.sidebar.checkbox("Interactive")
+            corr = jobs.result(prepare.sales_correlation, level, method, label="Sales correlation")
+            if corr is not None:
+                fig_Train_sales_Correlation(corr, clustered, interactive)
         if selected_chart == "2":
-            fig_Train_store_TotalSales_patten(train)
-
-        ## 이상치 제거 : 매장별로 오픈하기 전의 시점
-        train = train[~((train.store_nbr == 52) & (train.date < "2017-04-20"))]
-        train = train[~((train.store_nbr == 22) & (train.date < "2015-10-09"))]
-        train = train[~((train.store_nbr == 42) & (train.date < "2015-08-21"))]
-        train = train[~((train.store_nbr == 21) & (train.date < "2015-07-24"))]
-        train = train[~((train.store_nbr == 29) & (train.date < "2015-03-20"))]
-        train = train[~((train.store_nbr == 20) & (train.date < "2015-02-13"))]
-        train = train[~((train.store_nbr == 53) & (train.date < "2014-05-29"))]
-        train = train[~((train.store_nbr == 36) & (train.date < "2013-05-09"))]
-
-        ## 불필요한 값 제거 : 매장별로 판매하지 않는 제품 파악
-        c = train.groupby(["store_nbr", "family"]).sales.sum().reset_index().sort_values(["family", "store_nbr"])
-        c = c[c.sales == 0]
-
-        outer_join = train.merge(c[c.sales == 0].drop("sales", axis=1), how="outer", indicator=True)
-        train = outer_join[~(outer_join._merge == "both")].drop("_merge", axis=1)
-
-        zero_prediction = []
-        for i in range(0, len(c)):
-            zero_prediction.append(pd.DataFrame({
-                "date": pd.date_range("2017-08-16", "2017-08-31").tolist(),
-                "store_nbr": c.store_nbr.iloc[i],
-                "family": c.family.iloc[i],
-                "sales": 0
-            }))
-        zero_prediction = pd.concat(zero_prediction)
+            fig_Train_store_TotalSales_patten(prepare.sales_rollup("store", "D"))
 
+        ## 이상치 제거 / 불필요한 값 제거 는 prepare.cleaned_train 에서 처리
         if selected_chart == "3":
             ## 판매 되지 않는 제품군 파악
-            fig_unsold_family(train)
+            fig_unsold_family(prepare.train_series(unsold_pairs))
 
         if selected_chart == "4":
             ## 일별 제품 판매 패턴 파악
-            fig_Train_d_family_patten(train)
+            fig_Train_d_family_patten(prepare.sales_rollup("family", "D"))
 
         if selected_chart == "5":
             ## 제품별 판매 패턴 파악
-            fig_Train_family_patten(train)
+            fig_Train_family_patten(prepare.sales_rollup("family", "M"))
 
         if selected_chart == "6":
             ## 매장 별 판매 패턴
-            fig_Train_Stores_patten(train, stores)
+            fig_Train_Stores_patten(prepare.sales_rollup("city", "M"))
 
     # Holidays and Events
-    d = Feature_Engineering_Holidays(holidays, train, test, stores)
     if selected_data == "Holidays_Events":
         selected_chart = st.sidebar.selectbox("SELECT Chart", ["1", "2", "3"])
 
         if selected_chart == "1":
-            st.write(d)
+            d = jobs.result(prepare.holiday_features, label="Holiday features")
+            if d is None:
+                return
+            st.write(prepare.to_dense(d.head(1000)))
 
         if selected_chart == "2":
-            ## Apply A/B Testing
-            he_cols = d.columns[d.columns.str.startswith("events")].tolist() + d.columns[d.columns.str.startswith("holiday")].tolist() + d.columns[d.columns.str.startswith("national")].tolist() + \
-                      d.columns[d.columns.str.startswith("local")].tolist()
-
-            ab = []
-            for i in he_cols:
-                ab.append(AB_Test(dataframe=d[d.sales.notnull()], group=i, target="sales"))
-            ab = pd.concat(ab)
-            st.write(ab)
+            ## Apply A/B Testing (모든 휴일/이벤트 컬럼을 한 번에 검정)
+            ## 청크 처리 모드에서는 휴일 피처 전체를 만들지 않고 청크 별 통계량으로 검정
+            result = jobs.result(prepare.holiday_ab_tests, label="Holiday A/B tests")
+            if result is not None:
+                st.write(result)
 
         if selected_chart == "3":
             ## Events(Futbol) 과 제품군 패턴
-            st.write(d.groupby(["family", "events_Futbol"]).sales.mean()[:60])
\ No newline at end of file
+            d = jobs.result(prepare.holiday_features, label="Holiday features")
+            if d is None:
+                return
+            a = prepare.to_dense(d[["family", "events_Futbol", "sales"]])
+            st.write(a.groupby(["family", "events_Futbol"], observed=True).sales.mean()[:60])
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+
+# 결측 보간 방식
+# - linear : 앞뒤 관측값 사이를 선형 보간 (마지막 관측값 이후는 마지막 값 유지)
+# - ffill : 직전 관측값 유지
+# - seasonal : 요일(period) 별 평균을 뺀 값을 선형 보간한 뒤 다시 더함
+fill_methods = ["linear", "ffill", "seasonal"]
+
+
+def fill_linear(values):
+    observed = np.flatnonzero(~np.isnan(values))
+    if len(observed) == 0:
+        return values.copy()
+    ## 첫 관측값 이전은 NaN 으로 둠 (pandas interpolate 와 같음)
+    return np.interp(np.arange(len(values)), observed, values[observed], left=np.nan, right=values[observed[-1]])
+
+def fill_ffill(values):
+    observed = ~np.isnan(values)
+    index = np.maximum.accumulate(np.where(observed, np.arange(len(values)), -1))
+    return np.where(index >= 0, values[np.maximum(index, 0)], np.nan)
+
+def fill_seasonal(values, period=7, phase=0):
+    """
+    phase : values[0] 의 주기 내 위치 (요일)
+    """
+    position = (np.arange(len(values)) + phase) % period
+    observed = ~np.isnan(values)
+    if not observed.any():
+        return values.copy()
+    ## 주기 내 위치 별 평균과 전체 평균의 차이 (관측값이 없는 위치는 0)
+    total = np.bincount(position[observed], weights=values[observed], minlength=period)
+    count = np.bincount(position[observed], minlength=period)
+    profile = np.where(count > 0, total / np.maximum(count, 1) - values[observed].mean(), 0.0)
+    return fill_linear(values - profile[position]) + profile[position]
+
+def fill(values, method="linear", period=7, phase=0):
+    """
+    일 단위 배열의 결측(NaN)을 method 로 채우는 함수 (0 은 실제 값으로 취급)
+    """
+    values = np.asarray(values, dtype="float64")
+    if method == "linear":
+        return fill_linear(values)
+    if method == "ffill":
+        return fill_ffill(values)
+    if method == "seasonal":
+        return fill_seasonal(values, period, phase)
+    raise ValueError(f"Unknown fill method: {method} ({', '.join(fill_methods)})")
+
+
+class DailySeries:
+    """
+    일 단위 달력(start 부터 연속된 날짜) 에 맞춘 외생 변수 시계열 (예: 유가)
+    observed : 관측값 (없는 날은 NaN), values : 보간한 값 - 모두 float32 배열
+    날짜는 HolidayCalendar 와 같이 start 로부터의 일 수로 조회함 (pd.merge 대신 배열 인덱싱)
+    """
+
+    def __init__(self, start, observed, method="linear", values=None):
+        self.start = pd.Timestamp(start).normalize()
+        self.observed = np.asarray(observed, dtype="float32")
+        self.method = method
+        if values is None:
+            values = fill(self.observed, method, phase=self.start.dayofweek)
+        self.values = np.asarray(values, dtype="float32")
+
+    @classmethod
+    def from_frame(cls, df, value, method="linear", start=None, end=None):
+        """
+        date / value 컬럼을 가진 데이터로 일 단위 달력을 만드는 함수
+        (같은 날짜가 여러 번 나오면 마지막 값을 사용)
+        """
+        start = pd.Timestamp(start if start is not None else df.date.min()).normalize()
+        end = pd.Timestamp(end if end is not None else df.date.max()).normalize()
+        df = df[["date", value]].dropna().drop_duplicates("date", keep="last")
+        observed = np.full((end - start).days + 1, np.nan, dtype="float32")
+        off = (df.date.to_numpy(dtype="datetime64[D]") - np.datetime64(start.date(), "D")).astype("int64")
+        valid = (off >= 0) & (off < len(observed))
+        observed[off[valid]] = df[value].to_numpy(dtype="float32")[valid]
+        return cls(start, observed, method)
+
+    @property
+    def end(self):
+        return self.start + pd.Timedelta(days=len(self.values) - 1)
+
+    @property
+    def dates(self):
+        return pd.date_range(self.start, periods=len(self.values))
+
+    def offsets(self, dates):
+        """
+        start 로부터의 일 수
+        """
+        dates = pd.to_datetime(pd.Series(dates)).to_numpy(dtype="datetime64[D]")
+        return (dates - np.datetime64(self.start.date(), "D")).astype("int64")
+
+    def lookup(self, dates, observed=False):
+        """
+        날짜 배열의 값을 한 번에 조회하는 함수 (달력 범위 밖의 날짜는 NaN)
+        """
+        array = self.observed if observed else self.values
+        off = self.offsets(dates)
+        valid = (off >= 0) & (off < len(array))
+        return np.where(valid, array[np.where(valid, off, 0)], np.float32(np.nan)).astype("float32")
+
+    def extend(self, df, value):
+        """
+        마지막 날짜 이후의 새 관측값을 붙이고 마지막 관측일 이후 구간만 다시 보간하는 함수
+        (linear / ffill 은 그 이전 구간이 새 데이터의 영향을 받지 않음, seasonal 은 요일 별 평균이 바뀌므로 전체를 다시 보간)
+        """
+        df = df[df.date > self.end]
+        if len(df) == 0:
+            return self
+        tail = DailySeries.from_frame(df, value, start=self.end + pd.Timedelta(days=1))
+        observed = np.concatenate([self.observed, tail.observed])
+        if self.method == "seasonal":
+            return DailySeries(self.start, observed, self.method)
+
+        last = np.flatnonzero(~np.isnan(self.observed))
+        last = last[-1] if len(last) else 0
+        values = np.concatenate([self.values[:last], fill(observed[last:], self.method).astype("float32")])
+        return DailySeries(self.start, observed, self.method, values)
+
+    def frame(self, name):
+        """
+        date / name (관측값) / name_interpolated (보간한 값) 데이터
+        """
+        return pd.DataFrame({"date": self.dates, name: self.observed, f"{name}_interpolated": self.values})
+
+    def save(self, path):
+        np.savez(path, start=np.datetime64(self.start.date(), "D"), observed=self.observed, values=self.values,
+                 method=np.array(self.method))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            return cls(pd.Timestamp(f["start"][()]), f["observed"], str(f["method"]), f["values"])
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+import pandas as pd
+import numpy as np
+
+
+## (store, family) 시계열을 (series x day) 연속 배열로 펼치고
+## lag / rolling / EWM 피처를 배열 연산(slice, 누적합)으로 한 번에 계산
+## 날짜가 빠진 날(예: 12/25, 매장 오픈 전)은 NaN 으로 두어 lag 가 항상 "일 수" 기준이 되도록 함
+
+class SeriesPanel:
+    """
+    (series x day) 배열
+    keys : 시계열 키 (series 순서), dates : 연속된 일 단위 날짜, values : float32 배열 (값이 없는 날은 NaN)
+    series / day : 원본 행 별 (series 위치, day 위치) - 피처를 원본 행 순서로 되돌릴 때 사용
+    """
+
+    def __init__(self, keys, dates, values, series=None, day=None):
+        self.keys = keys
+        self.dates = dates
+        self.values = values
+        self.series = series
+        self.day = day
+
+    @classmethod
+    def from_frame(cls, df, value="sales", keys=("store_nbr", "family"), start=None, end=None):
+        keys = list(keys)
+        codes = df.groupby(keys, observed=True, sort=True).ngroup().to_numpy()
+        key_frame = df[keys].drop_duplicates().sort_values(keys).reset_index(drop=True)
+
+        start = pd.Timestamp(start if start is not None else df.date.min())
+        end = pd.Timestamp(end if end is not None else df.date.max())
+        dates = pd.date_range(start, end)
+        day = ((df.date.to_numpy(dtype="datetime64[D]") - np.datetime64(start.date(), "D"))).astype("int64")
+
+        values = np.full((len(key_frame), len(dates)), np.nan, dtype="float32")
+        valid = (day >= 0) & (day < len(dates))
+        values[codes[valid], day[valid]] = df[value].to_numpy(dtype="float32")[valid]
+        return cls(key_frame, dates, values, codes, day)
+
+    def daily(self, df, value):
+        """
+        다른 컬럼(예: onpromotion)을 같은 (series x day) 배열로 펼치는 함수
+        """
+        values = np.full(self.values.shape, np.nan, dtype="float32")
+        valid = (self.day >= 0) & (self.day < len(self.dates))
+        values[self.series[valid], self.day[valid]] = df[value].to_numpy(dtype="float32")[valid]
+        return values
+
+    def gather(self, array):
+        """
+        (series x day) 피처 배열을 원본 행 순서의 1차원 배열로 되돌리는 함수
+        """
+        day = np.clip(self.day, 0, len(self.dates) - 1)
+        result = array[self.series, day]
+        if array.dtype.kind == "f":
+            result = np.where((self.day >= 0) & (self.day < len(self.dates)), result, np.nan)
+        return result
+
+
+## Kernels (axis=1 이 시간 축)
+
+def lag(X, k):
+    """
+    k 일 전 값
+    """
+    result = np.full(X.shape, np.nan, dtype=X.dtype)
+    if k < X.shape[1]:
+        result[:, k:] = X[:, :X.shape[1] - k]
+    return result
+
+def _cumsum(X):
+    """
+    앞에 0 열을 붙인 누적합 (결측은 0 으로, 결측이 아닌 개수도 함께 반환)
+    """
+    mask = ~np.isnan(X)
+    zero = np.zeros((X.shape[0], 1))
+    s1 = np.concatenate([zero, np.cumsum(np.where(mask, X, 0), axis=1, dtype="float64")], axis=1)
+    s2 = np.concatenate([zero, np.cumsum(np.where(mask, X, 0).astype("float64") ** 2, axis=1)], axis=1)
+    n = np.concatenate([zero, np.cumsum(mask, axis=1, dtype="float64")], axis=1)
+    return s1, s2, n
+
+def rolling(X, window, shift=1, min_periods=1):
+    """
+    shift 일 전까지 window 일 동안의 평균 / 표준편차 (누적합 차이로 계산, 결측 제외)
+    반환값 : (mean, std)
+    """
+    s1, s2, n = _cumsum(X)
+    T = X.shape[1]
+    t = np.arange(T)
+    hi = np.clip(t - shift + 1, 0, T)
+    lo = np.clip(t - shift + 1 - window, 0, T)
+
+    count = n[:, hi] - n[:, lo]
+    total = s1[:, hi] - s1[:, lo]
+    square = s2[:, hi] - s2[:, lo]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = total / count
+        var = (square - total * total / count) / (count - 1)
+    mean[count < min_periods] = np.nan
+    var[count < max(min_periods, 2)] = np.nan
+    return mean.astype("float32"), np.sqrt(np.clip(var, 0, None)).astype("float32")
+
+def ewm_step(state, x, alpha):
+    """
+    지수 가중 평균 상태에 하루(x)를 반영 (결측인 날은 이전 값 유지, 첫 값은 그대로 사용)
+    """
+    return np.where(np.isnan(state), x, np.where(np.isnan(x), state, alpha * x + (1 - alpha) * state))
+
+def ewm_state(X, alpha):
+    """
+    X 의 마지막 날까지 반영한 지수 가중 평균 상태 (series,)
+    """
+    state = np.full(X.shape[0], np.nan, dtype="float32")
+    for t in range(X.shape[1]):
+        state = ewm_step(state, X[:, t], alpha)
+    return state
+
+def ewm(X, alpha, shift=1):
+    """
+    shift 일 전까지의 지수 가중 평균 (결측인 날은 이전 값 유지)
+    시간 축으로 한 번 순회하면서 모든 시계열을 동시에 계산
+    """
+    result = np.full(X.shape, np.nan, dtype="float32")
+    state = np.full(X.shape[0], np.nan, dtype="float32")
+    for t in range(X.shape[1]):
+        state = ewm_step(state, X[:, t], alpha)
+        if t + shift < X.shape[1]:
+            result[:, t + shift] = state
+    return result
+
+def calendar_flags(dates):
+    """
+    날짜 별 요일 / 급여일(15일, 말일) 플래그
+    """
+    dates = pd.DatetimeIndex(dates)
+    return {
+        "dayofweek": dates.dayofweek.to_numpy().astype("int8"),
+        "payday": ((dates.day == 15) | dates.is_month_end).astype("int8"),
+    }
+
+def lag_features(X, lags, windows, shift, alphas=()):
+    """
+    lag / rolling mean, std / EWM 피처 배열
+    반환값 : {피처 이름: (series x day) 배열}
+    """
+    result = {f"lag_{k}": lag(X, k) for k in lags}
+    for window in windows:
+        result[f"rmean_{window}"], result[f"rstd_{window}"] = rolling(X, window, shift=shift)
+    for alpha in alphas:
+        result[f"ewm_{alpha}"] = ewm(X, alpha, shift=shift)
+    return result
+
+
+## Recursive multi-step
+
+def day_features(X, t, lags, windows, alphas=(), shift=1, ewm_states=None):
+    """
+    t 일 하나에 대한 lag / rolling / EWM 피처 (재귀 예측에서 하루씩 계산)
+    ewm_states : {alpha: t - shift 일까지 반영한 EWM 상태} (없으면 처음부터 다시 계산)
+    반환값 : {피처 이름: (series,) 배열}
+    """
+    result = {}
+    for k in lags:
+        result[f"lag_{k}"] = X[:, t - k] if t - k >= 0 else np.full(X.shape[0], np.nan, dtype="float32")
+    for window in windows:
+        hi = max(t - shift + 1, 0)
+        block = X[:, max(hi - window, 0):hi]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            count = (~np.isnan(block)).sum(axis=1)
+            mean = np.where(count >= 1, np.nansum(block, axis=1) / np.maximum(count, 1), np.nan)
+            std = np.where(count >= 2, np.sqrt(np.nansum((block - mean[:, None]) ** 2, axis=1) / np.maximum(count - 1, 1)), np.nan)
+        result[f"rmean_{window}"], result[f"rstd_{window}"] = mean.astype("float32"), std.astype("float32")
+    for alpha in alphas:
+        if ewm_states is not None:
+            result[f"ewm_{alpha}"] = ewm_states[alpha].astype("float32")
+        else:
+            result[f"ewm_{alpha}"] = ewm_state(X[:, :max(t - shift + 1, 0)], alpha)
+    return result
+
+def recursive_forecast(X, start, horizon, predict_fn, lags, windows, alphas=(), shift=1):
+    """
+    start 일부터 horizon 일 동안 하루씩 예측하고, 예측값을 X 에 채워 다음 날의 lag 피처로 사용하는 재귀 예측
+    predict_fn(t, features) : t 일의 피처 dict 를 받아 (series,) 예측값을 반환
+    EWM 은 start - shift 일까지의 상태를 한 번 계산하고, 이후에는 하루씩 (예측값 포함) 반영
+    반환값 : 예측값이 채워진 X 의 복사본
+    """
+    X = X.copy()
+    end = max(start - shift + 1, 0)
+    states = {alpha: ewm_state(X[:, :end], alpha) for alpha in alphas}
+    for t in range(start, start + horizon):
+        ## t - shift 일까지 반영
+        for d in range(end, max(t - shift + 1, 0)):
+            states = {alpha: ewm_step(state, X[:, d], alpha) for alpha, state in states.items()}
+        end = max(end, t - shift + 1)
+        X[:, t] = predict_fn(t, day_features(X, t, lags, windows, alphas, shift, ewm_states=states))
+    return X
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import glob
+import pandas as pd
+import numpy as np
+import xgboost as xgb
+import cleaning
+import features as feature_builder
+
+# 피처 구성이 바뀌면 버전을 올려서 이전 모델을 재사용하지 않도록 함
+feature_version = "v3"
+
+# 예측 기간 (test.csv 의 16일)
+horizon = 16
+
+# 예측 방식 별 lag / rolling / EWM 설정
+# - direct : 모든 lag 가 16일 이상이라 예측 기간 전체를 한 번에 예측
+# - recursive : 짧은 lag 를 쓰고, 하루씩 예측한 값을 다음 날의 lag 로 사용
+strategies = {
+    "direct": {"lags": [16, 17, 18, 19, 20, 21, 28, 35, 42, 364], "windows": [7, 14, 28, 56], "alphas": [0.1, 0.3], "shift": 16},
+    "recursive": {"lags": [1, 2, 3, 4, 5, 6, 7, 14, 21, 28, 364], "windows": [7, 14, 28, 56], "alphas": [0.1, 0.3], "shift": 1},
+}
+
+# 학습에 사용하는 시작 날짜 (학습 시간 제한)
+train_start = "2015-01-01"
+# 증분 학습 시 새로 추가하는 트리 수와 사용하는 최근 기간
+incremental_rounds = 100
+incremental_days = 120
+
+params = {
+    "objective": "reg:squarederror",
+    "eta": 0.05,
+    "max_depth": 8,
+    "subsample": 0.8,
+    "colsample_bytree": 0.8,
+    "min_child_weight": 10,
+    "tree_method": "hist",
+    "nthread": -1,
+    "eval_metric": "rmse",
+}
+num_boost_round = 1000
+early_stopping_rounds = 50
+
+
+def rmsle(y, y_pred):
+    """
+    Root Mean Squared Logarithmic Error (대회 평가 지표)
+    """
+    y = np.clip(np.asarray(y, dtype="float64"), 0, None)
+    y_pred = np.clip(np.asarray(y_pred, dtype="float64"), 0, None)
+    return float(np.sqrt(np.mean((np.log1p(y_pred) - np.log1p(y)) ** 2)))
+
+def build_panel(train, test, stores, oil, calendar):
+    """
+    정제된 Train 과 Test 를 합치고 외생 변수(onpromotion, 유가, 휴일 달력, 매장 정보)를 붙이는 함수
+    oil : prepare.oil_series() (일별 보간 유가 DailySeries), calendar : HolidayCalendar
+    """
+    panel = pd.concat([train.drop("id", axis=1, errors="ignore"), test.drop("id", axis=1, errors="ignore")], ignore_index=True)
+    panel["family"] = panel["family"].astype("category")
+    panel = panel.sort_values(["store_nbr", "family", "date"], kind="stable").reset_index(drop=True)
+
+    ## 매장 정보
+    info = stores.set_index("store_nbr")
+    panel["store_type"] = info["type"].cat.codes.reindex(panel.store_nbr).to_numpy().astype("int8")
+    panel["cluster"] = info["cluster"].reindex(panel.store_nbr).to_numpy().astype("int8")
+    panel["family_code"] = panel.family.cat.codes.astype("int16")
+
+    ## 달력
+    panel["dayofweek"] = panel.date.dt.dayofweek.astype("int8")
+    panel["day"] = panel.date.dt.day.astype("int8")
+    panel["month"] = panel.date.dt.month.astype("int8")
+    panel["payday"] = ((panel.date.dt.day == 15) | panel.date.dt.is_month_end).astype("int8")
+
+    ## 유가
+    panel["oil"] = oil.lookup(panel.date)
+
+    ## 휴일 달력
+    holidays = calendar.lookup_frame(panel)
+    panel["is_holiday"] = holidays.is_holiday.astype("int8")
+    panel["is_workday"] = holidays.is_workday.astype("int8")
+    panel["is_event"] = holidays.is_event.astype("int8")
+    panel["holiday_national"] = holidays.holiday_national.notnull().astype("int8")
+    panel["holiday_regional"] = holidays.holiday_regional.notnull().astype("int8")
+    panel["holiday_local"] = holidays.holiday_local.notnull().astype("int8")
+
+    panel["onpromotion"] = panel["onpromotion"].astype("float32")
+    return panel
+
+def add_lag_features(panel, config):
+    """
+    (store, family) 시계열 별 lag / rolling / EWM 피처 (log1p(sales) 기준)
+    시계열을 (series x day) 배열로 펼쳐 한 번에 계산한 뒤 원래 행 순서로 되돌림
+    반환값 : (panel, SeriesPanel)
+    """
+    panel["target"] = np.log1p(panel.sales.astype("float32"))
+    series_panel = feature_builder.SeriesPanel.from_frame(panel, "target")
+    for name, values in feature_builder.lag_features(series_panel.values, **config).items():
+        panel[name] = series_panel.gather(values)
+    return panel, series_panel
+
+def feature_columns(panel):
+    exclude = {"date", "family", "sales", "target"}
+    return [c for c in panel.columns if c not in exclude]
+
+def make_features(train, test, stores, oil, calendar, strategy="direct"):
+    """
+    학습 / 예측에 쓰는 피처 데이터 (panel), 피처 컬럼 목록, SeriesPanel
+    """
+    panel, series_panel = add_lag_features(build_panel(train, test, stores, oil, calendar), strategies[strategy])
+    return panel, feature_columns(panel), series_panel
+
+def fit_model(X, y, X_valid=None, y_valid=None, previous=None, rounds=num_boost_round):
+    """
+    XGBoost 모델 학습 (모든 CPU 코어 사용)
+    previous(Booster)를 주면 기존 모델에 트리를 추가하는 증분 학습
+    X_valid 를 주면 early stopping 하고, best_iteration 이후에 추가된 트리는 잘라냄
+    (잘라내지 않으면 예측 / 저장 / 증분 학습에 early_stopping_rounds 만큼의 트리가 남음)
+    """
+    dtrain = xgb.DMatrix(X, label=y, nthread=-1)
+    evals = [(dtrain, "train")]
+    stopping = None
+    if X_valid is not None:
+        evals.append((xgb.DMatrix(X_valid, label=y_valid, nthread=-1), "valid"))
+        stopping = early_stopping_rounds
+    booster = xgb.train(params, dtrain, num_boost_round=rounds, evals=evals, early_stopping_rounds=stopping,
+                        xgb_model=previous, verbose_eval=False)
+    if stopping is not None and booster.best_iteration + 1 < booster.num_boosted_rounds():
+        ## best_iteration 은 기존 모델의 트리를 포함한 전체 기준
+        booster = booster[: booster.best_iteration + 1]
+    return booster
+
+def predict(booster, X):
+    """
+    log1p 예측값을 sales 단위로 되돌린 예측
+    """
+    return np.clip(np.expm1(booster.predict(xgb.DMatrix(X, nthread=-1))), 0, None)
+
+def predict_recursive(booster, panel, features, series_panel, rows, config):
+    """
+    rows(panel 의 행 위치)의 날짜를 하루씩 재귀적으로 예측하는 함수
+    rows 에 해당하는 값은 비우고, 예측한 값을 다음 날의 lag / rolling 피처로 사용
+    """
+    day, series = series_panel.day[rows], series_panel.series[rows]
+    X = series_panel.values.copy()
+    X[series, day] = np.nan
+    exog = panel.iloc[rows][features]
+
+    def predict_fn(t, values):
+        on_day = day == t
+        result = np.full(X.shape[0], np.nan, dtype="float32")
+        ## 행이 없는 날 (예: 12월 25일 휴점) 은 예측하지 않음
+        if not on_day.any():
+            return result
+        x = exog[on_day].copy()
+        for name, value in values.items():
+            x[name] = value[series[on_day]]
+        result[series[on_day]] = booster.predict(xgb.DMatrix(x[features], nthread=-1))
+        return result
+
+    start = int(day.min())
+    X = feature_builder.recursive_forecast(X, start, int(day.max()) - start + 1, predict_fn, **config)
+    return np.clip(np.expm1(X[series, day]), 0, None)
+
+def model_dir(root):
+    return os.path.join(root, "models")
+
+def model_path(root, version_key, strategy="direct"):
+    return os.path.join(model_dir(root), f"xgb_{feature_version}_{strategy}_{version_key}.json")
+
+def latest_model(root, strategy="direct"):
+    """
+    같은 피처 버전 / 예측 방식으로 학습된 가장 최근 모델 경로 (없으면 None)
+    """
+    paths = sorted(glob.glob(os.path.join(model_dir(root), f"xgb_{feature_version}_{strategy}_*.json")), key=os.path.getmtime)
+    paths = [p for p in paths if not p.endswith(".meta.json")]
+    return paths[-1] if paths else None
+
+def run(train, test, stores, oil, calendar, root, version_key, incremental=True, strategy="direct", openings=None):
+    """
+    모델을 학습(또는 저장된 모델을 재사용)하고 Test 기간을 예측하는 함수
+    - 같은 데이터 / 피처 버전의 모델이 있으면 읽어서 예측만 수행
+    - 다른 데이터 버전의 모델이 있고 incremental=True 이면 최근 기간으로 트리를 추가 학습
+    - strategy : direct (16일 이상 lag 로 한 번에 예측) / recursive (짧은 lag 로 하루씩 예측)
+    - openings : 매장 오픈 일자 (없으면 cleaning.store_openings)
+    반환값 : {"rmsle", "predictions", "importance", "mode"}
+    """
+    train, zero_prediction = cleaning.clean_train(train, openings=openings)
+    pairs = zero_prediction[["store_nbr", "family"]].drop_duplicates()
+
+    config = strategies[strategy]
+    panel, features, series_panel = make_features(train, test, stores, oil, calendar, strategy)
+    is_test = panel.sales.isnull().to_numpy()
+    in_history = ~is_test & (panel.date >= train_start).to_numpy()
+    history = panel[in_history]
+
+    ## 검증 : 학습 데이터의 마지막 16일 (학습에도 early stopping 에도 쓰지 않음)
+    ## early stopping : 그 앞의 16일
+    valid_start = history.date.max() - pd.Timedelta(days=horizon - 1)
+    stop_start = valid_start - pd.Timedelta(days=horizon)
+    fit_part = history[history.date < stop_start]
+    stop_part = history[(history.date >= stop_start) & (history.date < valid_start)]
+    valid_part = history[history.date >= valid_start]
+
+    path = model_path(root, version_key, strategy)
+    meta_path = path.replace(".json", ".meta.json")
+    if os.path.exists(path):
+        booster = xgb.Booster(model_file=path)
+        mode = "cached"
+    else:
+        previous = latest_model(root, strategy) if incremental else None
+        if previous is not None:
+            ## 증분 학습 : 최근 기간만 사용해 트리를 추가
+            recent = fit_part[fit_part.date >= stop_start - pd.Timedelta(days=incremental_days)]
+            booster = fit_model(recent[features], recent.target, stop_part[features], stop_part.target,
+                                previous=xgb.Booster(model_file=previous), rounds=incremental_rounds)
+            mode = "incremental"
+        else:
+            booster = fit_model(fit_part[features], fit_part.target, stop_part[features], stop_part.target)
+            mode = "full"
+        os.makedirs(model_dir(root), exist_ok=True)
+        booster.save_model(path)
+
+    ## recursive 는 검증 기간도 실제 값 대신 예측값을 lag 로 사용해 Test 예측과 같은 조건으로 평가
+    valid_rows = np.flatnonzero(in_history & (panel.date >= valid_start).to_numpy())
+    if strategy == "recursive":
+        valid_pred = predict_recursive(booster, panel, features, series_panel, valid_rows, config)
+    else:
+        valid_pred = predict(booster, valid_part[features])
+    score = rmsle(valid_part.sales, valid_pred)
+    if mode != "cached":
+        with open(meta_path, "w") as f:
+            json.dump({"feature_version": feature_version, "strategy": strategy, "features": features, "rmsle": score, "mode": mode}, f)
+
+    ## Test 예측 (판매하지 않는 조합은 0)
+    future = panel[is_test]
+    predictions = future[["date", "store_nbr", "family"]].copy()
+    if strategy == "recursive":
+        predictions["sales"] = predict_recursive(booster, panel, features, series_panel, np.flatnonzero(is_test), config)
+    else:
+        predictions["sales"] = predict(booster, future[features])
+    inactive = cleaning.pair_mask(predictions, pairs)
+    predictions.loc[inactive, "sales"] = 0
+    predictions = pd.merge(predictions, test[["id", "date", "store_nbr", "family"]], how="left").sort_values("id")
+
+    importance = pd.Series(booster.get_score(importance_type="gain")).sort_values(ascending=False)
+    return {"rmsle": score, "predictions": predictions, "importance": importance, "mode": mode}
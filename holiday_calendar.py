@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+import pandas as pd
+import numpy as np
+
+
+class HolidayCalendar:
+    """
+    (날짜, 매장) 별 휴일 / 근무일 / 이벤트 달력
+    holiday_features.holiday_tables 로 전처리한 휴일 테이블과 stores 로 한 번만 만들고,
+    (start 로부터의 일 수, store_nbr) 배열 인덱싱으로 조회함
+    같은 날짜, 같은 매장에 휴일이 여러 개면 처음 나온 휴일을 사용
+    """
+
+    def __init__(self, tables, stores, start=None, end=None):
+        dates = pd.concat([tables[key].date for key in ["national", "regional", "local", "work_day", "events"]])
+        self.start = pd.Timestamp(start if start is not None else dates.min()).normalize()
+        self.end = pd.Timestamp(end if end is not None else dates.max()).normalize()
+        self.n_days = (self.end - self.start).days + 1
+        self.n_stores = int(stores.store_nbr.max()) + 1
+        self.stores = stores[["store_nbr", "city", "state"]].copy()
+
+        ## 휴일 이름 (코드 -1 은 휴일 아님)
+        national = tables["national"].rename({"holiday_national": "name"}, axis=1)
+        regional = tables["regional"].rename({"holiday_regional": "name"}, axis=1)
+        local = tables["local"].rename({"holiday_local": "name"}, axis=1)
+        events = tables["events"]
+        event_cols = [c for c in events.columns if c.startswith("events_")]
+        events = pd.DataFrame({"date": events.date, "name": events[event_cols].astype("int8").idxmax(axis=1).str.replace("events_", "", regex=False)})
+        self.holiday_names = pd.Index(pd.concat([national.name, regional.name, local.name]).drop_duplicates().tolist())
+        self.event_names = pd.Index(events.name.drop_duplicates().tolist())
+
+        ## National : 모든 매장 / Regional : state 가 같은 매장 / Local : city 가 같은 매장
+        self.national = self._fill(pd.merge(national, self.stores[["store_nbr"]], how="cross"), self.holiday_names)
+        self.regional = self._fill(pd.merge(regional, self.stores[["store_nbr", "state"]], on="state"), self.holiday_names)
+        self.local = self._fill(pd.merge(local, self.stores[["store_nbr", "city"]], on="city"), self.holiday_names)
+        self.event = self._fill(pd.merge(events, self.stores[["store_nbr"]], how="cross"), self.event_names)
+
+        ## Work Day (locale 에 맞는 매장에만 적용)
+        work_day = tables["work_day"]
+        work_day = pd.concat([
+            pd.merge(work_day[work_day.locale == "National"][["date"]], self.stores[["store_nbr"]], how="cross"),
+            pd.merge(work_day[work_day.locale == "Regional"][["date", "locale_name"]], self.stores[["store_nbr", "state"]], left_on="locale_name", right_on="state")[["date", "store_nbr"]],
+            pd.merge(work_day[work_day.locale == "Local"][["date", "locale_name"]], self.stores[["store_nbr", "city"]], left_on="locale_name", right_on="city")[["date", "store_nbr"]],
+        ])
+        self.workday = np.zeros((self.n_days, self.n_stores), dtype=bool)
+        off, store, valid = self._index(work_day.date, work_day.store_nbr)
+        self.workday[off[valid], store[valid]] = True
+
+        self.holiday = (self.national >= 0) | (self.regional >= 0) | (self.local >= 0)
+
+    def _index(self, dates, stores):
+        off = self.offsets(dates)
+        store = np.asarray(stores, dtype="int64")
+        valid = (off >= 0) & (off < self.n_days) & (store >= 0) & (store < self.n_stores)
+        return off, store, valid
+
+    def _fill(self, rows, names):
+        codes = np.full((self.n_days, self.n_stores), -1, dtype="int16")
+        off, store, valid = self._index(rows.date, rows.store_nbr)
+        code = names.get_indexer(rows.name)
+        ## 처음 나온 휴일을 남기기 위해 역순으로 채움
+        codes[off[valid][::-1], store[valid][::-1]] = code[valid][::-1]
+        return codes
+
+    def offsets(self, dates):
+        """
+        start 로부터의 일 수
+        """
+        dates = pd.to_datetime(pd.Series(dates)).to_numpy(dtype="datetime64[D]")
+        return (dates - np.datetime64(self.start.date(), "D")).astype("int64")
+
+    def lookup(self, dates, stores):
+        """
+        (date, store_nbr) 배열을 한 번에 조회하는 함수
+        반환값 : 휴일 / 근무일 / 이벤트 여부와 휴일 / 이벤트 이름 DataFrame
+        """
+        off, store, valid = self._index(dates, stores)
+        off, store = np.where(valid, off, 0), np.where(valid, store, 0)
+
+        def take(codes, names):
+            code = np.where(valid, codes[off, store], -1)
+            return pd.Categorical.from_codes(code, categories=names)
+
+        return pd.DataFrame({
+            "is_holiday": valid & self.holiday[off, store],
+            "is_workday": valid & self.workday[off, store],
+            "is_event": valid & (self.event[off, store] >= 0),
+            "holiday_national": take(self.national, self.holiday_names),
+            "holiday_regional": take(self.regional, self.holiday_names),
+            "holiday_local": take(self.local, self.holiday_names),
+            "event": take(self.event, self.event_names),
+        })
+
+    def lookup_frame(self, d):
+        """
+        date, store_nbr 컬럼을 가진 데이터 전체를 조회하는 함수 (d 와 같은 인덱스)
+        """
+        result = self.lookup(d.date, d.store_nbr)
+        result.index = d.index
+        return result
+
+    def is_holiday(self, date, store_nbr):
+        return bool(self.lookup([date], [store_nbr]).is_holiday.iloc[0])
+
+    def is_workday(self, date, store_nbr):
+        return bool(self.lookup([date], [store_nbr]).is_workday.iloc[0])
+
+    def describe(self, date, store_nbr):
+        """
+        (date, store_nbr) 의 휴일 / 근무일 / 이벤트 정보
+        """
+        return self.lookup([date], [store_nbr]).iloc[0].to_dict()
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+import pandas as pd
+import numpy as np
+from scipy.sparse import coo_matrix
+import instrument
+
+
+## 휴일 / 이벤트 피처
+## prepare(메모리 적재)와 chunked(청크 처리)가 같이 쓰는 휴일 전처리 / 피처 결합 함수
+
+def one_hot_encoder(df, nan_as_category=True):
+    original_columns = list(df.columns)
+    categorical_columns = df.select_dtypes(["category", "object"]).columns.tolist()
+    df = pd.get_dummies(df, columns=categorical_columns, dummy_na=nan_as_category)
+    new_columns = [c for c in df.columns if c not in original_columns]
+    df.columns = df.columns.str.replace(" ", "_")
+    return df, df.columns.tolist()
+
+def holiday_columns(d):
+    """
+    휴일 / 이벤트 피처 컬럼 목록
+    """
+    return d.columns[d.columns.str.startswith("events")].tolist() + d.columns[d.columns.str.startswith("holiday")].tolist() + d.columns[d.columns.str.startswith("national")].tolist() + \
+           d.columns[d.columns.str.startswith("local")].tolist()
+
+def holiday_tables(holidays):
+    """
+    휴일 데이터를 national / regional / local / work_day / events 테이블로 전처리 하는 부분
+    """
+    ## Transferred Holidays(양도된 휴일) 처리
+    tr1 = holidays[(holidays.type == "Holiday") & (holidays.transferred == True)].drop("transferred", axis=1).reset_index(drop=True)
+    tr2 = holidays[(holidays.type == "Transfer")].drop("transferred", axis=1).reset_index(drop=True)
+    tr = pd.concat([tr1, tr2], axis=1)
+    tr = tr.iloc[:, [5, 1, 2, 3, 4]]
+
+    holidays = holidays[(holidays.transferred == False) & (holidays.type != "Transfer")].drop("transferred", axis=1)
+    holidays = pd.concat([holidays, tr]).reset_index(drop=True)
+
+    ## Additional Holidays(추가된 휴일) 처리
+    holidays["description"] = holidays["description"].str.replace("-", "").str.replace("+", "").str.replace("\d+","")
+    holidays["type"] = np.where(holidays["type"] == "Additional", "Holiday", holidays["type"])
+
+    ## Bridge Holidays(브릿지 휴일) 처리
+    holidays["description"] = holidays["description"].str.replace("Puente ", "")
+    holidays["type"] = np.where(holidays["type"] == "Bridge", "Holiday", holidays["type"])
+
+    ## Work Day Holidays(근무 휴일(보상 휴일)) 처리
+    work_day = holidays[holidays.type == "Work Day"]
+    holidays = holidays[holidays.type != "Work Day"]
+
+    ## Events are national(전국 행사) 처리
+    events = holidays[holidays.type == "Event"].drop(["type", "locale", "locale_name"], axis=1).rename({"description": "events"}, axis=1)
+
+    holidays = holidays[holidays.type != "Event"].drop("type", axis=1)
+    regional = holidays[holidays.locale == "Regional"].rename({"locale_name": "state", "description": "holiday_regional"}, axis=1).drop("locale", axis=1).drop_duplicates()
+    national = holidays[holidays.locale == "National"].rename({"description": "holiday_national"}, axis=1).drop(["locale", "locale_name"], axis=1).drop_duplicates()
+    local = holidays[holidays.locale == "Local"].rename({"description": "holiday_local", "locale_name": "city"}, axis=1).drop("locale", axis=1).drop_duplicates()
+
+    ## EVENT
+    events["events"] = np.where(events.events.str.contains("futbol"), "Futbol", events.events)
+
+    events, events_cat = one_hot_encoder(events, nan_as_category=False)
+    ## 같은 날짜의 이벤트가 여러 개면 한 행으로 합침 (예: 2016-05-08 Terremoto Manabi / Dia de la Madre)
+    events = events.groupby("date", as_index=False)[events_cat].max()
+
+    return {"national": national, "regional": regional, "local": local, "work_day": work_day, "events": events, "events_cat": events_cat}
+
+@instrument.traced("transform")
+def add_holiday_features(d, tables):
+    """
+    매장-일 데이터(date, store_nbr, city, state 포함)에 휴일 / 이벤트 피처를 추가하는 부분
+    """
+    ## National Holidays & Events(공휴일 및 이벤트)
+    d = pd.merge(d, tables["national"], how="left")
+    ## Regional(state 별)
+    d = pd.merge(d, tables["regional"], how="left", on=["date", "state"])
+    ## Local(city 별)
+    d = pd.merge(d, tables["local"], how="left", on=["date", "city"])
+    ## Work Day(실제 근무일 컬럼이 생성되면 제거)
+    d = pd.merge(d, tables["work_day"][["date", "type"]].rename({"type": "IsWorkDay"}, axis=1), how="left")
+    ## EVENT
+    d = pd.merge(d, tables["events"], how="left")
+    d[tables["events_cat"]] = d[tables["events_cat"]].fillna(0)
+
+    ## NEW features
+    d["holiday_national_binary"] = np.where(d.holiday_national.notnull(), 1, 0)
+    d["holiday_local_binary"] = np.where(d.holiday_local.notnull(), 1, 0)
+    d["holiday_regional_binary"] = np.where(d.holiday_regional.notnull(), 1, 0)
+
+    d["national_independence"] = np.where(d.holiday_national.isin(["Batalla de Pichincha", "Independencia de Cuenca", "Independencia de Guayaquil", "Independecia de Guayaquil", "Primer Grito de Independencia"]), 1, 0)
+    d["local_cantonizacio"] = np.where(d.holiday_local.str.contains("Cantonizacio", na=False), 1, 0)
+    d["local_fundacion"] = np.where(d.holiday_local.str.contains("Fundacion", na=False), 1, 0)
+    d["local_independencia"] = np.where(d.holiday_local.str.contains("Independencia", na=False), 1, 0)
+
+    holidays, holidays_cat = one_hot_encoder(d[["holiday_national", "holiday_regional", "holiday_local"]], nan_as_category=False)
+    d = pd.concat([d.drop(["holiday_national", "holiday_regional", "holiday_local"], axis=1), holidays], axis=1)
+
+    he_cols = holiday_columns(d)
+    d[he_cols] = d[he_cols].astype("int8")
+
+    return d
+
+@instrument.traced("transform")
+def holiday_table(holidays, stores, start, end):
+    """
+    (date, store_nbr) 중 휴일 / 이벤트 / 근무일이 있는 행만 남긴 압축 피처 테이블
+    start ~ end 사이의 휴일 날짜 x 전체 매장 조합에 대해서만 피처를 계산
+    """
+    tables = holiday_tables(holidays)
+    dates = pd.concat([tables[key].date for key in ["national", "regional", "local", "work_day", "events"]]).drop_duplicates()
+    dates = dates[(dates >= start) & (dates <= end)]
+
+    keys = pd.merge(pd.DataFrame({"date": dates.sort_values().values}), stores[["store_nbr", "city", "state"]], how="cross")
+    t = add_holiday_features(keys, tables).drop(["city", "state"], axis=1)
+
+    he_cols = holiday_columns(t)
+    t = t[(t[he_cols] != 0).any(axis=1) | t.IsWorkDay.notnull()]
+    return t.set_index(["date", "store_nbr"]).sort_index()
+
+def join_holiday_table(d, table, sparse=True):
+    """
+    압축 피처 테이블을 매장-일 데이터에 (date, store_nbr) 키로 결합하는 함수
+    sparse=True 이면 0 이 대부분인 휴일 / 이벤트 컬럼을 희소(Sparse) 컬럼으로 만듦
+    """
+    he_cols = holiday_columns(table)
+    ## 휴일이 겹치는 날은 테이블에 같은 키가 여러 행 있으므로 left merge 와 같이 행이 늘어남
+    pos = pd.merge(d[["date", "store_nbr"]].reset_index(drop=True).reset_index(),
+                   pd.DataFrame({"row": np.arange(len(table))}, index=table.index).reset_index(), on=["date", "store_nbr"], how="left")
+    d = d.take(pos["index"].to_numpy()).reset_index(drop=True)
+
+    matched = np.flatnonzero(pos.row.notnull().to_numpy())
+    row = pos.row.to_numpy()[matched].astype("int64")
+    d["IsWorkDay"] = pd.Series(table.IsWorkDay.to_numpy()[row], index=matched).reindex(d.index)
+
+    values = table[he_cols].to_numpy()[row]
+    if sparse:
+        rows, cols = np.nonzero(values)
+        matrix = coo_matrix((values[rows, cols], (matched[rows], cols)), shape=(len(d), len(he_cols)))
+        features = pd.DataFrame.sparse.from_spmatrix(matrix.tocsc(), columns=he_cols).astype(pd.SparseDtype("int8", 0))
+    else:
+        features = pd.DataFrame(np.zeros((len(d), len(he_cols)), dtype="int8"), columns=he_cols)
+        features.iloc[matched] = values
+    return pd.concat([d, features], axis=1)
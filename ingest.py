@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+import os
+import argparse
+import pandas as pd
+import numpy as np
+import utils
+import cleaning
+import rollup
+import exogenous
+import prepare
+
+
+## 추가 적재 (Incremental ingest)
+## 새로 들어온 날짜의 train / transactions / oil 만 원본 CSV 와 분할 데이터셋에 추가하고,
+## 파생 데이터 중 새 날짜의 영향을 받는 부분만 갱신해서 새 데이터 버전으로 저장함
+## - 분할 데이터셋 : 새 날짜가 들어가는 year / month 파일만 다시 씀
+## - 일별 / 월별 집계 : 새 날짜의 집계를 기존 집계에 더함 (판매하지 않는 조합이 바뀌면 다음 조회 때 전체 재계산)
+## - 유가 : 마지막 관측일 이후 구간만 다시 보간
+## - 휴일 피처 : 압축 휴일 테이블은 holidays / stores 버전으로만 캐시되므로 다시 계산하지 않음
+## - lag 피처 : 학습 시 (series x day) 배열에서 계산하고, 모델은 forecast 의 증분 학습으로 최근 기간만 추가 학습
+
+
+def save_openings(openings):
+    """
+    새로 오픈한 매장의 오픈 일자를 저장하는 함수 (파일 버전이 바뀌므로 prepare.store_openings() 가 다시 읽음)
+    """
+    if os.path.exists(utils.openings_path):
+        saved = pd.read_csv(utils.openings_path, parse_dates=["opening_date"])
+        openings = pd.concat([saved, openings], ignore_index=True).drop_duplicates("store_nbr", keep="first")
+    openings.to_csv(utils.openings_path, index=False, date_format="%Y-%m-%d")
+
+def last_date(name):
+    """
+    저장된 테이블의 마지막 날짜 (분할 데이터셋은 마지막 달 파일만 읽음)
+    """
+    if name in utils.partitioned_tables:
+        utils.ensure_dataset(name)
+        year, month = utils.dataset_months(name)[-1]
+        return pd.read_parquet(utils.partition_path(name, year, month), columns=["date"]).date.max()
+    return utils.read_table(name, columns=["date"]).date.max()
+
+def read_new(name, path):
+    """
+    새 데이터 CSV 를 테이블과 같은 타입으로 읽고 저장된 마지막 날짜 이후의 행만 남기는 함수
+    """
+    dtypes = {c: t for c, t in utils.table_dtypes[name].items() if c != "id"}
+    new = pd.read_csv(path, dtype=dtypes, parse_dates=utils.table_dates[name])
+    new = new[new.date > last_date(name)].reset_index(drop=True)
+    if name == "train" and "id" not in new.columns:
+        ## id 는 기존 train 의 마지막 id 다음부터
+        start = int(utils.read_dataset("train", columns=["id"], start=last_date("train")).id.max()) + 1
+        new.insert(0, "id", np.arange(start, start + len(new)))
+    return new.astype({c: t for c, t in utils.table_dtypes[name].items() if c in new.columns})
+
+def sold_stores(totals):
+    """
+    기존 데이터에서 판매 기록(sales > 0)이 있는 매장
+    """
+    if totals is None:
+        totals = cleaning.pair_totals(utils.read_dataset("train", columns=["store_nbr", "family", "sales"]))
+    store_totals = totals.groupby(level="store_nbr").sum()
+    return store_totals.index[store_totals > 0]
+
+def detect_new_openings(new, previous_stores):
+    """
+    기존 데이터에 판매 기록이 없던 매장의 첫 판매일 (그 이전 날짜의 행은 오픈 전 기간으로 제거)
+    """
+    new = new[~new.store_nbr.isin(previous_stores) & ~new.store_nbr.isin(prepare.store_openings().store_nbr) & (new.sales > 0)]
+    return new.groupby("store_nbr").date.min().rename("opening_date").reset_index()
+
+def update_rollups(new, totals, old_key, new_key, stores):
+    """
+    기존 집계에 새 날짜의 집계를 더해서 새 데이터 버전으로 저장하는 함수
+    기존 집계가 없거나 판매하지 않는 조합이 바뀌면(과거 행의 포함 여부가 바뀜) 저장하지 않고 다음 조회 때 전체 재계산
+    반환값 : 갱신 여부
+    """
+    old = {(level, freq): rollup.read_rollup(utils.cache_dir, old_key, level, freq) for level in rollup.levels for freq in rollup.freqs}
+    if totals is None or any(v is None for v in old.values()):
+        return False
+
+    openings = prepare.store_openings()
+    opened = new[cleaning.opening_mask(new, openings)]
+    pairs = cleaning.pairs_from_totals(totals)
+    new_totals = totals.add(cleaning.pair_totals(opened).rename(index=str, level=1), fill_value=0)
+    new_pairs = cleaning.pairs_from_totals(new_totals)
+    if not pairs.astype(str).equals(new_pairs.astype(str)):
+        return False
+
+    cleaned = cleaning.clean_train(new, openings=openings, pairs=pairs)[0]
+    rollup.write_rollups(rollup.merge_rollups(old, rollup.build_rollups(cleaned, stores)), utils.cache_dir, new_key, new_totals)
+    return True
+
+def ingest_train(path):
+    stores = utils.read_table("stores")
+    new = read_new("train", path)
+    if len(new) == 0:
+        return {"train": 0}
+
+    unknown = set(new.store_nbr.astype(int)) - set(stores.store_nbr.astype(int))
+    if unknown:
+        raise ValueError(f"stores.csv 에 없는 매장입니다 : {sorted(unknown)}")
+
+    old_key = utils.version_key(utils.data_version("train", "stores", "openings"))
+    totals = rollup.read_pair_totals(utils.cache_dir, old_key)
+    openings = detect_new_openings(new, sold_stores(totals))
+    if len(openings):
+        save_openings(openings)
+
+    utils.append_table("train", new)
+    ## 새 매장이 오픈하면 판매하지 않는 조합이 바뀌므로 집계는 다음 조회 때 전체 재계산
+    updated = len(openings) == 0 and update_rollups(new, totals, old_key, utils.version_key(utils.data_version("train", "stores", "openings")), stores)
+    return {"train": len(new), "new_stores": openings.store_nbr.astype(int).tolist(), "rollups_updated": updated}
+
+def ingest_transactions(path):
+    new = read_new("transactions", path)
+    if len(new):
+        utils.append_table("transactions", new)
+    return {"transactions": len(new)}
+
+def ingest_oil(path):
+    old_version = utils.data_version("oil")
+    new = read_new("oil", path)
+    if len(new) == 0:
+        return {"oil": 0}
+
+    old_path = prepare.oil_series_path(old_version)
+    series = exogenous.DailySeries.load(old_path) if os.path.exists(old_path) else prepare.build_oil_series(utils.read_table("oil"))
+    utils.append_table("oil", new)
+    prepare.write_oil_series(series.extend(new, "dcoilwtico"), utils.data_version("oil"))
+    return {"oil": len(new)}
+
+def ingest(train=None, transactions=None, oil=None):
+    """
+    새 날짜의 train / transactions / oil CSV 를 추가 적재하는 함수
+    반환값 : 테이블 별 추가된 행 수 등 요약
+    """
+    result = {}
+    if train is not None:
+        result.update(ingest_train(train))
+    if transactions is not None:
+        result.update(ingest_transactions(transactions))
+    if oil is not None:
+        result.update(ingest_oil(oil))
+    return result
+
+
+if __name__ == "__main__":
+    ## python ingest.py --train new_train.csv --transactions new_transactions.csv --oil new_oil.csv
+    parser = argparse.ArgumentParser(description="새 날짜의 데이터를 추가 적재")
+    parser.add_argument("--train")
+    parser.add_argument("--transactions")
+    parser.add_argument("--oil")
+    args = parser.parse_args()
+    print(ingest(args.train, args.transactions, args.oil))
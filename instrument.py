@@ -0,0 +1,421 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import time
+import json
+import resource
+import functools
+import threading
+import contextlib
+from collections import Counter, deque
+import streamlit as st
+import pandas as pd
+
+# 계측 모드 : STORE_SALES_DEBUG=1 이면 rerun 마다 구간 별 시간 / 메모리 / 캐시 적중을 기록하고 사이드바에 표시
+debug = os.environ.get("STORE_SALES_DEBUG", "0") == "1"
+# 샘플링 프로파일러 기본값 (사이드바에서 세션 별로 켜고 끌 수 있음)
+profile = os.environ.get("STORE_SALES_PROFILE", "0") == "1"
+# 샘플링 주기 (초)
+sample_interval = 0.005
+# 기록 위치 (rerun 별 한 줄 JSON, 프로파일은 collapsed stack 형식의 텍스트 파일)
+metrics_dir = os.path.join("data", "cache", "metrics")
+log_path = os.path.join(metrics_dir, "metrics.jsonl")
+# 사이드바에 보여주는 지난 rerun 수 / 프로파일 상위 함수 수
+max_history = 20
+top_functions = 20
+# 계측하는 화면 출력 함수 (st.columns 등 컨테이너의 메서드는 제외)
+render_functions = ["plotly_chart", "pyplot", "altair_chart", "dataframe", "table", "image"]
+# 저장소 위치 (프로파일에서 저장소 코드만 골라 보여줌)
+repo_dir = os.path.dirname(os.path.abspath(__file__))
+# background 작업 thread 이름 (jobs.JobRunner 의 thread_name_prefix)
+job_threads = "job"
+
+
+## Instrumentation
+## rerun 하나를 구간(span)들로 나눠서 구간 별 실행 시간 / RSS 변화 / 캐시 적중 여부를 기록
+## - stage : load(데이터 읽기) / transform(파생 데이터 계산) / render(차트 / 표 출력) / page / job(background 작업)
+## - 스크립트 thread 의 구간은 rerun 에, background 작업 thread 의 구간은 작업 별 기록(job)에 모음
+##   작업 기록은 끝나면 로그에 쓰고, 작업을 요청한(jobs.result) rerun 의 사이드바에도 표시
+## - 계측 모드가 아니면 구간은 기록하지 않고, 캐시 적중 횟수만 셈
+
+_local = threading.local()
+_lock = threading.Lock()
+# 프로세스 전체의 캐시 함수 별 (hit, miss) 횟수
+cache_counts = {}
+
+
+def rss_mb():
+    """
+    현재 RSS (Linux 는 /proc, 그 외에는 최대 RSS)
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Span:
+    """
+    계측 구간 하나 (start : rerun 시작으로부터의 시간)
+    """
+
+    def __init__(self, name, stage, start, depth):
+        self.name = name
+        self.stage = stage
+        self.start = start
+        self.depth = depth
+        self.duration = 0.0
+        self.rss_delta = 0.0
+        self.cache = None
+
+    def to_dict(self):
+        return {"name": self.name, "stage": self.stage, "start": round(self.start, 4), "depth": self.depth,
+                "time": round(self.duration, 4), "rss_delta_mb": round(self.rss_delta, 2), "cache": self.cache}
+
+
+class Rerun:
+    """
+    스크립트 실행(rerun) 하나의 계측 결과
+    """
+
+    def __init__(self, page, kind="rerun"):
+        self.page = page
+        self.kind = kind
+        self.started = time.time()
+        self.origin = time.perf_counter()
+        self.rss = rss_mb()
+        self.spans = []
+        self.depth = 0
+        self.cache = Counter()
+        self.duration = 0.0
+        self.rss_delta = 0.0
+        self.profile = None
+        self.finished = False
+        ## 이 rerun 에서 결과를 요청한 background 작업 (label / trace 속성을 가진 jobs.Job)
+        self.jobs = []
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.origin
+        self.rss_delta = rss_mb() - self.rss
+        self.finished = True
+
+    @property
+    def elapsed(self):
+        return self.duration if self.finished else time.perf_counter() - self.origin
+
+    def stages(self):
+        """
+        stage 별 시간 합계 (다른 구간 안에 있는 구간은 제외해서 중복으로 더하지 않음)
+        """
+        spans = self.frame()
+        end = spans.start + spans.time
+        nested = [((spans.stage == row.stage) & (spans.depth < row.depth) & (spans.start <= row.start) & (end >= row.start + row.time)).any()
+                  for row in spans.itertuples()]
+        top = spans[~pd.Series(nested, index=spans.index, dtype=bool)]
+        return top.groupby("stage").agg(time=("time", "sum"), rss_delta_mb=("rss_delta_mb", "sum"), spans=("name", "count"))
+
+    def frame(self):
+        columns = ["name", "stage", "start", "depth", "time", "rss_delta_mb", "cache"]
+        return pd.DataFrame([span.to_dict() for span in self.spans], columns=columns)
+
+    def cache_frame(self):
+        rows = {}
+        for (name, kind), n in self.cache.items():
+            rows.setdefault(name, {"hit": 0, "miss": 0})[kind] = n
+        return pd.DataFrame.from_dict(rows, orient="index", columns=["hit", "miss"])
+
+    def to_dict(self):
+        return {"logged_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)), "kind": self.kind, "page": self.page,
+                "jobs": [job.label for job in self.jobs], "duration": round(self.duration, 4), "rss_mb": round(self.rss + self.rss_delta, 1),
+                "rss_delta_mb": round(self.rss_delta, 2), "spans": [span.to_dict() for span in self.spans],
+                "cache": {f"{name}:{kind}": n for (name, kind), n in self.cache.items()}}
+
+
+class Sampler:
+    """
+    스크립트 thread 와 background 작업 thread 의 호출 스택을 sample_interval 마다 수집하는 샘플링 프로파일러 (별도 thread 에서 실행)
+    작업 thread 는 세션이 공유하므로 다른 세션이 요청한 작업도 함께 수집될 수 있음
+    """
+
+    def __init__(self, thread_id, interval=sample_interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="instrument-sampler", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        return self
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            frames = sys._current_frames()
+            threads = [(self.thread_id, "script")] + [(t.ident, "job") for t in threading.enumerate() if t.name.startswith(job_threads)]
+            for ident, role in threads:
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None:
+                    stack.append((frame.f_code.co_filename, frame.f_code.co_name))
+                    frame = frame.f_back
+                if stack:
+                    ## 스택 맨 앞에 thread 종류를 붙여서 구분
+                    self.stacks[((role, role),) + tuple(reversed(stack))] += 1
+
+    def top(self, n=top_functions):
+        """
+        저장소 함수 별 self / total 샘플 수 (total 은 스택에 한 번이라도 있으면 셈)
+        """
+        total, own = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            names = [f"{os.path.basename(file)}:{name}" for file, name in stack if file.startswith(repo_dir)]
+            for name in set(names):
+                total[name] += count
+            if names and stack[-1][0].startswith(repo_dir):
+                own[names[-1]] += count
+        samples = max(sum(count for stack, count in self.stacks.items() if stack[0][0] == "script"), 1)
+        top = pd.DataFrame({"total": pd.Series(total, dtype="int64"), "self": pd.Series(own, dtype="int64")}).fillna(0).astype("int64")
+        ## share : 스크립트 thread 샘플 수 대비 (작업 thread 의 함수는 1 을 넘을 수 있음)
+        top["share"] = (top.total / samples).round(3)
+        return top.sort_values("total", ascending=False).head(n)
+
+    def collapsed(self):
+        """
+        flamegraph 도구에서 읽는 collapsed stack 형식 ("a;b;c 샘플 수")
+        """
+        return "\n".join(";".join(f"{os.path.basename(file)}:{name}" if file not in ("script", "job") else file for file, name in stack) + f" {count}"
+                         for stack, count in self.stacks.most_common())
+
+
+def current():
+    """
+    현재 thread 에서 계측 중인 rerun (없으면 None)
+    """
+    return getattr(_local, "rerun", None)
+
+@contextlib.contextmanager
+def span(name, stage="transform"):
+    """
+    with span(name, stage): ... 구간의 실행 시간 / RSS 변화를 기록 (계측 모드가 아니면 None 을 넘기고 기록하지 않음)
+    """
+    rerun = current()
+    if rerun is None and not debug:
+        yield None
+        return
+
+    origin = rerun.origin if rerun is not None else time.perf_counter()
+    s = Span(name, stage, time.perf_counter() - origin, rerun.depth if rerun is not None else 0)
+    rss = rss_mb()
+    if rerun is not None:
+        rerun.depth += 1
+    try:
+        yield s
+    finally:
+        s.duration = time.perf_counter() - origin - s.start
+        s.rss_delta = rss_mb() - rss
+        if rerun is not None:
+            rerun.depth -= 1
+            rerun.spans.append(s)
+        else:
+            write_log({"logged_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "kind": "span", "thread": threading.current_thread().name, **s.to_dict()})
+
+def traced(stage="transform", name=None):
+    """
+    함수 전체를 구간으로 기록하는 decorator
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name or fn.__name__, stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def call_label(fn, args):
+    ## 데이터 버전(tuple) 등은 빼고 짧은 인자만 이름에 붙임
+    shown = [str(a) for a in args if isinstance(a, (str, int, bool))]
+    return fn.__name__.lstrip("_") + (f"({', '.join(shown)})" if shown else "")
+
+def count_cache(name, kind):
+    with _lock:
+        counts = cache_counts.setdefault(name, {"hit": 0, "miss": 0})
+        counts[kind] += 1
+    rerun = current()
+    if rerun is not None:
+        rerun.cache[(name, kind)] += 1
+
+def cache_data(stage="transform", **kwargs):
+    """
+    st.cache_data 와 같은 decorator 에 캐시 적중(hit) / 계산(miss) 횟수와 구간 기록을 더한 것
+    (함수 본문이 실행되면 miss : 캐시된 함수는 적중하면 본문을 실행하지 않음)
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def compute(*args, **kw):
+            calls = getattr(_local, "calls", None)
+            if calls:
+                calls[-1] = "miss"
+            return fn(*args, **kw)
+
+        cached = st.cache_data(**kwargs)(compute)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kw):
+            if not hasattr(_local, "calls"):
+                _local.calls = []
+            _local.calls.append("hit")
+            try:
+                with span(call_label(fn, args), stage) as s:
+                    result = cached(*args, **kw)
+                    ## 구간이 닫히기(기록되기) 전에 적중 여부를 남김
+                    kind = _local.calls[-1]
+                    if s is not None:
+                        s.cache = kind
+            finally:
+                kind = _local.calls.pop()
+            count_cache(fn.__name__, kind)
+            return result
+
+        wrapper.clear = cached.clear
+        return wrapper
+    return decorator
+
+def install():
+    """
+    st 의 화면 출력 함수(render_functions)를 render 구간으로 기록하도록 감싸는 함수 (한 번만 실행)
+    """
+    if getattr(st, "_instrumented", False):
+        return
+    for name in render_functions:
+        original = getattr(st, name)
+
+        @functools.wraps(original)
+        def render(*args, _original=original, _name=name, **kwargs):
+            if current() is None:
+                return _original(*args, **kwargs)
+            with span(f"st.{_name}", "render"):
+                return _original(*args, **kwargs)
+
+        setattr(st, name, render)
+    st._instrumented = True
+
+def write_log(record, path=log_path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _lock, open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+def write_profile(sampler, rerun):
+    path = os.path.join(metrics_dir, f"profile-{time.strftime('%Y%m%d-%H%M%S', time.localtime(rerun.started))}-{rerun.page}.txt")
+    os.makedirs(metrics_dir, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(sampler.collapsed())
+    return path
+
+def attach(job):
+    """
+    현재 rerun 에서 결과를 요청한 background 작업을 기록 (jobs.result 에서 호출)
+    """
+    rerun = current()
+    if rerun is not None and rerun.kind == "rerun" and job not in rerun.jobs:
+        rerun.jobs.append(job)
+
+def jobs_frame(rerun):
+    """
+    rerun 이 요청한 작업 별 상태 / 실행 시간 / 캐시 적중
+    state : running / done (이 rerun 중에 끝남) / reused (이전에 끝난 작업의 결과를 재사용)
+    """
+    rows = []
+    for job in rerun.jobs:
+        trace = getattr(job, "trace", None)
+        if trace is None:
+            rows.append({"job": job.label, "state": "queued", "time": 0.0, "rss_delta_mb": 0.0, "hit": 0, "miss": 0})
+            continue
+        reused = trace.finished and trace.started + trace.duration < rerun.started
+        cache = trace.cache_frame().sum()
+        rows.append({"job": job.label, "state": "reused" if reused else "done" if trace.finished else "running",
+                     "time": round(trace.elapsed, 3), "rss_delta_mb": round(trace.rss_delta, 2),
+                     "hit": int(cache.get("hit", 0)), "miss": int(cache.get("miss", 0))})
+    return pd.DataFrame(rows)
+
+def sidebar(rerun):
+    """
+    계측 결과를 접을 수 있는 사이드바 영역에 표시
+    """
+    history = st.session_state.setdefault("instrument_history", deque(maxlen=max_history))
+    history.append({"page": rerun.page, "time": rerun.duration, "rss_mb": rerun.rss + rerun.rss_delta, "rss_delta_mb": rerun.rss_delta})
+
+    with st.sidebar.expander("DEBUG", expanded=False):
+        st.caption(f"{rerun.page} : {rerun.duration:.3f}s, RSS {rerun.rss + rerun.rss_delta:,.0f}MB ({rerun.rss_delta:+.1f}MB)")
+        if rerun.spans:
+            st.dataframe(rerun.stages().round(3))
+            st.dataframe(rerun.frame().sort_values("start").drop("start", axis=1).round(3), hide_index=True)
+        if rerun.jobs:
+            st.caption("background jobs")
+            st.dataframe(jobs_frame(rerun), hide_index=True)
+            spans = [job.trace.frame().assign(job=job.label) for job in rerun.jobs if getattr(job, "trace", None) is not None]
+            if spans:
+                st.dataframe(pd.concat(spans).sort_values(["job", "start"]).drop("start", axis=1).round(3), hide_index=True)
+        cache = rerun.cache_frame()
+        if len(cache):
+            st.caption("cache (this rerun)")
+            st.dataframe(cache)
+        st.caption("cache (process)")
+        st.dataframe(pd.DataFrame.from_dict(cache_counts, orient="index", columns=["hit", "miss"]))
+        st.caption(f"last {len(history)} reruns")
+        st.dataframe(pd.DataFrame(list(history)).round(3), hide_index=True)
+        st.checkbox("Sampling profiler", value=profile, key="instrument_profile")
+        if rerun.profile is not None:
+            st.caption(f"profile : {rerun.profile[0]}")
+            st.dataframe(rerun.profile[1])
+        st.caption(f"log : {log_path}")
+
+@contextlib.contextmanager
+def job(label):
+    """
+    with job(label) as trace: ... background 작업 하나를 계측 (작업 thread 에서 호출, 계측 모드가 아니면 None)
+    작업 안의 구간 / 캐시 적중은 trace 에 모이고, 끝나면 로그에 기록
+    """
+    if not debug:
+        yield None
+        return
+
+    trace = Rerun(label, kind="job")
+    _local.rerun = trace
+    try:
+        with span(label, "job"):
+            yield trace
+    finally:
+        _local.rerun = None
+        trace.finish()
+        write_log(trace.to_dict())
+
+@contextlib.contextmanager
+def rerun(page):
+    """
+    with rerun(page): ... 스크립트 실행 하나를 계측하고 끝나면 로그에 기록 / 사이드바에 표시 (계측 모드일 때만)
+    """
+    if not debug:
+        yield None
+        return
+
+    install()
+    r = Rerun(page)
+    sampler = Sampler(threading.get_ident()).start() if st.session_state.get("instrument_profile", profile) else None
+    _local.rerun = r
+    try:
+        with span(f"page {page}", "page"):
+            yield r
+    finally:
+        _local.rerun = None
+        r.finish()
+        if sampler is not None:
+            sampler.stop()
+            r.profile = (write_profile(sampler, r), sampler.top())
+        write_log(r.to_dict())
+        sidebar(r)
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import streamlit as st
+import pandas as pd
+import utils
+import instrument
+
+# 동시에 실행하는 작업 수, 완료 여부를 기억하는 작업 개수, 그 중 결과를 보관하는 최근 작업 개수
+max_workers = 2
+max_finished = 16
+max_results = 4
+# 진행 상황을 다시 그리는 주기 (초)
+poll_interval = 1.0
+
+
+## Background jobs
+## 무거운 계산(prepare 의 캐시 함수)을 Streamlit 스크립트 밖의 thread pool 에서 실행
+## - 같은 작업(함수, 인자, 데이터 버전)은 세션이 달라도 한 번만 실행 (실행 중이면 그 작업을 공유)
+## - selectbox 를 바꿔서 rerun 되어도 작업은 계속 진행되고, 끝난 결과는 바로 반환
+##   (결과는 최근 max_results 개 작업만 보관하고, 결과를 버린 작업은 다시 요청하면 background 에서 다시 실행)
+## - 작업 안에서 report() 를 호출하면 페이지에 진행률이 표시됨
+
+_local = threading.local()
+
+
+class Job:
+    """
+    실행 중이거나 끝난 작업 하나 (progress : 0 ~ 1, message : 진행 상황 설명)
+    """
+
+    def __init__(self, key, label):
+        self.key = key
+        self.label = label
+        self.progress = 0.0
+        self.message = ""
+        self.future = None
+        ## 끝난 작업의 결과 (결과를 버렸거나 아직이면 None, 있으면 (결과,))
+        self.output = None
+        self.started = time.time()
+        self.finished = None
+        ## 계측 모드에서 작업 안의 구간 기록 (instrument.job)
+        self.trace = None
+
+    def update(self, progress, message=None):
+        self.progress = min(max(float(progress), 0.0), 1.0)
+        if message is not None:
+            self.message = message
+
+    def done(self):
+        return self.future.done()
+
+    def failed(self):
+        return self.future.done() and self.future.exception() is not None
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.time()) - self.started
+
+
+class JobRunner:
+    """
+    작업 키 별로 실행 중 / 완료된 작업을 관리하는 thread pool
+    """
+
+    def __init__(self, max_workers=max_workers, max_finished=max_finished, max_results=max_results):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.max_finished = max_finished
+        self.max_results = max_results
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+
+    def submit(self, key, fn, *args, label=None, **kwargs):
+        """
+        같은 키의 작업이 있으면 그 작업을 반환하고, 없으면(또는 실패했거나 결과를 버렸으면) 새로 실행
+        """
+        with self.lock:
+            job = self.jobs.get(key)
+            if job is not None and not job.failed() and (not job.done() or job.output is not None):
+                self.jobs.move_to_end(key)
+                return job
+
+            job = Job(key, label or fn.__name__)
+            job.future = self.executor.submit(self._run, job, fn, args, kwargs)
+            self.jobs[key] = job
+            self._evict()
+            return job
+
+    def get(self, key):
+        with self.lock:
+            return self.jobs.get(key)
+
+    def _run(self, job, fn, args, kwargs):
+        _local.job = job
+        try:
+            with instrument.job(job.label) as trace:
+                job.trace = trace
+                job.output = (fn(*args, **kwargs),)
+        finally:
+            _local.job = None
+            job.finished = time.time()
+            job.update(1.0)
+
+    def _evict(self):
+        finished = [key for key, job in self.jobs.items() if job.done()]
+        ## 오래된 작업은 결과를 버리고 완료 여부만 남김
+        for key in finished[:max(len(finished) - self.max_results, 0)]:
+            self.jobs[key].output = None
+        for key in finished[:max(len(finished) - self.max_finished, 0)]:
+            del self.jobs[key]
+
+    def status(self):
+        """
+        작업 목록 (화면 출력용)
+        """
+        with self.lock:
+            jobs = list(self.jobs.values())
+        return pd.DataFrame({
+            "label": [job.label for job in jobs],
+            "state": ["failed" if job.failed() else "done" if job.done() else "running" for job in jobs],
+            "progress": [job.progress for job in jobs],
+            "message": [job.message for job in jobs],
+            "elapsed": [round(job.elapsed, 1) for job in jobs],
+        })
+
+
+@st.cache_resource
+def runner():
+    """
+    모든 세션이 공유하는 JobRunner
+    """
+    return JobRunner()
+
+def report(progress, message=None):
+    """
+    실행 중인 작업의 진행률을 갱신하는 함수 (작업 밖에서 호출하면 아무것도 하지 않음)
+    """
+    job = getattr(_local, "job", None)
+    if job is not None:
+        job.update(progress, message)
+
+def job_key(fn, args, kwargs):
+    ## 데이터 파일이 바뀌면 다른 작업이 되도록 전체 데이터 버전을 키에 포함
+    return (fn.__module__, fn.__qualname__, args, tuple(sorted(kwargs.items())), utils.data_version())
+
+def submitted(fn, *args, **kwargs):
+    """
+    같은 작업이 (다른 세션에서라도) 이미 실행 중이거나 끝났는지 여부
+    """
+    job = runner().get(job_key(fn, args, kwargs))
+    return job is not None and not job.failed()
+
+def show_progress(job):
+    """
+    작업이 끝날 때까지 진행률을 주기적으로 다시 그리고, 끝나면 페이지 전체를 rerun
+    """
+    @st.fragment(run_every=poll_interval)
+    def poll():
+        if job.done():
+            st.rerun()
+        text = f"{job.label} ({job.elapsed:,.0f}s)" + (f" : {job.message}" if job.message else "")
+        st.progress(job.progress, text=text)
+
+    poll()
+
+def result(fn, *args, label=None, **kwargs):
+    """
+    fn(*args, **kwargs) 를 background 작업으로 실행하고, 끝났으면 결과를, 아직이면 진행률을 표시하고 None 을 반환
+    페이지에서는 결과가 None 이면 이후 차트를 그리지 않고 return
+    """
+    job = runner().submit(job_key(fn, args, kwargs), fn, *args, label=label, **kwargs)
+    instrument.attach(job)
+    if job.done():
+        ## 실패한 작업이면 예외를 다시 발생
+        job.future.result()
+        output = job.output
+        if output is not None:
+            return output[0]
+        ## 다른 작업이 끝나면서 결과를 버렸으면 스크립트에서 다시 계산하지 않고 작업을 다시 실행
+        job = runner().submit(job_key(fn, args, kwargs), fn, *args, label=label, **kwargs)
+        instrument.attach(job)
+    show_progress(job)
+    return None
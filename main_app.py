@@ -2,10 +2,12 @@
 import streamlit as st
 from streamlit_option_menu import option_menu
 import utils
+import instrument
 import intro_app
 import data_app
 import eda_app
 import stat_app
+import ml_app
 
 def main():
     st.set_page_config(layout="wide")
@@ -17,16 +19,18 @@ def main():
                                orientation="vertical")
     st.title("Store Sales")
 
-    if selected == "INTRO":
-        intro_app.intro_app()
-    if selected == "DATA":
-        data_app.data_app()
-    if selected == "EDA":
-        eda_app.eda_app()
-    if selected == "STAT":
-        st.subheader("STATS")
-    if selected == "ML":
-        st.subheader("Machine Learning")
+    ## STORE_SALES_DEBUG=1 이면 페이지 실행을 계측해서 사이드바의 DEBUG 영역과 metrics 로그에 기록
+    with instrument.rerun(selected):
+        if selected == "INTRO":
+            intro_app.intro_app()
+        if selected == "DATA":
+            data_app.data_app()
+        if selected == "EDA":
+            eda_app.eda_app()
+        if selected == "STAT":
+            stat_app.stat_app()
+        if selected == "ML":
+            ml_app.ml_app()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import streamlit as st
+import pandas as pd
+import numpy as np
+import plotly.express as px
+import utils
+import prepare
+import forecast
+import jobs
+
+def ml_app():
+    st.subheader("Machine Learning")
+    st.markdown("✔ 모든 매장 / 제품군을 하나의 XGBoost 모델(Global Model)로 학습해 Test 기간(16일)의 매출을 예측합니다.")
+    st.markdown("✔ 피처 : lag / rolling / EWM 통계, onpromotion, 유가, 휴일 달력, 요일 / 급여일(15일, 말일), 매장 정보")
+    st.markdown("✔ 검증 : 학습 데이터의 마지막 16일에 대한 RMSLE (그 앞의 16일로 early stopping 하고, 마지막 16일은 학습에 쓰지 않음)")
+    st.latex(r'''
+    {RMSLE} = \sqrt{\frac{\sum_{i=1}^n (\log(1 + \hat{y}_i) - \log(1 + y_i))^2}{n}}
+    ''')
+
+    # direct : 16일 이상 lag 로 한 번에 예측 / recursive : 짧은 lag 로 하루씩 예측한 값을 다음 날 lag 로 사용
+    strategy = st.radio("Strategy", list(forecast.strategies), horizontal=True)
+
+    # 학습된 모델이 없으면 버튼을 눌렀을 때만 학습
+    # 학습은 background 작업으로 실행 (다른 세션에서 이미 시작한 학습이면 그 진행률을 표시)
+    incremental = True
+    if not prepare.forecast_ready(strategy):
+        incremental = st.checkbox("Incremental (이전 모델에 트리 추가)", value=True)
+        if not jobs.submitted(prepare.forecast_result, incremental, strategy) and not st.button("Train Model"):
+            st.info("현재 데이터 버전으로 학습된 모델이 없습니다.")
+            return
+    result = jobs.result(prepare.forecast_result, incremental, strategy, label=f"Forecast ({strategy})")
+    if result is None:
+        return
+    predictions = result["predictions"]
+
+    st.markdown("---")
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        st.metric("Validation RMSLE", "{:.4f}".format(result["rmsle"]))
+        st.write(f"Training mode : {result['mode']}")
+        st.download_button("Download submission.csv", predictions[["id", "sales"]].to_csv(index=False), file_name="submission.csv")
+    with col2:
+        importance = result["importance"].head(20).rename("gain").reset_index().rename({"index": "feature"}, axis=1)
+        fig = px.bar(importance, x="gain", y="feature", orientation="h", title="Feature Importance (gain)")
+        fig.update_layout(yaxis=dict(autorange="reversed"))
+        st.plotly_chart(fig)
+
+    # 매장 / 제품군 별 예측 결과
+    col1, col2 = st.columns([1, 1])
+    with col1:
+        store = st.selectbox("STORE", sorted(predictions.store_nbr.unique()))
+    with col2:
+        family = st.selectbox("FAMILY", sorted(predictions.family.astype(str).unique()))
+
+    # 예측 기간 직전 90일, 선택한 매장 / 제품군만 읽어 옴
+    history = utils.load_table("train", columns=["date", "store_nbr", "family", "sales"], start=predictions.date.min() - pd.Timedelta(days=90),
+                               stores=[int(store)], families=[family])
+    future = predictions[(predictions.store_nbr == store) & (predictions.family == family)]
+    a = pd.concat([history.assign(Legend="Actual"), future.assign(Legend="Forecast")])
+
+    fig = px.line(a, x="date", y="sales", color="Legend", title=f"STORE {store} - {family}")
+    st.plotly_chart(fig)
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+## Process pool
+## background 작업(jobs) 이나 Streamlit 스크립트 thread 에서 fork 하면 다른 thread 가 잡고 있던 lock 을
+## 자식 프로세스가 잠긴 채로 물려받아 멈출 수 있으므로, main thread 가 아니면 spawn 으로 worker 를 만듦
+## (spawn worker 는 main_app.py 를 다시 import 하므로 앱 실행은 if __name__ == "__main__" 안에 두어야 함)
+
+def process_pool(max_workers, **kwargs):
+    """
+    ProcessPoolExecutor (main thread 가 아닌 thread 에서 만들면 spawn 시작 방식 사용)
+    """
+    if threading.current_thread() is not threading.main_thread():
+        kwargs.setdefault("mp_context", multiprocessing.get_context("spawn"))
+    return ProcessPoolExecutor(max_workers=max_workers, **kwargs)
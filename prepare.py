@@ -0,0 +1,399 @@
+# -*- coding: utf-8 -*-
+import os
+import pandas as pd
+import numpy as np
+import utils
+import instrument
+import jobs
+import cleaning
+import ab_test
+import rollup
+import scatter
+import small_multiples
+import correlation
+import forecast
+import features
+import series_stats
+import chunked
+import exogenous
+import browser
+import profiling
+from holiday_calendar import HolidayCalendar
+from holiday_features import one_hot_encoder, holiday_columns, holiday_tables, add_holiday_features, holiday_table, join_holiday_table
+
+# 유가 결측 보간 방식 (exogenous.fill_methods : linear / ffill / seasonal)
+oil_fill = "linear"
+
+
+@instrument.traced("transform")
+def Feature_Engineering_Holidays(holidays, train, test, stores, sparse=False, table=None):
+    """
+    휴일 데이터에 대해서 전처리 하는 부분
+    sparse=True 이면 압축 피처 테이블(table, 없으면 새로 계산)을 휴일 / 이벤트 희소 컬럼으로 결합
+    """
+    d = pd.merge(pd.concat([train, test]), stores)
+    d["store_nbr"] = d["store_nbr"].astype("int16")
+
+    if sparse:
+        if table is None:
+            table = holiday_table(holidays, stores, d.date.min(), d.date.max())
+        else:
+            table = table[(table.index.get_level_values("date") >= d.date.min()) & (table.index.get_level_values("date") <= d.date.max())]
+        d = join_holiday_table(d, table, sparse=True)
+        ## 결합한 데이터에 없는 휴일(one-hot) 컬럼은 제외 (sparse=False 와 같은 컬럼, 예: 12/25 가 없는 Navidad)
+        d = d.drop([c for c in holiday_columns(d) if c.startswith("holiday_") and not c.endswith("_binary") and not d[c].any()], axis=1)
+    else:
+        d = add_holiday_features(d, holiday_tables(holidays))
+
+    d[["family", "city", "state", "type"]] = d[["family", "city", "state", "type"]].astype("category")
+
+    return d
+
+## Prepared dataset
+## 파생 데이터는 입력 테이블의 데이터 버전별로 한 번만 계산하고 캐시함
+## (공개 함수는 입력 테이블 버전을 구한 뒤 캐시된 함수를 호출)
+
+@instrument.cache_data(max_entries=2, show_spinner=False)
+def _transactions_sales(version):
+    train = utils.load_table("train", columns=["date", "store_nbr", "sales"])
+    transactions = utils.load_table("transactions")
+    return pd.merge(train.groupby(["date", "store_nbr"]).sales.sum().reset_index(), transactions, how="left")
+
+def transactions_sales():
+    """
+    매장별 일 매출 합계와 Transactions 를 결합한 데이터
+    """
+    return _transactions_sales(utils.data_version("train", "transactions"))
+
+@instrument.cache_data(max_entries=2, show_spinner=False)
+def _transactions_oil_sales(version):
+    temp = transactions_sales().copy()
+    oil = oil_series()
+    temp["dcoilwtico"] = oil.lookup(temp.date, observed=True)
+    temp["dcoilwtico_interpolated"] = oil.lookup(temp.date)
+    return temp
+
+def transactions_oil_sales():
+    """
+    매장별 일 매출 합계 / Transactions 에 일별 Oil Price 를 결합한 데이터
+    """
+    return _transactions_oil_sales(utils.data_version("train", "transactions", "oil"))
+
+@instrument.cache_data(max_entries=2, show_spinner=False)
+def _sales_correlation_stats(version):
+    temp = transactions_oil_sales()
+    return {
+        "spearman_transactions": temp[["sales", "transactions"]].corr("spearman").sales.loc["transactions"],
+        "spearman_oil": temp.drop(["store_nbr", "dcoilwtico"], axis=1).corr("spearman", numeric_only=True).dcoilwtico_interpolated.loc[["sales", "transactions"]],
+        "ols_transactions_sales": scatter.fit_ols(temp.transactions, temp.sales),
+        "ols_oil_sales": scatter.fit_ols(temp.dcoilwtico_interpolated, temp.sales),
+        "ols_oil_transactions": scatter.fit_ols(temp.dcoilwtico_interpolated, temp.transactions),
+    }
+
+def sales_correlation_stats():
+    """
+    Sales / Transactions / Oil Price 간의 Spearman 상관계수와 OLS 회귀 결과 (산점도 오버레이용)
+    """
+    return _sales_correlation_stats(utils.data_version("train", "transactions", "oil"))
+
+def build_oil_series(oil):
+    """
+    일 단위 달력으로 펼친 뒤 누락 값을 oil_fill 방식으로 보간한 유가 (0 은 실제 가격으로 취급)
+    """
+    return exogenous.DailySeries.from_frame(oil, "dcoilwtico", method=oil_fill)
+
+def oil_series_path(version):
+    return os.path.join(utils.cache_dir, f"oil_daily_{utils.version_key(version)}.npz")
+
+def write_oil_series(series, version):
+    os.makedirs(utils.cache_dir, exist_ok=True)
+    for file in os.listdir(utils.cache_dir):
+        if file.startswith("oil_daily_"):
+            os.remove(os.path.join(utils.cache_dir, file))
+    series.save(oil_series_path(version))
+
+@instrument.cache_data(max_entries=2, show_spinner=False)
+def _oil_series(version):
+    ## 추가 적재(ingest)로 꼬리 구간만 갱신된 결과가 있으면 읽어 옴
+    path = oil_series_path(version)
+    if os.path.exists(path):
+        return exogenous.DailySeries.load(path)
+    series = build_oil_series(utils.load_table("oil"))
+    write_oil_series(series, version)
+    return series
+
+def oil_series():
+    """
+    일 단위 보간 유가 (exogenous.DailySeries) - 날짜 배열로 lookup 해서 결합
+    """
+    return _oil_series(utils.data_version("oil"))
+
+def oil_daily():
+    """
+    일 단위로 리샘플링 후 누락 값을 보간한 Oil Price 데이터
+    """
+    return oil_series().frame("dcoilwtico")
+
+@instrument.cache_data(max_entries=2, show_spinner=False)
+def _store_openings(version):
+    return cleaning.read_openings(utils.openings_path)
+
+def store_openings():
+    """
+    매장 오픈 일자 (cleaning.store_openings + 추가 적재(ingest.py)로 저장된 신규 매장, 파일이 바뀔 때만 다시 읽음)
+    """
+    return _store_openings(utils.data_version("openings"))
+
+@instrument.cache_data(max_entries=2, show_spinner=False)
+def _cleaned_train(version):
+    ## 이상치 제거 : 매장별로 오픈하기 전의 시점
+    ## 불필요한 값 제거 : 매장별로 판매하지 않는 제품 파악
+    return cleaning.clean_train(utils.load_table("train"), openings=store_openings())
+
+def cleaned_train():
+    """
+    매장 오픈 전 기간과 판매하지 않는 제품군을 제거한 Train 데이터와 zero_prediction
+    """
+    return _cleaned_train(utils.data_version("train", "openings"))
+
+@instrument.cache_data(max_entries=2, show_spinner=False)
+def _holiday_table(version):
+    holidays = utils.load_table("holidays")
+    return holiday_table(holidays, utils.load_table("stores"), holidays.date.min(), holidays.date.max())
+
+def compact_holiday_table():
+    """
+    전체 휴일 기간의 (date, store_nbr) 압축 피처 테이블 (holidays / stores 가 바뀔 때만 다시 계산)
+    """
+    return _holiday_table(utils.data_version("holidays", "stores"))
+
+@instrument.cache_data(max_entries=2, show_spinner=False)
+def _holiday_features(version, sparse):
+    ## 압축 피처 테이블은 train 과 무관하게 캐시되므로 train 에 날짜가 추가되어도 결합만 다시 수행
+    return Feature_Engineering_Holidays(utils.load_table("holidays"), utils.load_table("train"),
+                                       utils.load_table("test"), utils.load_table("stores"), sparse=sparse,
+                                       table=compact_holiday_table() if sparse else None)
+
+def holiday_features(sparse=True):
+    """
+    Train + Test 에 휴일/이벤트 피처를 추가한 데이터 (기본값은 희소 컬럼)
+    """
+    return _holiday_features(utils.data_version("holidays", "train", "test", "stores"), sparse)
+
+@instrument.cache_data(max_entries=2, show_spinner=False)
+def _holiday_calendar(version):
+    return HolidayCalendar(holiday_tables(utils.load_table("holidays")), utils.load_table("stores"))
+
+def holiday_calendar():
+    """
+    (날짜, 매장) 배열로 조회하는 휴일 / 근무일 / 이벤트 달력
+    """
+    return _holiday_calendar(utils.data_version("holidays", "stores"))
+
+@instrument.cache_data(max_entries=24, show_spinner=False)
+def _rollup(version, level, freq):
+    key = utils.version_key(version)
+    result = rollup.read_rollup(utils.cache_dir, key, level, freq)
+    if result is None:
+        if utils.streaming:
+            ## 청크 처리 모드 : train 전체를 메모리에 올리지 않고 청크 별 집계를 더함
+            totals = chunked.pair_totals(store_openings())
+            rollups = chunked.sales_rollups(utils.load_table("stores"), cleaning.pairs_from_totals(totals), store_openings())
+        else:
+            train, zero_prediction = cleaned_train()
+            totals = cleaning.cleaned_pair_totals(train, zero_prediction)
+            rollups = rollup.build_rollups(train, utils.load_table("stores"))
+        ## totals : 추가 적재(ingest)에서 판매하지 않는 조합이 바뀌었는지 확인할 때 사용
+        rollup.write_rollups(rollups, utils.cache_dir, key, totals)
+        result = rollups[(level, freq)]
+    return result
+
+def sales_rollup(level, freq="D"):
+    """
+    정제된 Train 의 일별 / 월별 Sales, onpromotion 합계 (store / family / city / state / cluster / total 단위)
+    한 번 계산한 결과는 data/cache 에 저장해 두고 읽어 옴
+    """
+    return _rollup(utils.data_version("train", "stores", "openings"), level, freq)
+
+def train_series(pairs):
+    """
+    (store_nbr, family) 조합 별 Train Sales 시계열 (매장 오픈 전 기간 제외)
+    매장 / 제품군 필터를 분할 데이터셋 읽기에 적용해 필요한 row group 만 읽음
+    """
+    pairs = pd.DataFrame(pairs, columns=["store_nbr", "family"])
+    d = utils.load_table("train", columns=["date", "store_nbr", "family", "sales"],
+                         stores=sorted(pairs.store_nbr.unique()), families=sorted(pairs.family.unique()))
+    return d[cleaning.pair_mask(d, pairs) & cleaning.opening_mask(d, store_openings())].reset_index(drop=True)
+
+def _build_oil_family_panels():
+    a = sales_rollup("family", "D")[["date", "family", "sales"]].copy()
+    a["dcoilwtico_interpolated"] = oil_series().lookup(a.date)
+    c = a.groupby("family", observed=True)[["sales", "dcoilwtico_interpolated"]].corr("spearman").reset_index()
+    c = c[c.level_1 == "dcoilwtico_interpolated"][["family", "sales"]].sort_values("sales")
+
+    titles = {fam: fam + "\n Correlation:" + str(corr)[:6] for fam, corr in zip(c.family, c.sales)}
+    return small_multiples.render_panels(a, "family", small_multiples.scatter_panel, order=c.family.tolist(), titles=titles,
+                                         columns=["dcoilwtico_interpolated", "sales"], progress=jobs.report, x="dcoilwtico_interpolated", y="sales", vline=70)
+
+@instrument.cache_data(max_entries=2, show_spinner=False)
+def _oil_family_panels(version):
+    return small_multiples.cached_panels("oil_family", os.path.join(utils.cache_dir, "figures"), utils.version_key(version), _build_oil_family_panels)
+
+def oil_family_panels():
+    """
+    제품군 별 Oil Price / Sales 산점도 패널 이미지 (Spearman 상관계수 순)
+    """
+    return _oil_family_panels(utils.data_version("train", "stores", "oil", "openings"))
+
+@instrument.cache_data(max_entries=12, show_spinner=False)
+def _sales_correlation(version, level, method):
+    key = rollup.levels[level][0]
+    X, dates, labels = correlation.dense_matrix(sales_rollup(level, "D"), key)
+    return correlation.correlation_matrix(X, labels, method)
+
+def sales_correlation(level="store", method="pearson"):
+    """
+    일별 Sales 기준 store / family / cluster 간 상관계수 행렬
+    """
+    return _sales_correlation(utils.data_version("train", "stores", "openings"), level, method)
+
+@instrument.cache_data(max_entries=2, show_spinner="Training forecasting model...")
+def _forecast(version, incremental, strategy):
+    return forecast.run(utils.load_table("train"), utils.load_table("test"), utils.load_table("stores"), oil_series(), holiday_calendar(),
+                        utils.cache_dir, utils.version_key(version), incremental=incremental, strategy=strategy, openings=store_openings())
+
+def forecast_result(incremental=True, strategy="direct"):
+    """
+    Test 기간 매출 예측 결과 (모델은 데이터 / 피처 버전 / 예측 방식 별로 data/cache/models 에 저장)
+    """
+    return _forecast(utils.data_version("train", "test", "stores", "oil", "holidays", "openings"), incremental, strategy)
+
+def forecast_ready(strategy="direct"):
+    """
+    현재 데이터 버전으로 학습된 모델이 저장되어 있는지 여부
+    """
+    key = utils.version_key(utils.data_version("train", "test", "stores", "oil", "holidays", "openings"))
+    return os.path.exists(forecast.model_path(utils.cache_dir, key, strategy))
+
+def to_dense(d):
+    """
+    희소(Sparse) 컬럼을 일반 컬럼으로 바꾸는 함수 (화면 출력용)
+    """
+    sparse_cols = [c for c in d.columns if isinstance(d[c].dtype, pd.SparseDtype)]
+    return d.astype({c: d[c].dtype.subtype for c in sparse_cols})
+
+def _run_series_stats(version, level):
+    ## store_family 는 정제된 Train, 나머지는 일별 집계(rollup)를 (series x day) 배열로 펼쳐서 분석
+    d = cleaned_train()[0] if level == "store_family" else sales_rollup(level, "D")
+    panel = features.SeriesPanel.from_frame(d, "sales", keys=series_stats.levels[level])
+    result = series_stats.run(panel.keys, panel.values, panel.daily(d, "onpromotion"), progress=jobs.report)
+    series_stats.write_results(result, panel.dates, utils.cache_dir, utils.version_key(version), level)
+
+@instrument.cache_data(max_entries=8, show_spinner=False)
+def _series_stats(version, level):
+    result = series_stats.read_results(utils.cache_dir, utils.version_key(version), level)
+    if result is None:
+        _run_series_stats(version, level)
+        result = series_stats.read_results(utils.cache_dir, utils.version_key(version), level)
+    ## 분해 성분은 memory map 이라 캐시에 넣지 않고 series_components() 로 한 시계열씩 읽음
+    result.pop("components")
+    return result
+
+def series_statistics(level="store"):
+    """
+    store / family / cluster / store_family 별 시계열 분석 결과 (STL 분해 강도, ADF / KPSS, ACF / PACF, 프로모션 효과)
+    결과가 없으면 모든 시계열을 process pool 에서 배치로 계산해 data/cache 에 저장
+    """
+    return _series_stats(utils.data_version("train", "stores", "openings"), level)
+
+def series_statistics_ready(level="store"):
+    """
+    현재 데이터 버전의 시계열 분석 결과가 저장되어 있는지 여부
+    """
+    return series_stats.has_results(utils.cache_dir, utils.version_key(utils.data_version("train", "stores", "openings")), level)
+
+def series_components(level, position):
+    """
+    저장된 STL 분해 결과 중 position 번째 시계열 (날짜 x observed / trend / seasonal / resid)
+    """
+    result = series_stats.read_results(utils.cache_dir, utils.version_key(utils.data_version("train", "stores", "openings")), level)
+    a = pd.DataFrame(np.asarray(result["components"][position]).T, columns=series_stats.components)
+    a.insert(0, "date", result["dates"])
+    return a.dropna()
+
+@instrument.cache_data(max_entries=2, show_spinner=False)
+def _holiday_ab_tests(version):
+    if utils.streaming:
+        return chunked.holiday_ab_tests(utils.load_table("holidays"), utils.load_table("stores"), table=compact_holiday_table())
+    d = holiday_features()
+    return ab_test.AB_Test_batch(d, holiday_columns(d), target="sales")
+
+def holiday_ab_tests():
+    """
+    휴일 / 이벤트 컬럼별 Sales A/B Test 결과
+    """
+    return _holiday_ab_tests(utils.data_version("holidays", "train", "test", "stores"))
+
+## Data browser (DATA 페이지)
+
+def browser_filters(start=None, end=None, stores=None, families=None):
+    ## cache_data 키로 쓰기 위해 tuple 로 만듦
+    return (("start", start), ("end", end), ("stores", tuple(stores) if stores else None),
+            ("families", tuple(families) if families else None))
+
+@instrument.cache_data(max_entries=6, show_spinner=False)
+def _browser_keys(version, name):
+    if name in utils.partitioned_tables:
+        return browser.table_keys(name)
+    return browser.frame_keys(utils.load_table(name))
+
+def browser_keys(name):
+    """
+    데이터 브라우저의 필터 선택지 (날짜 범위, 매장, 제품군)
+    """
+    return _browser_keys(utils.data_version(name), name)
+
+@instrument.cache_data(max_entries=16, show_spinner=False)
+def _browser_counts(version, name, sort, filters):
+    return browser.group_counts(name, sort, dict(filters))
+
+@instrument.cache_data(max_entries=16, show_spinner=False)
+def _browser_rows(version, name, sort, filters):
+    if name in utils.partitioned_tables:
+        return int(_browser_counts(version, name, sort, filters).rows.sum())
+    return browser.page_from_frame(utils.load_table(name), 0, 0, None, True, dict(filters))[1]
+
+def browser_rows(name, sort="date", **filters):
+    """
+    필터에 해당하는 행 수
+    """
+    return _browser_rows(utils.data_version(name), name, sort, browser_filters(**filters))
+
+@instrument.cache_data(max_entries=32, show_spinner=False)
+def _browser_page(version, name, offset, size, sort, ascending, filters):
+    if name in utils.partitioned_tables:
+        counts = _browser_counts(version, name, sort, filters)
+        return browser.page_from_groups(name, counts, offset, size, sort, ascending, dict(filters))
+    return browser.page_from_frame(utils.load_table(name), offset, size, sort, ascending, dict(filters))[0]
+
+def browser_page(name, offset, size, sort="date", ascending=True, **filters):
+    """
+    필터 / 정렬한 테이블의 offset 번째 행부터 size 개의 행 (train / transactions 는 해당 부분만 읽음)
+    """
+    return _browser_page(utils.data_version(name), name, offset, size, sort, ascending, browser_filters(**filters))
+
+@instrument.cache_data(max_entries=6, show_spinner=False)
+def _table_profile(version, name):
+    digest = profiling.table_hash(name)
+    report = profiling.read_report(name, digest)
+    if report is None:
+        report = profiling.profile_table(name, progress=jobs.report)
+        profiling.write_report(report, name, digest)
+    return report
+
+def table_profile(name):
+    """
+    테이블 요약 리포트 (컬럼 별 타입 / 통계 / 분위수 / 히스토그램 / 결측 / 고유값 수, 매장 별 날짜 관측 범위)
+    파일 내용 hash 별로 저장된 리포트가 있으면 읽기만 하고, 없으면 테이블을 한 번 훑어서 만듦
+    """
+    return _table_profile(utils.data_version(name), name)
@@ -0,0 +1,406 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import hashlib
+import threading
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import utils
+import ab_test
+
+# 분위수 요약의 압축 정도 (centroid 수 ~ compression)
+compression = 200
+# HyperLogLog 레지스터 수 = 2 ** hll_precision (상대 오차 ~ 1.04 / sqrt(4096) = 1.6%)
+hll_precision = 12
+# 값 별 행 수를 정확히 세는 최대 고유값 수 (넘으면 HyperLogLog 추정만 사용)
+max_categories = 1000
+# 숫자형이지만 값 별 행 수도 세는 컬럼
+count_columns = ["store_nbr", "cluster"]
+# 리포트에 남기는 분위수와 히스토그램 구간 수
+quantiles = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+histogram_bins = 30
+# 리포트 저장 위치 (data/cache/profiles/<table>_<file hash>.json)
+profile_dir = os.path.join(utils.cache_dir, "profiles")
+
+
+## Sketches
+## 청크 별로 만든 요약을 merge 로 합칠 수 있는 자료 구조 (테이블을 한 번만 훑음)
+
+class QuantileDigest:
+    """
+    merging t-digest : 정렬한 centroid 를 분위수 위치에 따라 묶어서 (양 끝은 촘촘하게) 크기를 제한한 분위수 요약
+    """
+
+    def __init__(self, compression=compression):
+        self.compression = compression
+        self.means = np.zeros(0)
+        self.weights = np.zeros(0)
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        values = np.asarray(values, dtype="float64")
+        values = values[np.isfinite(values)]
+        if len(values):
+            self.min, self.max = min(self.min, values.min()), max(self.max, values.max())
+            self._compress(np.concatenate([self.means, values]), np.concatenate([self.weights, np.ones(len(values))]))
+        return self
+
+    def merge(self, other):
+        self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+        self._compress(np.concatenate([self.means, other.means]), np.concatenate([self.weights, other.weights]))
+        return self
+
+    def _compress(self, means, weights):
+        if len(means) == 0:
+            return
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        cumulative = np.cumsum(weights)
+        q = (cumulative - weights / 2) / cumulative[-1]
+        ## k1 scale function : 분위수 양 끝에서 묶음이 작아짐
+        group = np.floor(self.compression * (np.arcsin(2 * q - 1) / np.pi + 0.5)).astype("int64")
+        group = np.unique(group, return_inverse=True)[1]
+        self.weights = np.bincount(group, weights=weights)
+        self.means = np.bincount(group, weights=means * weights) / self.weights
+
+    @property
+    def count(self):
+        return float(self.weights.sum())
+
+    def quantile(self, q):
+        if len(self.means) == 0:
+            return np.full(np.shape(q), np.nan)
+        position = np.cumsum(self.weights) - self.weights / 2
+        x = np.concatenate([[0], position, [self.count]])
+        y = np.concatenate([[self.min], self.means, [self.max]])
+        return np.interp(np.asarray(q) * self.count, x, y)
+
+    def cdf(self, value):
+        if len(self.means) == 0:
+            return np.zeros(np.shape(value))
+        position = np.cumsum(self.weights) - self.weights / 2
+        x = np.concatenate([[self.min], self.means, [self.max]])
+        y = np.concatenate([[0], position, [self.count]]) / self.count
+        return np.interp(value, x, y)
+
+    def histogram(self, bins=histogram_bins):
+        """
+        구간 경계와 구간 별 행 수 (centroid 의 weight 를 평균이 속한 구간에 더함)
+        같은 값이 몰린 경우(예: sales = 0)도 그 값의 centroid 가 한 구간에 들어가므로 행 수가 보존되고,
+        합계는 항상 count 와 같음 (구간 경계에 걸친 centroid 는 평균 쪽 구간에 들어가므로 구간 별 행 수는 근사, min == max 이면 구간 하나)
+        """
+        if self.min == self.max:
+            edges = np.array([self.min - 0.5, self.max + 0.5])
+        else:
+            edges = np.linspace(self.min, self.max, bins + 1)
+        counts = np.histogram(np.clip(self.means, edges[0], edges[-1]), bins=edges, weights=self.weights)[0]
+        return edges, counts
+
+
+class HyperLogLog:
+    """
+    고유값 수 추정 (레지스터 별 최대값이라 merge 는 원소 별 max)
+    """
+
+    def __init__(self, precision=hll_precision):
+        self.precision = precision
+        self.registers = np.zeros(2 ** precision, dtype="uint8")
+
+    def update(self, values):
+        if len(values) == 0:
+            return self
+        h = pd.util.hash_array(np.asarray(values))
+        p = self.precision
+        index = (h >> np.uint64(64 - p)).astype("int64")
+        rest = h & np.uint64((1 << (64 - p)) - 1)
+        ## 나머지 비트에서 첫 1 의 위치 (leading zero 수 + 1)
+        bit_length = np.where(rest > 0, np.floor(np.log2(np.maximum(rest, 1).astype("float64"))) + 1, 0)
+        rank = (64 - p - bit_length + 1).astype("uint8")
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other):
+        self.registers = np.maximum(self.registers, other.registers)
+        return self
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(2.0 ** -self.registers.astype("float64"))
+        zeros = int((self.registers == 0).sum())
+        ## 작은 값은 linear counting
+        if estimate <= 2.5 * m and zeros > 0:
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+
+class ColumnProfile:
+    """
+    컬럼 하나의 요약 : 결측 수, 고유값 수, (숫자) 적률 / 분위수, (범주) 값 별 행 수, (날짜) 최소 / 최대
+    """
+
+    def __init__(self, name, dtype):
+        self.name = name
+        self.dtype = str(dtype)
+        self.kind = "datetime" if pd.api.types.is_datetime64_any_dtype(dtype) else \
+            "numeric" if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype) else "categorical"
+        self.counted = self.kind == "categorical" or name in count_columns
+        self.rows = 0
+        self.nulls = 0
+        self.hll = HyperLogLog()
+        self.moments = np.zeros(5)
+        self.digest = QuantileDigest()
+        self.counts = {}
+        self.truncated = False
+        self.min = None
+        self.max = None
+
+    def update(self, values):
+        self.rows += len(values)
+        missing = values.isnull().to_numpy()
+        self.nulls += int(missing.sum())
+        values = values[~missing]
+        self.hll.update(values.to_numpy())
+        if self.kind == "numeric":
+            x = values.to_numpy(dtype="float64")
+            self.moments = ab_test.combine_moments(self.moments, ab_test.moments(x))
+            self.digest.update(x)
+        elif self.kind == "datetime" and len(values):
+            self.min = values.min() if self.min is None else min(self.min, values.min())
+            self.max = values.max() if self.max is None else max(self.max, values.max())
+        if self.counted:
+            self._add_counts(values.astype(str).value_counts().to_dict())
+        return self
+
+    def _add_counts(self, counts):
+        if self.truncated:
+            return
+        for key, value in counts.items():
+            self.counts[key] = self.counts.get(key, 0) + int(value)
+        if len(self.counts) > max_categories:
+            self.counts, self.truncated = {}, True
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.nulls += other.nulls
+        self.hll.merge(other.hll)
+        self.moments = ab_test.combine_moments(self.moments, other.moments)
+        self.digest.merge(other.digest)
+        if other.truncated:
+            self.counts, self.truncated = {}, True
+        self._add_counts(other.counts)
+        for name in ["min", "max"]:
+            values = [v for v in [getattr(self, name), getattr(other, name)] if v is not None]
+            setattr(self, name, (min if name == "min" else max)(values) if values else None)
+        return self
+
+    def report(self):
+        result = {"dtype": self.dtype, "kind": self.kind, "count": self.rows - self.nulls, "nulls": self.nulls,
+                  "null_rate": self.nulls / self.rows if self.rows else 0.0, "distinct": self.hll.estimate()}
+        if self.kind == "numeric" and self.moments[0] > 0:
+            n, mean, M2 = self.moments[:3]
+            qs = self.digest.quantile(quantiles)
+            edges, counts = self.digest.histogram(histogram_bins)
+            result.update({"mean": mean, "std": np.sqrt(M2 / (n - 1)) if n > 1 else np.nan, "min": self.digest.min,
+                           "max": self.digest.max, "quantiles": dict(zip(map(str, quantiles), qs.tolist())),
+                           "histogram": {"edges": edges.tolist(), "counts": counts.tolist()}})
+        elif self.kind == "datetime" and self.min is not None:
+            result.update({"min": str(self.min.date()), "max": str(self.max.date())})
+        if self.counted:
+            ## 값 별 행 수를 정확히 센 경우 고유값 수도 정확한 값 사용
+            if not self.truncated:
+                result["distinct"] = len(self.counts)
+            result["top"] = dict(sorted(self.counts.items(), key=lambda kv: -kv[1]))
+        return result
+
+
+class DateCoverage:
+    """
+    날짜 컬럼의 (매장 별) 관측일 : 기준일(1970-01-01) 로부터의 일 수 집합
+    """
+
+    def __init__(self):
+        self.days = set()
+        self.store_days = {}
+
+    def update(self, dataframe):
+        day = dataframe.date.to_numpy(dtype="datetime64[D]").astype("int64")
+        self.days.update(np.unique(day).tolist())
+        if "store_nbr" in dataframe.columns:
+            pairs = np.unique(dataframe.store_nbr.to_numpy().astype("int64") * 100000 + day)
+            for store in np.unique(pairs // 100000):
+                self.store_days.setdefault(int(store), set()).update((pairs[pairs // 100000 == store] % 100000).tolist())
+        return self
+
+    def merge(self, other):
+        self.days |= other.days
+        for store, days in other.store_days.items():
+            self.store_days.setdefault(store, set()).update(days)
+        return self
+
+    def report(self):
+        def describe(days):
+            days = np.array(sorted(days))
+            span = int(days[-1] - days[0] + 1)
+            return {"first": str(np.datetime64(int(days[0]), "D")), "last": str(np.datetime64(int(days[-1]), "D")),
+                    "days": len(days), "missing_days": span - len(days), "coverage": len(days) / span}
+
+        if not self.days:
+            return None
+        days = np.array(sorted(self.days))
+        missing = np.setdiff1d(np.arange(days[0], days[-1] + 1), days)
+        result = describe(self.days)
+        ## 누락된 날짜 (예: 유가가 없는 주말, 12/25)
+        result["missing_dates"] = [str(np.datetime64(int(d), "D")) for d in missing[:100]]
+        result["missing_dayofweek"] = np.bincount((missing + 3) % 7, minlength=7).tolist()
+        result["stores"] = [dict(store_nbr=store, **describe(days)) for store, days in sorted(self.store_days.items())]
+        return result
+
+
+class TableProfile:
+    """
+    테이블 하나의 요약 (컬럼 별 ColumnProfile + 날짜 관측 범위)
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = 0
+        self.columns = {}
+        self.coverage = DateCoverage()
+
+    def update(self, dataframe):
+        self.rows += len(dataframe)
+        for column in dataframe.columns:
+            if column not in self.columns:
+                self.columns[column] = ColumnProfile(column, dataframe[column].dtype)
+            self.columns[column].update(dataframe[column])
+        if "date" in dataframe.columns:
+            self.coverage.update(dataframe)
+        return self
+
+    def merge(self, other):
+        self.rows += other.rows
+        for column, profile in other.columns.items():
+            if column in self.columns:
+                self.columns[column].merge(profile)
+            else:
+                self.columns[column] = profile
+        self.coverage.merge(other.coverage)
+        return self
+
+    def report(self):
+        columns = {column: profile.report() for column, profile in self.columns.items()}
+        dates = self.coverage.report()
+        if dates is not None:
+            ## 날짜 고유값 수는 관측일 집합으로 정확히 셈
+            columns["date"]["distinct"] = dates["days"]
+        return {"table": self.name, "rows": self.rows, "columns": columns, "dates": dates}
+
+
+def expected_rows(name):
+    """
+    진행률 표시용 전체 행 수 (Parquet 메타데이터, 원본 CSV 만 있으면 None)
+    """
+    if name in utils.partitioned_tables and utils.is_dataset_fresh(name) and not utils.is_cache_fresh(name):
+        return sum(pq.ParquetFile(utils.partition_path(name, *month)).metadata.num_rows for month in utils.dataset_months(name))
+    if utils.is_cache_fresh(name):
+        return pq.ParquetFile(utils.cache_path(name)).metadata.num_rows
+    return None
+
+def profile_table(name, rows=None, progress=None):
+    """
+    테이블을 청크 단위로 한 번 훑어서 요약 리포트를 만드는 함수 (청크 별 요약을 merge)
+    progress : 진행률 콜백 progress(비율, 메시지) (예: jobs.report)
+    """
+    profile = TableProfile(name)
+    total = expected_rows(name)
+    for chunk in utils.iter_table(name, rows=rows):
+        profile.merge(TableProfile(name).update(chunk))
+        if progress:
+            progress(profile.rows / total if total else 0.0, "{:,} rows".format(profile.rows))
+    return profile.report()
+
+def describe(report):
+    """
+    숫자 컬럼의 리포트를 DataFrame.describe() 와 같은 형태로 바꾸는 함수 (+ 결측 / 고유값 수)
+    """
+    rows = {}
+    for column, c in report["columns"].items():
+        if "quantiles" in c:
+            rows[column] = {"count": c["count"], "mean": c["mean"], "std": c["std"], "min": c["min"], "25%": c["quantiles"]["0.25"],
+                            "50%": c["quantiles"]["0.5"], "75%": c["quantiles"]["0.75"], "max": c["max"],
+                            "nulls": c["nulls"], "distinct": c["distinct"]}
+    return pd.DataFrame(rows)
+
+
+## Report store (data/cache/profiles/<table>_<file hash>.json)
+## 파일 내용이 같으면 수정 시각이 바뀌어도 같은 리포트를 사용
+
+def file_hash(path, block_size=1 << 20):
+    md5 = hashlib.md5()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            md5.update(block)
+    return md5.hexdigest()[:16]
+
+def hash_path(name):
+    return os.path.join(profile_dir, f"{name}.hash.json")
+
+def write_json(path, value):
+    """
+    임시 파일에 쓴 뒤 바꿔치기 (다른 작업 thread 가 쓰다 만 파일을 읽지 않게)
+    """
+    temp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp, "w") as f:
+        json.dump(value, f, default=float)
+    os.replace(temp, path)
+
+def table_hash(name):
+    """
+    테이블 원본 파일의 내용 hash (수정 시각 / 크기가 같으면 저장된 값을 사용)
+    테이블마다 파일 하나(<name>.hash.json)라서 다른 테이블의 작업과 동시에 실행되어도 갱신이 사라지지 않음
+    """
+    path = utils.table_paths[name] if os.path.exists(utils.table_paths[name]) else utils.cache_path(name)
+    if not os.path.exists(path):
+        return None
+    key = utils.version_key(utils.table_version(name))
+    saved = {}
+    if os.path.exists(hash_path(name)):
+        with open(hash_path(name)) as f:
+            saved = json.load(f)
+    if saved.get("version") != key:
+        os.makedirs(profile_dir, exist_ok=True)
+        saved = {"version": key, "hash": file_hash(path)}
+        write_json(hash_path(name), saved)
+    return saved["hash"]
+
+def report_path(name, digest):
+    return os.path.join(profile_dir, f"{name}_{digest}.json")
+
+def write_report(report, name, digest):
+    """
+    리포트를 저장하고 같은 테이블의 이전 리포트는 삭제하는 함수
+    """
+    os.makedirs(profile_dir, exist_ok=True)
+    for file in os.listdir(profile_dir):
+        if file.startswith(f"{name}_") and file.endswith(".json"):
+            os.remove(os.path.join(profile_dir, file))
+    write_json(report_path(name, digest), report)
+
+def read_report(name, digest):
+    path = report_path(name, digest)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    ## 모든 테이블의 리포트를 미리 계산 (python profiling.py)
+    for name in utils.table_paths:
+        digest = table_hash(name)
+        if digest is not None and read_report(name, digest) is None:
+            write_report(profile_table(name), name, digest)
+            print(f"{name} -> {report_path(name, digest)}")
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import threading
+import pandas as pd
+import numpy as np
+
+# 집계 단위 별 그룹 컬럼 (total 은 전체 합계)
+levels = {
+    "total": [],
+    "store": ["store_nbr"],
+    "family": ["family"],
+    "city": ["city"],
+    "state": ["state"],
+    "cluster": ["cluster"],
+}
+# 집계 주기 : D(일별), M(월별, 날짜는 월 첫날)
+freqs = ["D", "M"]
+# 지우지 않고 남겨 두는 최근 데이터 버전 폴더 수 (다른 세션 / 작업이 이전 버전을 읽고 있을 수 있음)
+keep_versions = 3
+
+
+def add_store_columns(train, stores):
+    """
+    store_nbr 로 stores 배열을 인덱싱해 city / state / cluster 컬럼을 붙이는 함수 (merge 없이)
+    """
+    store = train.store_nbr.to_numpy().astype("int64")
+    pos = np.full(int(max(store.max(initial=0), stores.store_nbr.max())) + 1, -1)
+    pos[stores.store_nbr.to_numpy().astype("int64")] = np.arange(len(stores))
+    pos = pos[store]
+
+    d = train[["date", "store_nbr", "family", "sales", "onpromotion"]].copy()
+    for col in ["city", "state", "cluster"]:
+        d[col] = stores[col].iloc[pos].values
+    return d
+
+def build_rollups(train, stores):
+    """
+    일별 / 월별 Sales, onpromotion 합계와 행 수(count)를 집계 단위 별로 한 번에 계산하는 함수
+    반환값 : {(level, freq): DataFrame}
+    """
+    d = add_store_columns(train, stores)
+
+    rollups = {}
+    for level, keys in levels.items():
+        daily = d.groupby(["date"] + keys, observed=True).agg(sales=("sales", "sum"), onpromotion=("onpromotion", "sum"), count=("sales", "size")).reset_index()
+        monthly = daily.assign(month=daily.date.dt.to_period("M").dt.to_timestamp()).groupby(["month"] + keys, observed=True)[["sales", "onpromotion", "count"]].sum().reset_index().rename({"month": "date"}, axis=1)
+        rollups[(level, "D")] = daily
+        rollups[(level, "M")] = monthly
+
+    for key, value in rollups.items():
+        value["sales"] = value["sales"].astype("float64")
+        value["onpromotion"] = value["onpromotion"].astype("int64")
+        value["count"] = value["count"].astype("int32")
+    return rollups
+
+def merge_rollups(a, b):
+    """
+    두 집계 결과(예: 청크 별 build_rollups 결과)를 더해서 합치는 함수
+    sales / onpromotion / count 가 모두 합계이므로 같은 (날짜, key) 끼리 더하면 전체 집계와 같음
+    """
+    merged = {}
+    for key, left in a.items():
+        level, freq = key
+        keys = ["date"] + levels[level]
+        value = pd.concat([left, b[key]], ignore_index=True)
+        for col in levels[level]:
+            ## 청크마다 category 가 다를 수 있으므로 값 기준으로 합침
+            if not pd.api.types.is_numeric_dtype(value[col]):
+                value[col] = value[col].astype(str)
+        value = value.groupby(keys, sort=True)[["sales", "onpromotion", "count"]].sum().reset_index()
+        for col in levels[level]:
+            if value[col].dtype == object:
+                value[col] = value[col].astype("category")
+        merged[key] = value.astype({"sales": "float64", "onpromotion": "int64", "count": "int32"})
+    return merged
+
+def rollup_dir(root, version_key):
+    return os.path.join(root, f"rollup_{version_key}")
+
+def rollup_path(root, version_key, level, freq):
+    return os.path.join(rollup_dir(root, version_key), f"{level}_{freq}.parquet")
+
+def temp_path(path):
+    """
+    같은 폴더의 임시 경로 (확장자 유지 : np.save 는 .npy 로 끝나지 않으면 붙임)
+    """
+    base, ext = os.path.splitext(path)
+    return f"{base}.{os.getpid()}.{threading.get_ident()}.tmp{ext}"
+
+def prune_versions(root, prefix, keep=keep_versions):
+    """
+    prefix 로 시작하는 데이터 버전 폴더 중 최근 keep 개만 남기고 삭제 (쓰는 중인 임시 폴더는 제외)
+    """
+    def mtime(path):
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return 0
+
+    paths = [os.path.join(root, name) for name in os.listdir(root) if name.startswith(prefix) and ".tmp" not in name]
+    for path in sorted(paths, key=mtime)[:max(len(paths) - keep, 0)]:
+        shutil.rmtree(path, ignore_errors=True)
+
+def write_rollups(rollups, root, version_key, totals=None):
+    """
+    집계 결과를 데이터 버전 별 폴더에 Parquet 로 저장하는 함수
+    임시 폴더에 모두 쓴 뒤 폴더 이름을 바꿔서, 읽는 쪽에서는 완성된 폴더만 보임
+    totals : 집계에 사용한 매장 / 제품군 별 Sales 합계 (추가 적재 시 판매하지 않는 조합이 바뀌었는지 확인하는 용도)
+    이전 버전 폴더는 최근 keep_versions 개만 남김
+    """
+    path = rollup_dir(root, version_key)
+    temp = temp_path(path)
+    os.makedirs(temp)
+    for (level, freq), value in rollups.items():
+        value.to_parquet(os.path.join(temp, os.path.basename(rollup_path(root, version_key, level, freq))), index=False)
+    if totals is not None:
+        totals.rename("sales").reset_index().astype({"family": str}).to_parquet(
+            os.path.join(temp, os.path.basename(pair_totals_path(root, version_key))), index=False)
+    try:
+        os.replace(temp, path)
+    except OSError:
+        ## 다른 작업이 같은 버전을 먼저 저장함
+        shutil.rmtree(temp, ignore_errors=True)
+    prune_versions(root, "rollup_")
+
+def pair_totals_path(root, version_key):
+    return os.path.join(rollup_dir(root, version_key), "pair_totals.parquet")
+
+def read_pair_totals(root, version_key):
+    path = pair_totals_path(root, version_key)
+    if not os.path.exists(path):
+        return None
+    return pd.read_parquet(path).set_index(["store_nbr", "family"]).sales
+
+def read_rollup(root, version_key, level, freq="D"):
+    """
+    저장된 집계 결과를 읽는 함수 (없으면 None)
+    """
+    path = rollup_path(root, version_key, level, freq)
+    if not os.path.exists(path):
+        return None
+    return pd.read_parquet(path)
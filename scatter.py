@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import streamlit as st
+import pandas as pd
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+
+# 점 개수가 이 값보다 많으면 산점도 대신 2D 히스토그램(밀도)으로 그림
+point_threshold = 20000
+
+
+def fit_ols(x, y):
+    """
+    y = slope * x + intercept 최소제곱 회귀 (결측 제외)
+    반환값 : {"slope", "intercept", "r2", "n"}
+    """
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    valid = ~(np.isnan(x) | np.isnan(y))
+    x, y = x[valid], y[valid]
+    if len(x) < 2 or np.ptp(x) == 0:
+        return {"slope": np.nan, "intercept": np.nan, "r2": np.nan, "n": len(x)}
+
+    slope, intercept = np.polyfit(x, y, 1)
+    residual = y - (slope * x + intercept)
+    total = ((y - y.mean()) ** 2).sum()
+    r2 = 1 - (residual ** 2).sum() / total if total > 0 else np.nan
+    return {"slope": slope, "intercept": intercept, "r2": r2, "n": len(x)}
+
+def scatter_chart(df, x, y, fit=None, title=None, threshold=point_threshold, color=None):
+    """
+    점 개수에 따라 산점도 또는 2D 히스토그램(밀도)으로 그리는 Plotly 차트
+    fit(fit_ols 결과)을 주면 회귀선을 겹쳐서 그림
+    """
+    if len(df) > threshold:
+        ## 서버에서 2D 히스토그램을 계산해 격자 값만 전송
+        a = df[[x, y]].dropna()
+        counts, x_edges, y_edges = np.histogram2d(a[x], a[y], bins=100)
+        fig = go.Figure(go.Heatmap(x=(x_edges[:-1] + x_edges[1:]) / 2, y=(y_edges[:-1] + y_edges[1:]) / 2,
+                                   z=np.where(counts.T > 0, counts.T, np.nan), colorscale="Blues", colorbar=dict(title="count")))
+        fig.update_layout(title=title, xaxis_title=x, yaxis_title=y)
+    else:
+        fig = px.scatter(df, x=x, y=y, title=title, color_discrete_sequence=[color] if color else None)
+
+    if fit is not None and not np.isnan(fit["slope"]):
+        xs = np.array([df[x].min(), df[x].max()], dtype="float64")
+        fig.add_trace(go.Scatter(x=xs, y=fit["slope"] * xs + fit["intercept"], mode="lines", line=dict(color="red"),
+                                 name="OLS (R²={:.3f})".format(fit["r2"])))
+    st.plotly_chart(fig)
+
+def scatter_ax(ax, df, x, y, threshold=point_threshold, color=None):
+    """
+    점 개수에 따라 산점도 또는 hexbin(밀도)으로 그리는 matplotlib 차트
+    """
+    if len(df) > threshold:
+        ax.hexbin(df[x], df[y], gridsize=60, bins="log", mincnt=1, cmap="Reds" if color == "r" else "Blues")
+        ax.set_xlabel(x)
+        ax.set_ylabel(y)
+    else:
+        df.plot.scatter(x=x, y=y, ax=ax, color=color)
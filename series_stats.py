@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+import os
+import warnings
+from contextlib import nullcontext
+import pandas as pd
+import numpy as np
+from scipy import stats
+from statsmodels.tsa.seasonal import STL
+from statsmodels.tsa.stattools import adfuller, kpss, acf, pacf
+import pools
+import rollup
+
+# 분석 단위 별 시계열 키 (store_family 는 1,782 개 시계열)
+levels = {
+    "store": ["store_nbr"],
+    "family": ["family"],
+    "cluster": ["cluster"],
+    "store_family": ["store_nbr", "family"],
+}
+# 계절 주기(주간)와 ACF / PACF lag 수
+period = 7
+nlags = 28
+# process pool 에 한 번에 넘기는 시계열 수
+batch_size = 32
+# 분해 결과 (observed, trend, seasonal, resid)
+components = ["observed", "trend", "seasonal", "resid"]
+
+
+## 시계열 하나에 대한 분석
+## 앞쪽 결측(매장 오픈 전)은 제외하고, 중간 결측(12/25 등)은 선형 보간
+
+def prepare_series(y):
+    """
+    앞뒤 결측을 잘라내고 중간 결측을 선형 보간하는 함수
+    반환값 : (보간된 값, 시작 위치)
+    """
+    valid = np.flatnonzero(~np.isnan(y))
+    if len(valid) == 0:
+        return y[:0], 0
+    start, end = valid[0], valid[-1] + 1
+    y = y[start:end].astype("float64")
+    missing = np.isnan(y)
+    if missing.any():
+        y[missing] = np.interp(np.flatnonzero(missing), np.flatnonzero(~missing), y[~missing])
+    return y, start
+
+def strength(component, resid):
+    """
+    분해 성분의 강도 (Hyndman) : max(0, 1 - Var(resid) / Var(component + resid))
+    """
+    total = np.var(component + resid)
+    return float(max(0.0, 1 - np.var(resid) / total)) if total > 0 else np.nan
+
+def promotion_test(y, promo):
+    """
+    프로모션이 있는 날 / 없는 날의 Sales 비교 (Mann-Whitney U) 와 onpromotion - Sales Spearman 상관계수
+    """
+    result = {"promo_days": 0, "promo_mean": np.nan, "no_promo_mean": np.nan, "promo_lift": np.nan, "promo_mw_p": np.nan,
+              "promo_spearman": np.nan, "promo_spearman_p": np.nan}
+    valid = ~(np.isnan(y) | np.isnan(promo))
+    y, promo = y[valid], promo[valid]
+    on = promo > 0
+    result["promo_days"] = int(on.sum())
+    if on.any() and (~on).any():
+        result["promo_mean"], result["no_promo_mean"] = float(y[on].mean()), float(y[~on].mean())
+        if result["no_promo_mean"] > 0:
+            result["promo_lift"] = result["promo_mean"] / result["no_promo_mean"] - 1
+        result["promo_mw_p"] = float(stats.mannwhitneyu(y[on], y[~on], alternative="two-sided").pvalue)
+    if len(y) > 2 and np.ptp(promo) > 0 and np.ptp(y) > 0:
+        r = stats.spearmanr(promo, y)
+        result["promo_spearman"], result["promo_spearman_p"] = float(r.statistic), float(r.pvalue)
+    return result
+
+def analyze_series(y, promo):
+    """
+    시계열 하나의 STL 분해, ADF / KPSS 정상성 검정, ACF / PACF, 프로모션 효과 검정
+    반환값 : (요약 dict, acf, pacf, 분해 성분 (4 x len(y)) 배열)
+    """
+    T = len(y)
+    parts = np.full((len(components), T), np.nan, dtype="float32")
+    empty = np.full(nlags + 1, np.nan, dtype="float32")
+    x, start = prepare_series(y)
+
+    summary = {"n_obs": len(x), "trend_strength": np.nan, "seasonal_strength": np.nan, "adf_stat": np.nan, "adf_p": np.nan,
+               "kpss_stat": np.nan, "kpss_p": np.nan}
+    summary.update(promotion_test(y, promo))
+    if len(x) < 2 * period + nlags or np.ptp(x) == 0:
+        return summary, empty, empty.copy(), parts
+
+    decomposition = STL(x, period=period).fit()
+    parts[:, start:start + len(x)] = np.vstack([x, decomposition.trend, decomposition.seasonal, decomposition.resid])
+    summary["trend_strength"] = strength(decomposition.trend, decomposition.resid)
+    summary["seasonal_strength"] = strength(decomposition.seasonal, decomposition.resid)
+
+    with warnings.catch_warnings():
+        ## KPSS 는 p-value 가 표의 범위를 벗어나면 경계값과 함께 경고를 냄
+        warnings.simplefilter("ignore")
+        summary["adf_stat"], summary["adf_p"] = adfuller(x, maxlag=2 * period, autolag="AIC")[:2]
+        summary["kpss_stat"], summary["kpss_p"] = kpss(x, regression="c", nlags="auto")[:2]
+        acf_values = acf(x, nlags=nlags, fft=True)
+        pacf_values = pacf(x, nlags=nlags, method="ywm")
+    return summary, acf_values.astype("float32"), pacf_values.astype("float32"), parts
+
+def analyze_batch(batch):
+    """
+    process pool worker : 시계열 여러 개를 한 번에 분석
+    batch : (Sales 배열, onpromotion 배열) - 모두 (series x day)
+    """
+    values, promo = batch
+    return [analyze_series(y, p) for y, p in zip(values, promo)]
+
+
+## 전체 시계열 배치 실행
+
+def run(keys, values, promo, n_jobs=None, progress=None):
+    """
+    (series x day) Sales / onpromotion 배열의 모든 시계열을 batch_size 개씩 나눠 process pool 에서 분석하는 함수
+    keys : 시계열 키 DataFrame (values 의 행 순서)
+    progress : 진행률 콜백 progress(비율, 메시지) (예: jobs.report)
+    반환값 : {"summary", "acf", "pacf", "components"}
+    """
+    batches = [(values[i:i + batch_size], promo[i:i + batch_size]) for i in range(0, len(values), batch_size)]
+    n_jobs = n_jobs or os.cpu_count() or 1
+    results = []
+    with pools.process_pool(n_jobs) if n_jobs > 1 else nullcontext() as executor:
+        for i, batch in enumerate((executor.map if executor else map)(analyze_batch, batches)):
+            results.extend(batch)
+            if progress:
+                progress((i + 1) / len(batches), "{:,} / {:,} series".format(len(results), len(values)))
+
+    summary = pd.concat([keys.reset_index(drop=True), pd.DataFrame([r[0] for r in results])], axis=1)
+    ## ADF 는 단위근이 없어야(p < 0.05), KPSS 는 정상성을 기각하지 않아야(p > 0.05) 정상 시계열로 판단
+    summary["stationary"] = (summary.adf_p < 0.05) & (summary.kpss_p > 0.05)
+    return {
+        "summary": summary,
+        "acf": np.vstack([r[1] for r in results]),
+        "pacf": np.vstack([r[2] for r in results]),
+        "components": np.stack([r[3] for r in results]),
+    }
+
+
+## Results store (data/cache/stats_<version_key>/<level>_*)
+
+def stats_dir(root, version_key):
+    return os.path.join(root, f"stats_{version_key}")
+
+def result_paths(root, version_key, level):
+    path = os.path.join(stats_dir(root, version_key), level)
+    return {"summary": path + "_summary.parquet", "acf": path + "_acf.npy", "pacf": path + "_pacf.npy",
+            "components": path + "_components.npy", "dates": path + "_dates.npy"}
+
+def write_results(result, dates, root, version_key, level):
+    """
+    분석 결과를 데이터 버전 별 폴더에 저장하는 함수
+    임시 파일에 모두 쓴 뒤 바꿔치기 (has_results 는 모든 파일이 있어야 True 라서 쓰다 만 결과는 보이지 않음)
+    이전 버전 폴더는 최근 rollup.keep_versions 개만 남김
+    """
+    os.makedirs(stats_dir(root, version_key), exist_ok=True)
+    paths = result_paths(root, version_key, level)
+    temps = {name: rollup.temp_path(path) for name, path in paths.items()}
+    result["summary"].to_parquet(temps["summary"], index=False)
+    for name in ["acf", "pacf", "components"]:
+        np.save(temps[name], result[name])
+    np.save(temps["dates"], np.asarray(dates, dtype="datetime64[D]"))
+    for name, path in paths.items():
+        os.replace(temps[name], path)
+
+    rollup.prune_versions(root, "stats_")
+
+def has_results(root, version_key, level):
+    return all(os.path.exists(p) for p in result_paths(root, version_key, level).values())
+
+def read_results(root, version_key, level):
+    """
+    저장된 분석 결과를 읽는 함수 (없으면 None)
+    분해 성분은 memory map 으로 열어서 선택한 시계열만 읽음
+    """
+    if not has_results(root, version_key, level):
+        return None
+    paths = result_paths(root, version_key, level)
+    return {
+        "summary": pd.read_parquet(paths["summary"]),
+        "acf": np.load(paths["acf"]),
+        "pacf": np.load(paths["pacf"]),
+        "components": np.load(paths["components"], mmap_mode="r"),
+        "dates": pd.DatetimeIndex(np.load(paths["dates"])),
+    }
+
+
+if __name__ == "__main__":
+    ## 모든 분석 단위의 결과를 미리 계산 (python series_stats.py)
+    import prepare
+    for level in levels:
+        prepare.series_statistics(level)
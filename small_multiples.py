@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+import os
+import io
+import pickle
+from contextlib import nullcontext
+import streamlit as st
+import pandas as pd
+import numpy as np
+from matplotlib.figure import Figure
+import pools
+
+
+## Small multiples
+## 데이터를 groupby 로 한 번만 나누고, 패널(family / store / cluster 하나)마다 worker 에서 이미지로 그림
+## panel_func(ax, data, **kwargs) 는 모듈 최상위 함수여야 함 (process pool 로 전달)
+
+def _render_panel(job):
+    panel_func, data, title, figsize, fmt, kwargs = job
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    panel_func(ax, data, **kwargs)
+    ax.set_title(title, fontsize=12)
+    fig.tight_layout()
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=fmt)
+    return buffer.getvalue()
+
+def render_panels(df, by, panel_func, order=None, titles=None, columns=None, figsize=(4, 4), fmt="png", n_jobs=None, progress=None, **kwargs):
+    """
+    df 를 by 컬럼으로 한 번 나누고 각 패널을 process pool 에서 그리는 함수
+    order : 패널 순서 (기본값은 by 값 순서), titles : {by 값: 제목}, columns : 패널에 넘길 컬럼
+    progress : 진행률 콜백 progress(비율, 메시지) (예: jobs.report)
+    반환값 : [(by 값, 제목, 이미지 bytes)]
+    """
+    groups = {key: (g[columns] if columns else g) for key, g in df.groupby(by, observed=True, sort=False)}
+    order = [key for key in (order if order is not None else groups.keys()) if key in groups]
+    titles = titles or {}
+
+    panel_jobs = [(panel_func, groups[key], titles.get(key, str(key)), figsize, fmt, kwargs) for key in order]
+    n_jobs = n_jobs or os.cpu_count() or 1
+    images = []
+    with pools.process_pool(n_jobs) if n_jobs > 1 else nullcontext() as executor:
+        for image in (executor.map if executor else map)(_render_panel, panel_jobs):
+            images.append(image)
+            if progress:
+                progress(len(images) / len(panel_jobs), "{} / {} panels".format(len(images), len(panel_jobs)))
+
+    return [(key, titles.get(key, str(key)), image) for key, image in zip(order, images)]
+
+def cached_panels(name, root, version_key, build):
+    """
+    그린 패널을 데이터 버전 별 파일로 저장해 두고 다시 읽는 함수 (없을 때만 build() 실행)
+    """
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, f"{name}_{version_key}.pkl")
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    panels = build()
+    for file in os.listdir(root):
+        if file.startswith(f"{name}_") and file.endswith(".pkl"):
+            os.remove(os.path.join(root, file))
+    with open(path, "wb") as f:
+        pickle.dump(panels, f)
+    return panels
+
+def show_panels(panels, ncols=5, title=None):
+    """
+    패널 이미지를 ncols 개 열의 격자로 출력하는 함수
+    """
+    if title:
+        st.markdown(f"#### {title}")
+    for i in range(0, len(panels), ncols):
+        cols = st.columns(ncols)
+        ## 제목은 패널 이미지 안에 그려져 있으므로 caption 은 따로 쓰지 않음
+        for col, (key, _, image) in zip(cols, panels[i:i + ncols]):
+            with col:
+                st.image(image, width="stretch")
+
+## Panel functions
+
+def scatter_panel(ax, data, x, y, vline=None, color=None):
+    """
+    x / y 산점도 패널 (vline 이 있으면 세로 기준선)
+    """
+    ax.scatter(data[x], data[y], s=6, color=color)
+    ax.set_xlabel(x)
+    ax.set_ylabel(y)
+    if vline is not None:
+        ax.axvline(x=vline, color="r", linestyle="--")
+
+def line_panel(ax, data, x, y, color=None):
+    """
+    x / y 선 그래프 패널
+    """
+    data = data.sort_values(x)
+    ax.plot(data[x], data[y], color=color)
+    ax.tick_params(axis="x", labelrotation=45)
@@ -1,8 +1,101 @@
+# -*- coding: utf-8 -*-
 import streamlit as st
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 import utils
 import eda_app
+import prepare
+import series_stats
+import jobs
+
+
+def series_label(summary, level):
+    """
+    분석 단위 별 시계열 이름 (예: "1 - AUTOMOTIVE")
+    """
+    keys = series_stats.levels[level]
+    return summary[keys].astype(str).agg(" - ".join, axis=1)
+
+def fig_Stationarity_Summary(summary):
+    """
+    ADF / KPSS 검정 결과와 추세 / 계절성 강도 분포
+    """
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Series", "{:,}".format(len(summary)))
+    col2.metric("Stationary (ADF p<0.05 & KPSS p>0.05)", "{:,}".format(int(summary.stationary.sum())))
+    col3.metric("Significant promotion effect (p<0.05)", "{:,}".format(int((summary.promo_mw_p < 0.05).sum())))
+
+    fig = px.scatter(summary, x="trend_strength", y="seasonal_strength", color="stationary", hover_name="series",
+                     title="Trend / Seasonal Strength (STL)")
+    st.plotly_chart(fig)
+
+def fig_Decomposition(components, title):
+    """
+    STL 분해 결과 (observed / trend / seasonal / resid)
+    """
+    fig = make_subplots(rows=len(series_stats.components), cols=1, shared_xaxes=True, subplot_titles=series_stats.components)
+    for i, name in enumerate(series_stats.components):
+        fig.add_trace(go.Scatter(x=components.date, y=components[name], mode="lines", name=name), row=i + 1, col=1)
+    fig.update_layout(height=800, title=title, showlegend=False)
+    st.plotly_chart(fig)
+
+def fig_Autocorrelation(values, n_obs, title):
+    """
+    ACF / PACF 막대 그래프 (점선은 95% 신뢰구간)
+    """
+    bound = 1.96 / np.sqrt(max(n_obs, 1))
+    fig = go.Figure(go.Bar(x=np.arange(len(values)), y=values))
+    fig.add_hline(y=bound, line_dash="dash", line_color="red")
+    fig.add_hline(y=-bound, line_dash="dash", line_color="red")
+    fig.update_layout(title=title, xaxis_title="lag")
+    st.plotly_chart(fig)
+
+def stat_app():
+    st.subheader("Statistics")
+    st.markdown("✔ 매장 / 제품군 / 클러스터 / (매장, 제품군) 별 일별 Sales 시계열을 분석합니다.")
+    st.markdown("✔ STL 분해(주간 계절성), ADF / KPSS 정상성 검정, ACF / PACF, 프로모션 효과 검정(Mann-Whitney U, Spearman)")
+    st.markdown("✔ 모든 시계열을 한 번에 배치로 계산해 저장해 두고, 이 화면에서는 저장된 결과만 읽습니다.")
+
+    level = st.selectbox("LEVEL", list(series_stats.levels), index=0)
+
+    # 저장된 결과가 없으면 버튼을 눌렀을 때만 background 작업으로 계산 (python series_stats.py 로 미리 계산 가능)
+    # 다른 세션에서 이미 시작한 작업이면 그 진행률을 표시
+    if not prepare.series_statistics_ready(level) and not jobs.submitted(prepare.series_statistics, level):
+        if not st.button("Run Analysis"):
+            st.info("현재 데이터 버전으로 계산된 분석 결과가 없습니다.")
+            return
+    result = jobs.result(prepare.series_statistics, level, label=f"Series statistics ({level})")
+    if result is None:
+        return
+
+    summary = result["summary"].copy()
+    summary.insert(0, "series", series_label(summary, level))
+
+    st.markdown("---")
+    fig_Stationarity_Summary(summary)
+    st.dataframe(summary.drop(series_stats.levels[level], axis=1), height=400)
+
+    # 시계열 하나의 상세 결과
+    st.markdown("---")
+    series = st.selectbox("SERIES", summary.series.tolist())
+    position = int(np.flatnonzero(summary.series.to_numpy() == series)[0])
+    row = summary.iloc[position]
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("ADF p-value", "{:.4f}".format(row.adf_p))
+    col2.metric("KPSS p-value", "{:.4f}".format(row.kpss_p))
+    col3.metric("Promotion lift", "{:.1%}".format(row.promo_lift) if pd.notnull(row.promo_lift) else "-")
+    col4.metric("Promotion Spearman", "{:.3f}".format(row.promo_spearman) if pd.notnull(row.promo_spearman) else "-")
+
+    fig_Decomposition(prepare.series_components(level, position), f"STL Decomposition : {series}")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        fig_Autocorrelation(result["acf"][position], row.n_obs, "ACF")
+    with col2:
+        fig_Autocorrelation(result["pacf"][position], row.n_obs, "PACF")
@@ -0,0 +1,362 @@
+# -*- coding: utf-8 -*-
+import os
+import argparse
+import numpy as np
+import pandas as pd
+from dateutil.easter import easter
+import cleaning
+
+# 기본 기간 (원본과 같음, test 는 train 다음 날부터 test_days 일)
+train_start = "2013-01-01"
+train_end = "2017-08-15"
+test_days = 16
+# 한 번에 만들어서 파일에 추가하는 날짜 수 (메모리 사용량 = chunk_days x 매장 수 x 제품군 수)
+chunk_days = 30
+# 결과 위치 (out/data/*.csv, utils 의 경로가 data/ 기준이므로 out 에서 실행하면 같은 로더로 읽음)
+output_dir = os.path.join("data", "cache", "synthetic")
+
+# 제품군 별 매장 하루 평균 판매량 (원본 데이터의 대략적인 크기)
+family_levels = {
+    "AUTOMOTIVE": 6, "BABY CARE": 0.2, "BEAUTY": 4, "BEVERAGES": 2400, "BOOKS": 0.1, "BREAD/BAKERY": 450,
+    "CELEBRATION": 9, "CLEANING": 1100, "DAIRY": 700, "DELI": 260, "EGGS": 170, "FROZEN FOODS": 150,
+    "GROCERY I": 3800, "GROCERY II": 22, "HARDWARE": 1.2, "HOME AND KITCHEN I": 20, "HOME AND KITCHEN II": 17,
+    "HOME APPLIANCES": 0.5, "HOME CARE": 180, "LADIESWEAR": 7, "LAWN AND GARDEN": 6, "LINGERIE": 7, "LIQUOR,WINE,BEER": 85,
+    "MAGAZINES": 3, "MEATS": 340, "PERSONAL CARE": 270, "PET SUPPLIES": 4, "PLAYERS AND ELECTRONICS": 6, "POULTRY": 350,
+    "PREPARED FOODS": 100, "PRODUCE": 1300, "SCHOOL AND OFFICE SUPPLIES": 3, "SEAFOOD": 22,
+}
+# 무게로 파는 제품군 (판매량이 소수)
+weight_families = ["BREAD/BAKERY", "DELI", "FROZEN FOODS", "MEATS", "POULTRY", "PREPARED FOODS", "PRODUCE", "SEAFOOD"]
+# 도시 : (주, 매장 배정 가중치)
+cities = {
+    "Quito": ("Pichincha", 18), "Guayaquil": ("Guayas", 8), "Cuenca": ("Azuay", 3), "Santo Domingo": ("Santo Domingo de los Tsachilas", 3),
+    "Ambato": ("Tungurahua", 2), "Babahoyo": ("Los Rios", 1), "Cayambe": ("Pichincha", 1), "Daule": ("Guayas", 1),
+    "El Carmen": ("Manabi", 1), "Esmeraldas": ("Esmeraldas", 1), "Guaranda": ("Bolivar", 1), "Ibarra": ("Imbabura", 1),
+    "Latacunga": ("Cotopaxi", 2), "Libertad": ("Guayas", 1), "Loja": ("Loja", 1), "Machala": ("El Oro", 2),
+    "Manta": ("Manabi", 1), "Playas": ("Guayas", 1), "Puyo": ("Pastaza", 1), "Quevedo": ("Los Rios", 1),
+    "Riobamba": ("Chimborazo", 1), "Salinas": ("Santa Elena", 1),
+}
+# 매장 유형 별 비율 / 규모
+store_types = {"A": (0.17, 1.8), "B": (0.15, 1.0), "C": (0.28, 0.7), "D": (0.33, 1.0), "E": (0.07, 0.6)}
+# 요일(월 ~ 일) 별 판매 패턴
+weekly = np.array([0.92, 0.85, 0.86, 0.82, 0.93, 1.17, 1.25])
+# (매장, 제품군) 조합이 전 기간 판매하지 않을 확률 / 원본 외에 새로 오픈하는 매장의 비율
+inactive_rate = 0.04
+opening_rate = 0.1
+
+
+## Synthetic data
+## 원본(Favorita)과 같은 스키마의 train / test / transactions / stores / oil / holidays 를 만드는 생성기
+## - 요일 / 연간 / 월급날 / 추세 / 휴일(양도된 휴일, 브릿지, 근무일 포함) / 이벤트 패턴과 프로모션 효과
+## - 오픈 전 기간의 판매량 0, 판매하지 않는 (매장, 제품군) 조합, 중간부터 판매를 시작하는 제품군
+## - train / transactions 는 chunk_days 일씩 만들어서 CSV 에 이어 씀 (전체를 메모리에 올리지 않음)
+
+def family_names(n):
+    """
+    원본 제품군 이름 (n 이 더 크면 FAMILY 034 ... 를 추가)
+    """
+    names = sorted(family_levels)[:n]
+    return names + [f"FAMILY {k:03d}" for k in range(len(names) + 1, n + 1)]
+
+def make_stores(n, rng):
+    names = list(cities)
+    weights = np.array([cities[c][1] for c in names], dtype="float64")
+    city = rng.choice(names, size=n, p=weights / weights.sum())
+    types = list(store_types)
+    kind = rng.choice(types, size=n, p=[store_types[t][0] for t in types])
+    return pd.DataFrame({
+        "store_nbr": np.arange(1, n + 1),
+        "city": city,
+        "state": [cities[c][0] for c in city],
+        "type": kind,
+        "cluster": rng.integers(1, 18, size=n),
+    })
+
+def make_openings(stores, start, end, rng):
+    """
+    매장 별 오픈 일자 (cleaning.store_openings 의 매장은 그 일자를 사용, 나머지 매장 중 opening_rate 만큼 기간 중에 오픈)
+    반환값 : (전체 오픈 일자, cleaning.store_openings 에 없는 오픈 일자) - 데이터 시작 전에 오픈한 매장은 없음
+    """
+    known = cleaning.store_openings[cleaning.store_openings.store_nbr.isin(stores.store_nbr)]
+    others = stores.store_nbr[~stores.store_nbr.isin(known.store_nbr)].to_numpy()
+    chosen = others[rng.random(len(others)) < opening_rate]
+    span = max((end - start).days - 60, 1)
+    extra = pd.DataFrame({"store_nbr": chosen, "opening_date": start + pd.to_timedelta(rng.integers(30, span + 30, size=len(chosen)), unit="D")})
+    return pd.concat([known, extra], ignore_index=True), extra
+
+def nth_weekday(year, month, weekday, n):
+    first = pd.Timestamp(year, month, 1)
+    return first + pd.Timedelta(days=(weekday - first.dayofweek) % 7 + 7 * (n - 1))
+
+def make_holidays(stores, start, end, rng):
+    """
+    휴일 / 이벤트 목록 (원본과 같은 type / locale / description 규칙)
+    factor 컬럼 : 판매량에 곱하는 휴일 효과 (파일에는 저장하지 않음)
+    """
+    rows = []
+
+    def add(date, kind, description, factor, locale="National", name="Ecuador", transferred=False, pair=None):
+        rows.append({"date": pd.Timestamp(date), "type": kind, "locale": locale, "locale_name": name,
+                     "description": description, "transferred": transferred, "factor": factor, "pair": pair})
+
+    states = sorted(stores.state.unique())
+    store_cities = sorted(stores.city.unique())
+    ## 주 / 도시 별 기념일 (매년 같은 날짜)
+    provincial = {s: (int(m), int(d)) for s, m, d in zip(states, rng.integers(1, 13, len(states)), rng.integers(1, 29, len(states)))}
+    local = {c: [(kind, int(m), int(d)) for kind, m, d in zip(rng.choice(["Fundacion", "Cantonizacion", "Independencia"], 2, replace=False),
+                                                               rng.integers(1, 13, 2), rng.integers(1, 29, 2))] for c in store_cities}
+
+    for year in range(start.year - 1, end.year + 1):
+        add(f"{year}-01-01", "Holiday", "Primer dia del ano", 0.05)
+        e = pd.Timestamp(easter(year))
+        add(e - pd.Timedelta(days=48), "Holiday", "Carnaval", 1.1)
+        add(e - pd.Timedelta(days=47), "Holiday", "Carnaval", 1.1)
+        add(e - pd.Timedelta(days=2), "Holiday", "Viernes Santo", 1.1)
+        add(f"{year}-05-01", "Holiday", "Dia del Trabajo", 1.05)
+
+        ## 화~목 의 휴일 중 일부는 금요일 / 월요일로 양도 (Holiday transferred=True + Transfer 행)
+        for month, day, description in [(5, 24, "Batalla de Pichincha"), (8, 10, "Primer Grito de Independencia"), (10, 9, "Independencia de Guayaquil")]:
+            date = pd.Timestamp(year, month, day)
+            if date.dayofweek in (1, 2, 3) and rng.random() < 0.5:
+                add(date, "Holiday", description, 1.0, transferred=True, pair=date)
+                moved = date + pd.Timedelta(days=4 - date.dayofweek) if date.dayofweek == 3 else date - pd.Timedelta(days=date.dayofweek)
+                add(moved, "Transfer", f"Traslado {description}", 1.1, pair=date)
+            else:
+                add(date, "Holiday", description, 1.1)
+
+        ## 화 / 목 휴일의 브릿지(월 / 금) 와 그 대신 일하는 토요일(Work Day)
+        for month, day, description in [(11, 2, "Dia de Difuntos"), (12, 25, "Navidad")]:
+            date = pd.Timestamp(year, month, day)
+            if date.dayofweek in (1, 3) and rng.random() < 0.5:
+                bridge = date - pd.Timedelta(days=1) if date.dayofweek == 1 else date + pd.Timedelta(days=1)
+                add(bridge, "Bridge", f"Puente {description}", 1.05)
+                add(bridge + pd.Timedelta(days=(5 - bridge.dayofweek) % 7 + 7), "Work Day", f"Recupero Puente {description}", 0.95)
+        add(f"{year}-11-02", "Holiday", "Dia de Difuntos", 1.05)
+        add(f"{year}-11-03", "Holiday", "Independencia de Cuenca", 1.05)
+
+        ## 크리스마스 전후 추가 휴일
+        for k in range(4, 0, -1):
+            add(pd.Timestamp(year, 12, 25) - pd.Timedelta(days=k), "Additional", f"Navidad-{k}", 1.2 + 0.1 * (4 - k))
+        add(f"{year}-12-25", "Holiday", "Navidad", 1.0)
+        add(f"{year}-12-26", "Additional", "Navidad+1", 0.9)
+        add(f"{year}-12-31", "Additional", "Primer dia del ano-1", 1.2)
+
+        ## 이벤트
+        mother = nth_weekday(year, 5, 6, 2)
+        add(mother - pd.Timedelta(days=1), "Additional", "Dia de la Madre-1", 1.1)
+        add(mother, "Event", "Dia de la Madre", 1.05)
+        black_friday = nth_weekday(year, 11, 3, 4) + pd.Timedelta(days=1)
+        add(black_friday, "Event", "Black Friday", 1.1)
+        add(black_friday + pd.Timedelta(days=3), "Event", "Cyber Monday", 1.05)
+        if year % 4 == 2:
+            for k, day in enumerate([14, 19, 24]):
+                add(f"{year}-06-{day}", "Event", f"Mundial de futbol: Partido {k + 1}", 0.95)
+
+        for state, (month, day) in provincial.items():
+            add(pd.Timestamp(year, month, day), "Holiday", f"Provincializacion de {state}", 1.05, "Regional", state)
+        for city, days in local.items():
+            for kind, month, day in days:
+                add(pd.Timestamp(year, month, day), "Holiday", f"{kind} de {city}", 1.1, "Local", city)
+
+    holidays = pd.DataFrame(rows)
+    holidays = holidays[(holidays.date >= start - pd.Timedelta(days=300)) & (holidays.date <= end)]
+    ## 같은 지역 / 같은 날짜의 휴일은 하나만 (먼저 추가한 휴일 유지)
+    holidays = holidays.drop_duplicates(["date", "locale", "locale_name"], keep="first")
+    ## 양도된 휴일은 Transfer 행과 짝이 맞아야 함 (holiday_features.holiday_tables 가 순서대로 짝지음)
+    pairs = holidays.pair.value_counts()
+    holidays = holidays[holidays.pair.isna() | holidays.pair.isin(pairs.index[pairs == 2])]
+    return holidays.drop("pair", axis=1).sort_values("date", kind="stable").reset_index(drop=True)
+
+def holiday_effects(holidays, stores, dates):
+    """
+    (날짜, 매장) 별 휴일 효과 배열 (national x 주 x 도시)
+    """
+    off = (holidays.date - dates[0]).dt.days.to_numpy()
+    rows = holidays[(off >= 0) & (off < len(dates)) & ~holidays.transferred]
+    off = (rows.date - dates[0]).dt.days.to_numpy()
+    effect = np.ones((len(dates), len(stores)))
+    for locale, column in [("National", None), ("Regional", "state"), ("Local", "city")]:
+        mask = (rows.locale == locale).to_numpy()
+        for day, name, factor in zip(off[mask], rows.locale_name[mask], rows.factor[mask]):
+            effect[day, :] *= factor if column is None else np.where(stores[column].to_numpy() == name, factor, 1.0)
+    return effect
+
+def make_oil(start, end, rng):
+    """
+    평일만 있는 유가 (평균으로 돌아가는 로그 랜덤워크, 첫 날과 일부 날짜는 결측)
+    """
+    dates = pd.bdate_range(start, end)
+    log_price = np.empty(len(dates))
+    log_price[0] = np.log(93.0)
+    shocks = rng.normal(0, 0.02, len(dates))
+    for i in range(1, len(dates)):
+        log_price[i] = log_price[i - 1] + 0.002 * (np.log(60.0) - log_price[i - 1]) + shocks[i]
+    price = np.round(np.exp(log_price), 2)
+    price[rng.random(len(dates)) < 0.03] = np.nan
+    price[0] = np.nan
+    return pd.DataFrame({"date": dates.strftime("%Y-%m-%d"), "dcoilwtico": price})
+
+class Generator:
+    """
+    합성 데이터 생성기 (매장 / 제품군 / 날짜 수에 상관없이 chunk_days 일씩 생성)
+    """
+
+    def __init__(self, n_stores=54, n_families=33, start=train_start, end=train_end, seed=0):
+        self.rng = np.random.default_rng(seed)
+        self.start, self.end = pd.Timestamp(start), pd.Timestamp(end)
+        self.test_end = self.end + pd.Timedelta(days=test_days)
+        self.families = family_names(n_families)
+        self.stores = make_stores(n_stores, self.rng)
+        self.openings, self.new_openings = make_openings(self.stores, self.start, self.end, self.rng)
+        self.holidays = make_holidays(self.stores, self.start, self.test_end, self.rng)
+
+        rng = self.rng
+        n_stores, n_families = len(self.stores), len(self.families)
+        ## 매장 규모 x 제품군 크기 x 조합 별 차이 = 조합의 기본 판매량
+        size = self.stores.type.map({t: v[1] for t, v in store_types.items()}).to_numpy() * rng.lognormal(0, 0.3, n_stores)
+        level = np.array([family_levels.get(f, np.exp(rng.normal(2, 2))) for f in self.families])
+        self.base = size[:, None] * level[None, :] * rng.lognormal(0, 0.4, (n_stores, n_families))
+        self.active = rng.random((n_stores, n_families)) >= inactive_rate
+        self.weight = np.isin(self.families, weight_families)
+        ## 판매량이 작은 제품군은 중간부터 판매 시작 (그 전은 0)
+        self.family_start = np.where(level < 10, rng.integers(300, 700, n_families), 0)
+        ## 제품군 별 프로모션 강도 (판매량이 작은 제품군은 거의 없음) / 프로모션은 데이터 시작 후 약 15 개월부터 늘어남
+        self.promo = np.where(level < 1, 0.0, rng.lognormal(0, 1, n_families) * np.log1p(level) / 2)
+        self.promo_start = self.start + pd.Timedelta(days=450)
+        self.school = np.array([f == "SCHOOL AND OFFICE SUPPLIES" for f in self.families])
+        self.opening = np.full(n_stores, np.datetime64("NaT"), dtype="datetime64[ns]")
+        self.opening[self.openings.store_nbr.to_numpy() - 1] = self.openings.opening_date.to_numpy(dtype="datetime64[ns]")
+        self.next_id = 0
+
+    def promotions(self, dates):
+        ramp = np.clip((dates - self.promo_start).days.to_numpy() / 365, 0, 1)
+        rate = ramp[:, None, None] * self.promo[None, None, :] * (self.base > 0)[None, :, :]
+        return self.rng.poisson(rate * (1 + 0.5 * (dates.day.to_numpy() <= 7))[:, None, None])
+
+    def is_open(self, dates):
+        """
+        (날짜, 매장) 별 오픈 여부
+        """
+        opened = np.isnat(self.opening)[None, :] | (dates.to_numpy()[:, None] >= self.opening[None, :])
+        return opened
+
+    def sales(self, dates, onpromotion):
+        """
+        (날짜, 매장, 제품군) 판매량
+        """
+        rng = self.rng
+        day = (dates - self.start).days.to_numpy()
+        doy = dates.dayofyear.to_numpy()
+        season = 1 + 0.08 * np.cos(2 * np.pi * (doy - 355) / 365.25)
+        payday = np.where((dates.day == 15) | dates.is_month_end, 1.08, 1.0)
+        trend = 1 + 0.06 * day / 365.25
+        daily = weekly[dates.dayofweek.to_numpy()] * season * payday * trend
+
+        mean = self.base[None, :, :] * daily[:, None, None] * holiday_effects(self.holidays, self.stores, dates)[:, :, None]
+        mean = mean * np.where(self.school[None, :], 1 + 4 * np.exp(-((doy[:, None] - 245) / 15) ** 2), 1.0)[:, None, :]
+        mean = mean * (1 + 0.15 * np.log1p(onpromotion))
+
+        sold = self.is_open(dates)[:, :, None] & self.active[None, :, :] & (day[:, None] >= self.family_start[None, :])[:, None, :]
+        mean = np.where(sold, mean * rng.lognormal(-0.03, 0.25, mean.shape), 0.0)
+        counts = rng.poisson(mean).astype("float64")
+        return np.where(self.weight[None, None, :], np.round(mean, 3), counts), sold
+
+    def frame(self, dates, values, onpromotion, with_id=True):
+        """
+        (날짜, 매장, 제품군) 배열을 원본 순서(date, store_nbr, family)의 행으로 펼침
+        """
+        n_dates, n_stores, n_families = values.shape if values is not None else onpromotion.shape
+        n = n_dates * n_stores * n_families
+        d = {}
+        if with_id:
+            d["id"] = np.arange(self.next_id, self.next_id + n)
+            self.next_id += n
+        d["date"] = np.repeat(dates.strftime("%Y-%m-%d").to_numpy(), n_stores * n_families)
+        d["store_nbr"] = np.tile(np.repeat(self.stores.store_nbr.to_numpy(), n_families), n_dates)
+        d["family"] = np.tile(np.array(self.families, dtype=object), n_dates * n_stores)
+        if values is not None:
+            d["sales"] = values.reshape(-1)
+        d["onpromotion"] = onpromotion.reshape(-1)
+        return pd.DataFrame(d)
+
+    def transactions(self, dates, values, sold):
+        """
+        매장-일 거래 수 (판매 수량 / 평균 장바구니 크기, 오픈 전 / 판매가 없는 날은 행 없음)
+        """
+        total = values.sum(axis=2)
+        tx = np.round(total / (6.5 * self.rng.lognormal(0, 0.08, total.shape))).clip(0, np.iinfo("int16").max).astype("int64")
+        day, store = np.nonzero(sold.any(axis=2) & (tx > 0))
+        return pd.DataFrame({"date": dates.strftime("%Y-%m-%d").to_numpy()[day],
+                             "store_nbr": self.stores.store_nbr.to_numpy()[store], "transactions": tx[day, store]})
+
+    def chunks(self, days=chunk_days):
+        """
+        train / transactions 를 days 일씩 만드는 함수 (12 월 25 일은 원본처럼 휴점)
+        반환값 : (train, transactions) 반복
+        """
+        all_dates = pd.date_range(self.start, self.end)
+        all_dates = all_dates[~((all_dates.month == 12) & (all_dates.day == 25))]
+        for i in range(0, len(all_dates), days):
+            dates = all_dates[i:i + days]
+            onpromotion = self.promotions(dates) * self.is_open(dates)[:, :, None] * self.active[None, :, :]
+            values, sold = self.sales(dates, onpromotion)
+            yield self.frame(dates, values, onpromotion), self.transactions(dates, values, sold)
+
+    def test(self):
+        dates = pd.date_range(self.end + pd.Timedelta(days=1), self.test_end)
+        onpromotion = self.promotions(dates) * self.is_open(dates)[:, :, None] * self.active[None, :, :]
+        return self.frame(dates, None, onpromotion)
+
+def write_csv(dataframe, path, first):
+    dataframe.to_csv(path, index=False, mode="w" if first else "a", header=first, date_format="%Y-%m-%d")
+
+def generate(out=output_dir, n_stores=54, n_families=33, start=train_start, end=train_end, days=chunk_days, seed=0, progress=None):
+    """
+    out/data 에 원본과 같은 이름 / 스키마의 CSV 를 만드는 함수
+    원본에 없는 오픈 일자는 utils.openings_path(data/store_openings.csv) 에 저장 (prepare.store_openings 가 읽음)
+    반환값 : 테이블 별 행 수
+    """
+    data = os.path.join(out, "data")
+    os.makedirs(data, exist_ok=True)
+    g = Generator(n_stores, n_families, start, end, seed)
+
+    g.stores.to_csv(os.path.join(data, "stores.csv"), index=False)
+    g.holidays.drop("factor", axis=1).to_csv(os.path.join(data, "holidays_events.csv"), index=False, date_format="%Y-%m-%d")
+    oil = make_oil(g.start, g.test_end, g.rng)
+    oil.to_csv(os.path.join(data, "oil.csv"), index=False)
+    openings = os.path.join(data, "store_openings.csv")
+    if len(g.new_openings):
+        g.new_openings.to_csv(openings, index=False, date_format="%Y-%m-%d")
+    elif os.path.exists(openings):
+        os.remove(openings)
+
+    rows = {"train": 0, "transactions": 0}
+    n_chunks = -(-((g.end - g.start).days + 1) // days)
+    for i, (train, transactions) in enumerate(g.chunks(days)):
+        write_csv(train, os.path.join(data, "train.csv"), i == 0)
+        write_csv(transactions, os.path.join(data, "transactions.csv"), i == 0)
+        rows["train"] += len(train)
+        rows["transactions"] += len(transactions)
+        if progress is not None:
+            progress((i + 1) / n_chunks, f"{train.date.iloc[-1]} 까지 생성")
+
+    test = g.test()
+    test.to_csv(os.path.join(data, "test.csv"), index=False)
+    rows.update({"test": len(test), "stores": len(g.stores), "oil": len(oil), "holidays": len(g.holidays)})
+    return rows
+
+
+if __name__ == "__main__":
+    ## python synthetic.py --stores 500 --families 60 --out data/cache/synthetic
+    ## 만든 데이터로 벤치마크 : python benchmark.py --data data/cache/synthetic
+    ## 만든 데이터로 앱 실행 : cd data/cache/synthetic && streamlit run <저장소>/main_app.py
+    parser = argparse.ArgumentParser(description="Favorita 형식의 합성 데이터 생성")
+    parser.add_argument("--out", default=output_dir, help="data/ 폴더를 만들 위치")
+    parser.add_argument("--stores", type=int, default=54)
+    parser.add_argument("--families", type=int, default=33)
+    parser.add_argument("--start", default=train_start)
+    parser.add_argument("--end", default=train_end)
+    parser.add_argument("--chunk-days", type=int, default=chunk_days)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(generate(args.out, args.stores, args.families, args.start, args.end, args.chunk_days, args.seed,
+                   progress=lambda p, msg: print(f"{p:5.0%} {msg}", flush=True)))
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import numpy as np
+import pandas as pd
+import scipy.stats as stats
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ab_test
+
+
+def holiday_frame(n=20000, seed=1):
+    rng = np.random.default_rng(seed)
+    d = pd.DataFrame({"sales": rng.gamma(2, size=n)})
+    d.loc[rng.random(n) < 0.1, "sales"] = np.nan
+    d["dense"] = (rng.random(n) < 0.05).astype("int8")
+    d["sparse"] = d.dense.astype(pd.SparseDtype("int8", 0))
+    return d
+
+
+def test_batch_uses_positive_rows_of_dense_and_sparse_columns():
+    d = holiday_frame()
+    result = ab_test.AB_Test_batch(d, ["dense", "sparse"], "sales", n_jobs=1).set_index("Feature")
+    assert result.loc["dense"].equals(result.loc["sparse"])
+
+    valid = d[d.sales.notnull()]
+    groupA, groupB = valid.sales[valid.dense == 1], valid.sales[valid.dense == 0]
+    assert result.loc["dense", "Test Type"] == "Non-Parametric"
+    assert np.isclose(result.loc["dense", "GroupA_mean"], groupA.mean())
+    assert np.isclose(result.loc["dense", "p-value"], stats.mannwhitneyu(groupA, groupB).pvalue)
+
+
+def test_streaming_stats_pick_the_same_tests_as_batch():
+    rng = np.random.default_rng(3)
+    n = 40000
+    d = pd.DataFrame({"sales": rng.normal(100, 10, n), "group": (rng.random(n) < 0.2).astype("int8")})
+    wide = d.assign(sales=np.where(d.group == 1, 100 + (d.sales - 100) * 1.5, d.sales))
+    skewed = d.assign(sales=rng.gamma(2, size=n))
+
+    for frame in [d, wide, skewed]:
+        batch = ab_test.AB_Test_batch(frame, ["group"], "sales", n_jobs=1)
+        stats_ = ab_test.ABStats(["group"])
+        for chunk in np.array_split(np.arange(n), 7):
+            stats_.update(frame.iloc[chunk], "sales")
+        streaming = stats_.result()
+        assert streaming["Test Type"].tolist() == batch["Test Type"].tolist()
+        assert streaming["Homogeneity"].equals(batch["Homogeneity"])
+        assert np.allclose(streaming["p-value"], batch["p-value"], rtol=0.05)
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cleaning
+
+
+def test_cleaned_pair_totals_match_totals_before_cleaning():
+    dates = pd.date_range("2016-01-01", "2016-03-31")
+    rng = np.random.default_rng(0)
+    train = pd.DataFrame([(date, store, family) for date in dates for store in [1, 2, 3] for family in ["A", "B", "C"]],
+                         columns=["date", "store_nbr", "family"])
+    train["store_nbr"] = train.store_nbr.astype("int16")
+    train["family"] = train.family.astype("category")
+    train["sales"] = rng.gamma(2, 10, len(train)).astype("float32")
+    ## 판매하지 않는 조합과 오픈 전 기간
+    train.loc[(train.store_nbr == 2) & (train.family == "B"), "sales"] = 0
+    openings = pd.DataFrame({"store_nbr": [3], "opening_date": pd.to_datetime(["2016-02-15"])})
+    train.loc[(train.store_nbr == 3) & (train.date < "2016-02-15"), "sales"] = 0
+
+    expected = cleaning.pair_totals(train[cleaning.opening_mask(train, openings)])
+    totals = cleaning.cleaned_pair_totals(*cleaning.clean_train(train, openings=openings))
+    pd.testing.assert_series_equal(totals, expected.sort_index())
+    assert cleaning.pairs_from_totals(totals).values.tolist() == [[2, "B"]]
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import correlation
+
+
+@pytest.mark.parametrize("method", ["pearson", "spearman"])
+def test_correlation_matrix_matches_pandas_with_missing_days(method):
+    rng = np.random.default_rng(0)
+    base = rng.gamma(2, 10, size=(120, 1))
+    X = (base + rng.gamma(2, 5, size=(120, 6))).astype("float32")
+    ## 동순위, 오픈 전 기간, 서로 다른 위치의 결측
+    X[:, 1] = np.round(X[:, 1] / 10)
+    X[:40, 2] = np.nan
+    X[:25, 3] = np.nan
+    X[rng.random(120) < 0.1, 4] = np.nan
+    X[[5, 50, 90], 5] = np.nan
+    labels = pd.Index([f"s{i}" for i in range(6)], name="store_nbr")
+
+    result = correlation.correlation_matrix(X, labels, method)
+    expected = pd.DataFrame(X.astype("float64"), columns=labels).corr(method)
+    np.testing.assert_allclose(result.to_numpy(), expected.to_numpy(), rtol=1e-6, atol=1e-9)
+    assert result.index.equals(labels) and result.columns.equals(labels)
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import features
+
+config = {"lags": [1, 2, 7, 14], "windows": [3, 7], "alphas": [0.1, 0.5], "shift": 1}
+
+
+def series(n_series=6, n_days=60, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.gamma(2, 10, size=(n_series, n_days)).astype("float32")
+    ## 값이 없는 날 (휴점, 오픈 전)
+    X[:, 25] = np.nan
+    X[0, :10] = np.nan
+    return X
+
+
+def assert_same(day, full, t):
+    assert day.keys() == full.keys()
+    for name in full:
+        np.testing.assert_allclose(day[name], full[name][:, t], rtol=1e-5, equal_nan=True, err_msg=name)
+
+
+def test_day_features_match_lag_features():
+    X = series()
+    for shift in [1, 3]:
+        full = features.lag_features(X, config["lags"], config["windows"], shift, config["alphas"])
+        for t in range(X.shape[1]):
+            assert_same(features.day_features(X, t, config["lags"], config["windows"], config["alphas"], shift), full, t)
+
+
+def test_recursive_forecast_features_match_lag_features():
+    X = series()
+    full = features.lag_features(X, **config)
+    start, horizon = 40, 16
+    seen = {}
+
+    def predict_fn(t, values):
+        seen[t] = values
+        ## 실제 값을 예측값으로 돌려주면 피처가 전체 배열로 계산한 피처와 같아야 함
+        return X[:, t]
+
+    history = X.copy()
+    history[:, start:] = np.nan
+    result = features.recursive_forecast(history, start, horizon, predict_fn, **config)
+    np.testing.assert_array_equal(result[:, start:start + horizon], X[:, start:start + horizon])
+    for t in range(start, start + horizon):
+        assert_same(seen[t], full, t)
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils
+import synthetic
+import cleaning
+import prepare
+import forecast
+from holiday_calendar import HolidayCalendar
+
+
+@pytest.fixture(scope="module")
+def tables(tmp_path_factory):
+    root = tmp_path_factory.mktemp("forecast")
+    synthetic.generate(str(root), n_stores=4, n_families=5, start="2016-03-01", end="2016-12-31")
+    cwd = os.getcwd()
+    os.chdir(root)
+    try:
+        train, test, stores = utils.read_table("train"), utils.read_table("test"), utils.read_table("stores")
+        holidays, oil = utils.read_table("holidays"), utils.read_table("oil")
+        openings = cleaning.read_openings(utils.openings_path)
+    finally:
+        os.chdir(cwd)
+    ## 판매하지 않는 조합 하나 (예측은 0 이어야 함)
+    inactive = (train.store_nbr == 1) & (train.family == train.family.cat.categories[0])
+    train.loc[inactive, "sales"] = 0
+    calendar = HolidayCalendar(prepare.holiday_tables(holidays), stores)
+    return {"train": train, "test": test, "stores": stores, "oil": prepare.build_oil_series(oil), "calendar": calendar,
+            "openings": openings, "inactive": (1, train.family.cat.categories[0])}
+
+
+def run(tables, root, version_key, **kwargs):
+    return forecast.run(tables["train"], tables["test"], tables["stores"], tables["oil"], tables["calendar"], str(root), version_key,
+                        openings=tables["openings"], **kwargs)
+
+
+def test_rmsle():
+    assert forecast.rmsle([0, 1, 10], [0, 1, 10]) == 0
+    y, y_pred = np.array([0.0, 3.0, 10.0]), np.array([1.0, 2.0, -5.0])
+    expected = np.sqrt(np.mean((np.log1p([1.0, 2.0, 0.0]) - np.log1p(y)) ** 2))
+    assert np.isclose(forecast.rmsle(y, y_pred), expected)
+
+
+def test_fit_model_drops_trees_after_best_iteration():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(400, 3)), columns=["a", "b", "c"])
+    y = X.a + rng.normal(scale=2, size=400)
+    ## 검증 데이터는 잡음뿐이라 금방 early stopping
+    X_valid = pd.DataFrame(rng.normal(size=(200, 3)), columns=["a", "b", "c"])
+    y_valid = rng.normal(scale=2, size=200)
+    booster = forecast.fit_model(X, y, X_valid, y_valid, rounds=300)
+    untrimmed = forecast.xgb.train(forecast.params, forecast.xgb.DMatrix(X, label=y), num_boost_round=300,
+                                   evals=[(forecast.xgb.DMatrix(X_valid, label=y_valid), "valid")],
+                                   early_stopping_rounds=forecast.early_stopping_rounds, verbose_eval=False)
+    assert booster.num_boosted_rounds() == untrimmed.best_iteration + 1 < 300
+    assert untrimmed.num_boosted_rounds() == untrimmed.best_iteration + 1 + forecast.early_stopping_rounds
+
+
+@pytest.mark.parametrize("strategy", ["direct", "recursive"])
+def test_run_modes_and_predictions(tables, tmp_path, strategy):
+    first = run(tables, tmp_path, "a", strategy=strategy)
+    cached = run(tables, tmp_path, "a", strategy=strategy)
+    incremental = run(tables, tmp_path, "b", strategy=strategy)
+    full = run(tables, tmp_path, "c", strategy=strategy, incremental=False)
+    assert [first["mode"], cached["mode"], incremental["mode"], full["mode"]] == ["full", "cached", "incremental", "full"]
+    assert np.isclose(first["rmsle"], cached["rmsle"])
+
+    for result in [first, incremental]:
+        predictions = result["predictions"]
+        assert len(predictions) == len(tables["test"])
+        assert predictions.sales.notnull().all() and (predictions.sales >= 0).all()
+        assert np.isfinite(result["rmsle"])
+        store, family = tables["inactive"]
+        inactive = (predictions.store_nbr == store) & (predictions.family == family)
+        assert inactive.any() and (predictions.sales[inactive] == 0).all()
+        assert (predictions.sales[~inactive] > 0).any()
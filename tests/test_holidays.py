@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils
+import synthetic
+import prepare
+from holiday_calendar import HolidayCalendar
+
+
+@pytest.fixture(scope="module")
+def tables(tmp_path_factory):
+    root = tmp_path_factory.mktemp("holidays")
+    ## 12/25 (train 에 없는 날) 이 포함된 기간
+    synthetic.generate(str(root), n_stores=4, n_families=3, start="2016-10-01", end="2017-01-31")
+    cwd = os.getcwd()
+    os.chdir(root)
+    try:
+        return {name: utils.read_table(name) for name in ["holidays", "train", "test", "stores"]}
+    finally:
+        os.chdir(cwd)
+
+
+def holiday_frame(tables, **kwargs):
+    return prepare.Feature_Engineering_Holidays(tables["holidays"], tables["train"], tables["test"], tables["stores"], **kwargs)
+
+
+def test_sparse_and_dense_holiday_features_have_the_same_columns(tables):
+    dense = holiday_frame(tables)
+    full_table = prepare.holiday_table(tables["holidays"], tables["stores"], tables["holidays"].date.min(), tables["holidays"].date.max())
+    keys = ["date", "store_nbr", "family"]
+    columns = prepare.holiday_columns(dense)
+    dense = dense.sort_values(keys).reset_index(drop=True)
+    for sparse in [holiday_frame(tables, sparse=True), holiday_frame(tables, sparse=True, table=full_table)]:
+        assert sorted(sparse.columns) == sorted(dense.columns)
+        sparse = prepare.to_dense(sparse).sort_values(keys).reset_index(drop=True)
+        np.testing.assert_array_equal(sparse[columns].to_numpy(dtype="float64"), dense[columns].to_numpy(dtype="float64"))
+
+
+def test_calendar_lookup_matches_merged_holiday_features(tables):
+    holidays, stores = tables["holidays"], tables["stores"]
+    ## 근무일 (토요일 보충 근무) 한 건 추가
+    work_day = holidays.iloc[[0]].assign(date=pd.Timestamp("2016-11-05"), type="Work Day", locale="National",
+                                         locale_name="Ecuador", description="Recupero puente", transferred=False)
+    holidays = pd.concat([holidays, work_day], ignore_index=True).astype(holidays.dtypes.to_dict())
+    holiday_tables = prepare.holiday_tables(holidays)
+    calendar = HolidayCalendar(holiday_tables, stores)
+    keys = pd.merge(pd.DataFrame({"date": pd.date_range(calendar.start, calendar.end)}), stores[["store_nbr", "city", "state"]], how="cross")
+
+    ## merge 기반 피처는 같은 날짜 / 매장의 휴일 수만큼 행이 늘어나므로 키 별로 합침
+    merged = prepare.add_holiday_features(keys, holiday_tables)
+    merged["IsWorkDay"] = merged.IsWorkDay.notnull()
+    event_cols = [c for c in merged.columns if c.startswith("events_")]
+    merged["is_event"] = merged[event_cols].any(axis=1)
+    merged["is_holiday"] = merged[["holiday_national_binary", "holiday_regional_binary", "holiday_local_binary"]].any(axis=1)
+    merged = merged.groupby(["date", "store_nbr"]).max()
+
+    result = calendar.lookup_frame(keys)
+    result.index = pd.MultiIndex.from_frame(keys[["date", "store_nbr"]])
+    result = result.reindex(merged.index)
+    assert result.is_holiday.any() and result.is_event.any() and result.is_workday.any()
+    np.testing.assert_array_equal(result.is_holiday, merged.is_holiday)
+    np.testing.assert_array_equal(result.is_workday, merged.IsWorkDay)
+    np.testing.assert_array_equal(result.is_event, merged.is_event)
+    ## 조회한 휴일 / 이벤트 이름은 merge 결과의 one-hot 컬럼 중 하나
+    for column, prefix in [("holiday_national", "holiday_national_"), ("holiday_regional", "holiday_regional_"),
+                           ("holiday_local", "holiday_local_"), ("event", "events_")]:
+        found = result[column].notnull().to_numpy()
+        names = (prefix + result[column].astype(str).str.replace(" ", "_")).to_numpy()
+        assert all(merged[name].iloc[i] == 1 for i, name in zip(np.flatnonzero(found), names[found]))
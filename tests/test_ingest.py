@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils
+import synthetic
+import ingest
+
+
+def split_csv(path, cutoff, new_path):
+    """
+    원본 CSV 를 cutoff 까지(기존 데이터)와 그 이후(새 데이터)로 나누는 함수
+    """
+    d = pd.read_csv(path)
+    d[d.date > cutoff].to_csv(new_path, index=False)
+    d[d.date <= cutoff].to_csv(path, index=False)
+
+
+def test_ingest_twice_has_no_duplicate_keys(tmp_path, monkeypatch):
+    synthetic.generate(str(tmp_path), n_stores=6, n_families=5, start="2016-01-01", end="2016-06-30")
+    monkeypatch.chdir(tmp_path)
+    split_csv(utils.train_path, "2016-04-15", "new_train.csv")
+    split_csv(utils.transactions_path, "2016-04-15", "new_transactions.csv")
+    expected_train = len(pd.read_csv(utils.train_path)) + len(pd.read_csv("new_train.csv"))
+    expected_transactions = len(pd.read_csv(utils.transactions_path)) + len(pd.read_csv("new_transactions.csv"))
+    utils.convert_data(["train", "transactions"])
+
+    first = ingest.ingest(train="new_train.csv", transactions="new_transactions.csv")
+    second = ingest.ingest(train="new_train.csv", transactions="new_transactions.csv")
+    assert first["train"] > 0 and first["transactions"] > 0
+    assert second["train"] == 0 and second["transactions"] == 0
+
+    train = utils.read_dataset("train")
+    assert len(train) == expected_train
+    assert not train.id.duplicated().any()
+    assert not train.duplicated(["date", "store_nbr", "family"]).any()
+    assert len(utils.read_table("train")) == expected_train
+
+    transactions = utils.read_dataset("transactions")
+    assert len(transactions) == expected_transactions
+    assert not transactions.duplicated(["date", "store_nbr"]).any()
+
+
+def test_saved_openings_change_version_without_mutating_defaults(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data")
+    import cleaning
+    import prepare
+    defaults = cleaning.store_openings.copy()
+    before = utils.data_version("train", "stores", "openings")
+    assert not prepare.store_openings().store_nbr.isin([90]).any()
+
+    ingest.save_openings(pd.DataFrame({"store_nbr": [90], "opening_date": pd.to_datetime(["2016-05-01"])}))
+    assert utils.data_version("train", "stores", "openings") != before
+    openings = prepare.store_openings()
+    assert openings.set_index("store_nbr").opening_date[90] == pd.Timestamp("2016-05-01")
+    pd.testing.assert_frame_equal(cleaning.store_openings, defaults)
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jobs
+
+
+def test_finished_jobs_keep_recent_results_and_rerun_dropped_ones():
+    calls = []
+
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    runner = jobs.JobRunner(max_workers=1, max_finished=4, max_results=2)
+    first = runner.submit(("square", 1), square, 1)
+    first.future.result()
+    assert first.output == (1,)
+    for x in [2, 3]:
+        runner.submit(("square", x), square, x).future.result()
+
+    ## 결과를 보관하는 작업은 다시 실행하지 않음
+    assert runner.submit(("square", 3), square, 3).output == (9,)
+    assert calls == [1, 2, 3]
+
+    ## 오래된 작업은 결과를 버리고, 다시 요청하면 새 작업으로 실행
+    runner.submit(("square", 4), square, 4).future.result()
+    assert first.output is None
+    again = runner.submit(("square", 1), square, 1)
+    assert again is not first
+    again.future.result()
+    assert again.output == (1,) and calls == [1, 2, 3, 4, 1]
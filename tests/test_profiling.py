@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import profiling
+
+
+def column_report(values, chunk=1000):
+    profile = profiling.ColumnProfile("x", values.dtype)
+    for i in range(0, len(values), chunk):
+        profile.merge(profiling.ColumnProfile("x", values.dtype).update(values.iloc[i:i + chunk]))
+    return profile.report()
+
+
+def test_histogram_keeps_point_mass():
+    rng = np.random.default_rng(0)
+    values = pd.Series(np.where(rng.random(20000) < 0.85, 0.0, rng.gamma(2.0, 50.0, 20000)), dtype="float32")
+    report = column_report(values)
+    counts = np.array(report["histogram"]["counts"])
+    edges = np.array(report["histogram"]["edges"])
+    assert counts.sum() == report["count"] == len(values)
+    exact = np.histogram(values, bins=edges)[0]
+    assert abs(counts[0] - exact[0]) <= 0.01 * len(values)
+
+
+def test_histogram_of_constant_column():
+    report = column_report(pd.Series(np.zeros(5000, dtype="int16")))
+    counts = report["histogram"]["counts"]
+    assert len(counts) == 1 and counts[0] == 5000
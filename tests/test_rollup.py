@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rollup
+import series_stats
+
+
+def small_rollups():
+    dates = pd.date_range("2016-01-01", periods=40)
+    train = pd.DataFrame({"date": np.repeat(dates, 2), "store_nbr": np.tile([1, 2], 40), "family": "A",
+                          "sales": np.arange(80, dtype="float32"), "onpromotion": 0})
+    stores = pd.DataFrame({"store_nbr": [1, 2], "city": ["Quito", "Cuenca"], "state": ["Pichincha", "Azuay"], "cluster": [1, 2]})
+    return rollup.build_rollups(train, stores), train.groupby(["store_nbr", "family"]).sales.sum()
+
+
+def test_write_rollups_is_atomic_and_keeps_recent_versions(tmp_path):
+    rollups, totals = small_rollups()
+    for i in range(5):
+        rollup.write_rollups(rollups, str(tmp_path), f"v{i}", totals)
+        time.sleep(0.01)
+    ## 같은 버전을 다시 저장해도 (다른 작업이 먼저 저장한 경우) 실패하지 않음
+    rollup.write_rollups(rollups, str(tmp_path), "v4", totals)
+
+    names = sorted(os.listdir(tmp_path))
+    assert names == [f"rollup_v{i}" for i in range(5 - rollup.keep_versions, 5)]
+    pd.testing.assert_frame_equal(rollup.read_rollup(str(tmp_path), "v4", "store", "D"), rollups[("store", "D")])
+    assert rollup.read_pair_totals(str(tmp_path), "v4").sum() == totals.sum()
+
+
+def test_write_results_replaces_files_and_keeps_recent_versions(tmp_path):
+    dates = pd.date_range("2016-01-01", periods=10)
+    result = {"summary": pd.DataFrame({"store_nbr": [1, 2], "trend_strength": [0.1, 0.2]}),
+              "acf": np.ones((2, 5), dtype="float32"), "pacf": np.zeros((2, 5), dtype="float32"),
+              "components": np.ones((2, 4, 10), dtype="float32")}
+    for i in range(5):
+        series_stats.write_results(result, dates, str(tmp_path), f"v{i}", "store")
+        time.sleep(0.01)
+
+    assert sorted(os.listdir(tmp_path)) == [f"stats_v{i}" for i in range(5 - rollup.keep_versions, 5)]
+    ## 임시 파일이 남지 않음
+    assert not [name for name in os.listdir(tmp_path / "stats_v4") if ".tmp" in name]
+    saved = series_stats.read_results(str(tmp_path), "v4", "store")
+    pd.testing.assert_frame_equal(saved["summary"], result["summary"])
+    assert saved["components"].shape == (2, 4, 10) and (saved["dates"] == dates).all()
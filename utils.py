@@ -1,7 +1,17 @@
 # -*- coding: utf-8 -*-
+import os
+import shutil
+import hashlib
+import operator
+import functools
 import streamlit as st
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyarrow.dataset as ds
 from PIL import Image
+import instrument
 
 # image url
 e_img1 = "https://www.corporacionfavorita.com/wp-content/uploads/2020/03/logo-cf-footer.png"
@@ -15,14 +25,345 @@ stores_path = "data/stores.csv"
 test_path = "data/test.csv"
 train_path = "data/train.csv"
 transactions_path = "data/transactions.csv"
+# 추가 적재(ingest.py)에서 찾은 신규 매장의 오픈 일자
+openings_path = "data/store_openings.csv"
 
-@st.cache_data
+# cache path (컬럼 기반 캐시 파일 저장 위치)
+cache_dir = "data/cache"
+
+# 청크(out-of-core) 처리 모드 : STORE_SALES_STREAMING=1 이면 train 파생 데이터 중 집계 / 휴일 A/B Test 를 청크 단위로 계산
+streaming = os.environ.get("STORE_SALES_STREAMING", "0") == "1"
+# 청크 하나의 행 수
+chunk_rows = int(os.environ.get("STORE_SALES_CHUNK_ROWS", "1000000"))
+
+# 테이블 별 원본 경로
+table_paths = {
+    "train": train_path,
+    "test": test_path,
+    "transactions": transactions_path,
+    "stores": stores_path,
+    "oil": oil_path,
+    "holidays": holidays_path,
+}
+
+# 날짜(year/month) x 매장으로 분할 저장하는 테이블
+# 파일은 year=YYYY/month=M 폴더 별로 하나, 파일 안에서는 매장마다 row group 하나 (row group 통계로 매장 / 날짜 필터 적용)
+partitioned_tables = ["train", "transactions"]
+
+# 테이블 별 데이터 타입 (날짜 컬럼은 parse_dates 로 처리, store_nbr 는 합성 데이터의 매장 수(127 개 초과)를 위해 int16)
+table_dtypes = {
+    "train": {"id": "int32", "store_nbr": "int16", "family": "category", "sales": "float32", "onpromotion": "int16"},
+    "test": {"id": "int32", "store_nbr": "int16", "family": "category", "onpromotion": "int16"},
+    "transactions": {"store_nbr": "int16", "transactions": "int16"},
+    "stores": {"store_nbr": "int16", "city": "category", "state": "category", "type": "category", "cluster": "int8"},
+    "oil": {"dcoilwtico": "float32"},
+    "holidays": {"type": "object", "locale": "object", "locale_name": "object", "description": "object", "transferred": "bool"},
+}
+table_dates = {
+    "train": ["date"],
+    "test": ["date"],
+    "transactions": ["date"],
+    "stores": [],
+    "oil": ["date"],
+    "holidays": ["date"],
+}
+
+
+def cache_path(name):
+    """
+    테이블의 컬럼 기반(Parquet) 캐시 파일 경로
+    """
+    return os.path.join(cache_dir, f"{name}.parquet")
+
+@instrument.traced("load")
+def read_csv(name):
+    """
+    원본 CSV 를 타입이 지정된 형태로 읽어 오는 함수
+    """
+    return pd.read_csv(table_paths[name], dtype=table_dtypes[name], parse_dates=table_dates[name])
+
+def write_cache(name, dataframe):
+    """
+    타입이 지정된 테이블을 Parquet 캐시 파일로 저장하는 함수
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    dataframe.to_parquet(cache_path(name), index=False)
+
+def is_cache_fresh(name):
+    """
+    캐시 파일이 존재하고 원본 CSV 보다 최신인지 확인하는 함수
+    """
+    cache = cache_path(name)
+    if not os.path.exists(cache):
+        return False
+    if not os.path.exists(table_paths[name]):
+        return True
+    return os.path.getmtime(cache) >= os.path.getmtime(table_paths[name])
+
+@instrument.traced("load")
+def read_table(name, columns=None):
+    """
+    캐시가 최신이면 Parquet 캐시를, 아니면 원본 CSV 를 읽고 캐시를 갱신하는 함수
+    분할 저장하는 테이블은 분할 데이터셋이 최신이면 데이터셋을 읽음 (추가 적재 후에는 데이터셋만 갱신됨)
+    """
+    if name in partitioned_tables and is_dataset_fresh(name) and not is_cache_fresh(name):
+        return read_dataset(name, columns=columns)
+    if is_cache_fresh(name):
+        return pd.read_parquet(cache_path(name), columns=columns)
+
+    dataframe = read_csv(name)
+    write_cache(name, dataframe)
+    if columns is not None:
+        dataframe = dataframe[list(columns)]
+    return dataframe
+
+def iter_table(name, columns=None, rows=None):
+    """
+    테이블을 rows 행씩 나눠 읽는 함수 (원본이 날짜 순이므로 날짜 구간 별 청크)
+    캐시가 최신이면 Parquet 를 batch 단위로, 아니면 원본 CSV 를 청크 단위로 읽음 (전체를 메모리에 올리지 않음)
+    """
+    rows = rows or chunk_rows
+    if name in partitioned_tables and is_dataset_fresh(name) and not is_cache_fresh(name):
+        ## 월 별 파일 순서로 읽음
+        for year, month in dataset_months(name):
+            for batch in pq.ParquetFile(partition_path(name, year, month)).iter_batches(batch_size=rows, columns=columns):
+                yield batch.to_pandas().sort_values([c for c in ["date", "store_nbr"] if c in batch.schema.names], kind="stable")
+        return
+    if is_cache_fresh(name):
+        for batch in pq.ParquetFile(cache_path(name)).iter_batches(batch_size=rows, columns=columns):
+            yield batch.to_pandas()
+        return
+
+    dates = [c for c in table_dates[name] if columns is None or c in columns]
+    for chunk in pd.read_csv(table_paths[name], dtype=table_dtypes[name], parse_dates=dates, usecols=columns, chunksize=rows):
+        yield chunk
+
+## Partitioned dataset (data/cache/<name>_dataset/year=YYYY/month=M/part-0.parquet)
+
+def dataset_path(name):
+    return os.path.join(cache_dir, f"{name}_dataset")
+
+def is_dataset_fresh(name):
+    """
+    분할 데이터셋이 존재하고 원본 CSV 보다 최신인지 확인하는 함수 (_SUCCESS 파일의 수정 시각 기준)
+    """
+    marker = os.path.join(dataset_path(name), "_SUCCESS")
+    if not os.path.exists(marker):
+        return False
+    if not os.path.exists(table_paths[name]):
+        return True
+    return os.path.getmtime(marker) >= os.path.getmtime(table_paths[name])
+
+def partition_path(name, year, month):
+    return os.path.join(dataset_path(name), f"year={year}", f"month={month}", "part-0.parquet")
+
+def dataset_months(name):
+    """
+    분할 데이터셋의 (year, month) 목록 (날짜 순)
+    """
+    months = []
+    for year_dir in os.listdir(dataset_path(name)):
+        if not year_dir.startswith("year="):
+            continue
+        for month_dir in os.listdir(os.path.join(dataset_path(name), year_dir)):
+            if month_dir.startswith("month="):
+                months.append((int(year_dir[5:]), int(month_dir[6:])))
+    return sorted(months)
+
+def ensure_dataset(name):
+    """
+    분할 데이터셋이 없거나 오래되었으면 다시 만드는 함수
+    """
+    if not is_dataset_fresh(name):
+        write_dataset(name, read_table(name))
+
+def mark_dataset(name):
+    open(os.path.join(dataset_path(name), "_SUCCESS"), "w").close()
+
+def write_partition(path, dataframe):
+    """
+    한 달치 데이터를 매장 별 row group 으로 나눠 Parquet 파일 하나로 저장하는 함수
+    """
+    sort_keys = [c for c in ["store_nbr", "family", "date"] if c in dataframe.columns]
+    dataframe = dataframe.sort_values(sort_keys, kind="stable").reset_index(drop=True)
+    table = pa.Table.from_pandas(dataframe, preserve_index=False)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    store = dataframe.store_nbr.to_numpy()
+    bounds = np.flatnonzero(np.r_[True, store[1:] != store[:-1], True])
+    with pq.ParquetWriter(path, table.schema) as writer:
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            writer.write_table(table.slice(start, end - start))
+
+def write_dataset(name, dataframe):
+    """
+    테이블을 year / month 폴더로 분할하고, 파일마다 매장 별 row group 으로 저장하는 함수
+    """
+    path = dataset_path(name)
+    shutil.rmtree(path, ignore_errors=True)
+    for (year, month), part in dataframe.groupby([dataframe.date.dt.year, dataframe.date.dt.month], sort=True):
+        write_partition(partition_path(name, year, month), part)
+    mark_dataset(name)
+
+def append_dataset(name, dataframe):
+    """
+    새 행이 들어가는 year / month 파일만 다시 쓰는 추가 적재 함수 (다른 달의 파일은 그대로)
+    """
+    ensure_dataset(name)
+    for (year, month), part in dataframe.groupby([dataframe.date.dt.year, dataframe.date.dt.month], sort=True):
+        path = partition_path(name, year, month)
+        if os.path.exists(path):
+            part = pd.concat([pd.read_parquet(path), part], ignore_index=True)
+        part = part.astype({c: t for c, t in table_dtypes[name].items() if c in part.columns})
+        write_partition(path, part)
+    mark_dataset(name)
+
+def dataset_filter(start=None, end=None, stores=None, families=None):
+    """
+    날짜 구간 / 매장 / 제품군 필터 식 (year / month 는 폴더, 나머지는 row group 통계로 건너뜀)
+    """
+    conditions = []
+    if start is not None:
+        start = pd.Timestamp(start)
+        conditions += [ds.field("year") * 100 + ds.field("month") >= start.year * 100 + start.month, ds.field("date") >= start]
+    if end is not None:
+        end = pd.Timestamp(end)
+        conditions += [ds.field("year") * 100 + ds.field("month") <= end.year * 100 + end.month, ds.field("date") <= end]
+    if stores is not None:
+        conditions.append(ds.field("store_nbr").isin(list(stores)))
+    if families is not None:
+        conditions.append(ds.field("family").isin(list(families)))
+    return functools.reduce(operator.and_, conditions) if conditions else None
+
+@instrument.traced("load")
+def read_dataset(name, columns=None, start=None, end=None, stores=None, families=None):
+    """
+    분할 데이터셋에서 필터에 해당하는 partition / row group 만 읽는 함수 (없거나 오래되었으면 다시 만듦)
+    """
+    ensure_dataset(name)
+    dataset = ds.dataset(dataset_path(name), format="parquet", partitioning="hive")
+    columns = None if columns is None else list(columns)
+    table = dataset.to_table(columns=columns or [c for c in dataset.schema.names if c not in ("year", "month")],
+                             filter=dataset_filter(start, end, stores, families))
+    dataframe = table.to_pandas()
+    dtypes = {c: t for c, t in table_dtypes[name].items() if c in dataframe.columns}
+    return dataframe.sort_values([c for c in ["date", "store_nbr", "family"] if c in dataframe.columns], kind="stable") \
+                    .reset_index(drop=True).astype(dtypes)
+
+def filter_table(dataframe, start=None, end=None, stores=None, families=None):
+    """
+    메모리에 있는 테이블에 같은 필터를 적용하는 함수 (분할 저장하지 않는 테이블용)
+    """
+    mask = np.ones(len(dataframe), dtype=bool)
+    if start is not None:
+        mask &= (dataframe.date >= pd.Timestamp(start)).to_numpy()
+    if end is not None:
+        mask &= (dataframe.date <= pd.Timestamp(end)).to_numpy()
+    if stores is not None:
+        mask &= dataframe.store_nbr.isin(list(stores)).to_numpy()
+    if families is not None:
+        mask &= dataframe.family.isin(list(families)).to_numpy()
+    return dataframe[mask].reset_index(drop=True)
+
+def append_csv(name, dataframe):
+    """
+    원본 CSV 끝에 새 행을 추가하는 함수 (원본 CSV 의 컬럼 순서를 따름)
+    """
+    path = table_paths[name]
+    with open(path, "rb") as f:
+        header = f.readline().decode().strip().split(",")
+        f.seek(-1, os.SEEK_END)
+        newline = f.read(1) != b"\n"
+    with open(path, "a", newline="") as f:
+        if newline:
+            f.write("\n")
+        dataframe[header].to_csv(f, header=False, index=False, date_format="%Y-%m-%d")
+
+def append_table(name, dataframe):
+    """
+    새 행을 분할 데이터셋과 원본 CSV 에 추가하는 함수
+    데이터셋을 먼저 갱신하고 CSV 에 추가한 뒤 _SUCCESS 를 다시 표시함
+    (CSV 를 먼저 바꾸면 데이터셋이 오래된 것으로 보여서 새 행이 들어간 CSV 로 전체를 다시 만든 뒤 한 번 더 추가하게 됨)
+    """
+    if name in partitioned_tables:
+        ensure_dataset(name)
+        append_dataset(name, dataframe)
+    append_csv(name, dataframe)
+    if name in partitioned_tables:
+        mark_dataset(name)
+
+def convert_data(names=None):
+    """
+    원본 CSV 를 타입이 지정된 Parquet 캐시로 변환하는 일회성 적재 단계 (train / transactions 는 분할 데이터셋도 만듦)
+    """
+    for name in names or table_paths.keys():
+        if not os.path.exists(table_paths[name]):
+            print(f"{table_paths[name]} not found, skip.")
+            continue
+        dataframe = read_csv(name)
+        write_cache(name, dataframe)
+        print(f"{table_paths[name]} -> {cache_path(name)}")
+        if name in partitioned_tables:
+            write_dataset(name, dataframe)
+            print(f"{table_paths[name]} -> {dataset_path(name)}")
+
+def table_version(name):
+    """
+    원본 파일(없으면 캐시 파일)의 수정 시각과 크기로 만든 테이블 버전
+    openings 는 추가 적재로 저장된 신규 매장 오픈 일자 파일 (정제 / 집계 / 예측 결과가 달라짐)
+    """
+    if name == "openings":
+        path = openings_path
+    else:
+        path = table_paths[name] if os.path.exists(table_paths[name]) else cache_path(name)
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return (name, stat.st_mtime_ns, stat.st_size)
+
+def data_version(*names):
+    """
+    여러 테이블의 버전을 묶은 데이터 버전 (파생 데이터의 캐시 키로 사용)
+    """
+    return tuple(table_version(name) for name in names or list(table_paths) + ["openings"])
+
+def version_key(version):
+    """
+    데이터 버전을 파일 / 폴더 이름에 쓸 수 있는 짧은 문자열로 만드는 함수
+    """
+    return hashlib.md5(repr(version).encode()).hexdigest()[:12]
+
+@instrument.cache_data(stage="load", max_entries=12, show_spinner=False)
+def _load_table(name, columns, version, filters):
+    if filters is None:
+        return read_table(name, columns=columns)
+    if name in partitioned_tables:
+        return read_dataset(name, columns=columns, **filters)
+    dataframe = filter_table(read_table(name), **filters)
+    return dataframe if columns is None else dataframe[columns]
+
+def load_table(name, columns=None, start=None, end=None, stores=None, families=None):
+    """
+    테이블을 처음 접근할 때 한 번만 읽고 테이블 별로 따로 캐시하는 함수
+    columns 를 지정하면 해당 컬럼만 읽어 옴
+    start / end / stores / families 를 지정하면 해당하는 행만 읽음 (train / transactions 는 분할 데이터셋에서 필요한 부분만 읽음)
+    """
+    if name not in table_paths:
+        raise KeyError(f"Unknown table: {name}")
+    filters = {"start": start, "end": end, "stores": None if stores is None else tuple(stores), "families": None if families is None else tuple(families)}
+    filters = filters if any(v is not None for v in filters.values()) else None
+    return _load_table(name, None if columns is None else list(columns), table_version(name), filters)
+
+@instrument.traced("load")
 def load_data():
-    train = pd.read_csv(train_path)
-    test = pd.read_csv(test_path)
-    transactions = pd.read_csv(transactions_path)
-    stores = pd.read_csv(stores_path)
-    oil = pd.read_csv(oil_path)
-    holidays = pd.read_csv(holidays_path)
-
-    return train, test, transactions, stores, oil, holidays
\ No newline at end of file
+    train = load_table("train")
+    test = load_table("test")
+    transactions = load_table("transactions")
+    stores = load_table("stores")
+    oil = load_table("oil")
+    holidays = load_table("holidays")
+
+    return train, test, transactions, stores, oil, holidays
+
+if __name__ == "__main__":
+    convert_data()